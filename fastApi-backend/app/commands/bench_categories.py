@@ -0,0 +1,289 @@
+"""Measure storage and report time before and after the category dictionary.
+
+    DB_BACKEND=sqlite python -m app.commands.bench_categories [--users 20]
+        [--transactions 200000] [--categories 12] [--repeat 5] [--output FILE]
+
+Builds an embedded SQLite database at schema version 2, where every
+transaction repeats its category name, with --transactions rows spread over
+--users users and 2023-2024, and a copy of it upgraded by migration 3, which
+moves names into the per-user categories table. Measures the on-disk size of
+each table with its indexes, and the time to build every user's monthly
+reports (the default REPORT_AGGREGATION=sql path, and the Python path that
+fetches the rows) and yearly reports: on version 2 with the statements as
+they were then, on the copy with the current ones. Prints a table and JSON;
+exits with status 1 if any report differs between the two schemas.
+
+Version 2 rows carry names, so their categories are interned to ids inside
+the timed region, in place of the name-keyed dicts that code summed into.
+After the migration each user's names are loaded once, as a warm
+Category.names() cache would hand them over, and ids are named per report.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.config.migrations import migrate
+from app.config.storage import storage
+from app.models.category import GET_ALL, CategoryDictionary
+from app.models.rollup import GET_YEAR
+from app.models.rows import TransactionRow
+from app.models.transaction import AGGREGATE, GET_BY_MONTH, MONTH_RANGE, MONTH, DAY, WEEK
+from app.utils.analytics import Aggregates
+from app.utils.helpers import build_monthly_report, month_bounds, monthly_report_payload, yearly_report_payload
+
+CATEGORY_NAMES = [
+    "Groceries", "Restaurants and dining", "Rent", "Utilities: electricity", "Transport", "Insurance",
+    "Healthcare", "Entertainment", "Subscriptions", "Clothing", "Gifts and donations", "Travel",
+    "Education", "Household supplies", "Salary", "Freelance income", "Dividends", "Interest"
+]
+PERIODS = [(year, month) for year in (2023, 2024) for month in range(1, 13)]
+
+# The report statements as they were at schema version 2, when the name was
+# stored on every row
+VERSION_2_AGGREGATE = " UNION ALL".join(f"""
+    SELECT type, {category}, {month}, {day}, {week}, SUM(amount) AS total, COUNT(*) AS count
+    FROM transactions
+    WHERE {MONTH_RANGE}
+    GROUP BY {", ".join(["type"] + [expr for expr in (category, month, day, week) if expr != "NULL"])}"""
+    for category, month, day, week in [
+        ("NULL", "NULL", "NULL", "NULL"),
+        ("category", "NULL", "NULL", "NULL"),
+        ("NULL", MONTH, "NULL", "NULL"),
+        ("NULL", "NULL", DAY, "NULL"),
+        ("NULL", "NULL", "NULL", WEEK)
+    ]
+) + """
+    ORDER BY total DESC
+"""
+
+VERSION_2_MONTH_ROWS = f"""
+    SELECT id, amount, description, type, category, transaction_date, date_created
+    FROM transactions
+    WHERE {MONTH_RANGE}
+    ORDER BY transaction_date DESC
+"""
+
+VERSION_2_YEAR = """
+    SELECT period_month, category, type, total_amount, txn_count
+    FROM transaction_rollups
+    WHERE user_id = :user_id AND period_year = :period_year AND txn_count > 0
+    ORDER BY total_amount DESC
+"""
+
+
+def seed(conn, args):
+    """Users and transactions written straight into the version 2 tables,
+    with rollups built the way migration 1 builds them."""
+    rng = random.Random(args.seed)
+    first_day = date(2023, 1, 1)
+    conn.executemany(
+        "INSERT INTO users (id, name, email, password, date_of_birth) VALUES (?, ?, ?, 'x', '1990-01-01')",
+        [(user, f"User {user}", f"bench{user}@example.com") for user in range(1, args.users + 1)]
+    )
+    per_user = {user: random.Random(f"{args.seed}-{user}").sample(CATEGORY_NAMES, args.categories)
+                for user in range(1, args.users + 1)}
+    rows = []
+    for number in range(args.transactions):
+        user = number % args.users + 1
+        type_ = "income" if rng.random() < 0.15 else "expense"
+        day = (first_day + timedelta(days=rng.randrange(731))).isoformat()
+        rows.append((
+            number + 1, round(rng.uniform(1, 800), 2), f"Card payment {rng.randrange(100000)}", type_,
+            rng.choice(per_user[user]), user, day
+        ))
+    conn.executemany("""
+        INSERT INTO transactions (id, amount, description, type, category, user_id, transaction_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.execute("UPDATE sequences SET value = ? WHERE name = 'transactions_seq'", (args.transactions,))
+    conn.execute(f"""
+        INSERT INTO transaction_rollups (user_id, period_year, period_month, category, type, total_amount, txn_count)
+        SELECT user_id, {storage.year('transaction_date')}, {MONTH}, category, type, SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY user_id, {storage.year('transaction_date')}, {MONTH}, category, type
+    """)
+    conn.commit()
+
+
+def table_sizes(conn):
+    """Bytes on disk per table, its indexes included, after a VACUUM."""
+    conn.execute("VACUUM")
+    sizes = dict(conn.execute("""
+        SELECT m.tbl_name, SUM(s.pgsize)
+        FROM dbstat s JOIN sqlite_master m ON m.name = s.name
+        GROUP BY m.tbl_name
+    """).fetchall())
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    return {
+        "transactions": sizes.get("transactions", 0),
+        "rollups": sizes.get("transaction_rollups", 0),
+        "categories": sizes.get("categories", 0),
+        "file": page_size * page_count
+    }
+
+
+def interned(rows, column):
+    """Rows with the category name in `column` swapped for an id, and the
+    names by id, for handing version 2 rows to the id-keyed Aggregates."""
+    ids = {}
+    rows = [row[:column] + (ids.setdefault(row[column], len(ids)) if row[column] is not None else None,)
+            + row[column + 1:] for row in rows]
+    return rows, list(ids)
+
+
+def reports(conn, users, aggregate_sql, month_rows_sql, year_sql, dictionary):
+    """Every user's monthly (both paths) and yearly reports, and the time
+    each kind took in total. Without a `dictionary` rows carry names."""
+    timings = {"monthly_sql": 0.0, "monthly_python": 0.0, "yearly": 0.0}
+    payloads = {}
+    for user in users:
+        names = None
+        if dictionary:
+            names = CategoryDictionary(conn.execute(GET_ALL.sql, {"user_id": user}).fetchall()).names
+        for year, month in PERIODS:
+            start_date, end_date = month_bounds(month, year)
+            params = {"user_id": user, "start_date": start_date, "end_date": end_date}
+
+            started = time.perf_counter()
+            rows = conn.execute(aggregate_sql, params).fetchall()
+            agg = Aggregates.from_grouping_sets(*(interned(rows, 1) if names is None else (rows, names)))
+            monthly = monthly_report_payload(agg, None, month, year)
+            timings["monthly_sql"] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            rows = [TransactionRow(*row) for row in conn.execute(month_rows_sql, params)]
+            if names is not None:
+                for row in rows:
+                    row.category = names[row.category]
+            from_rows = build_monthly_report(rows, None, month, year)
+            timings["monthly_python"] += time.perf_counter() - started
+
+            payloads[f"{user}/{year}-{month:02d}/sql"] = monthly
+            payloads[f"{user}/{year}-{month:02d}/python"] = from_rows
+
+        for year in sorted({year for year, _ in PERIODS}):
+            started = time.perf_counter()
+            rows = conn.execute(year_sql, {"user_id": user, "period_year": year}).fetchall()
+            agg = Aggregates.from_rollups(*(interned(rows, 1) if names is None else (rows, names)))
+            yearly = yearly_report_payload(agg, [])
+            timings["yearly"] += time.perf_counter() - started
+            payloads[f"{user}/{year}/yearly"] = yearly
+    return timings, payloads
+
+
+def measure(args, before, after):
+    """Median ms per report kind and the payloads for each schema. Passes
+    alternate between the two databases, so the process warming up or the
+    machine getting busier weighs on both alike."""
+    users = range(1, args.users + 1)
+    schemas = (
+        (before, (VERSION_2_AGGREGATE, VERSION_2_MONTH_ROWS, VERSION_2_YEAR), False),
+        (after, (AGGREGATE.sql, GET_BY_MONTH.sql, GET_YEAR.sql), True)
+    )
+    runs = ([], [])
+    for _ in range(args.repeat):
+        for (conn, statements, dictionary), schema_runs in zip(schemas, runs):
+            schema_runs.append(reports(conn, users, *statements, dictionary))
+    per_report = {
+        "monthly_sql": args.users * len(PERIODS),
+        "monthly_python": args.users * len(PERIODS),
+        "yearly": args.users * len({year for year, _ in PERIODS})
+    }
+    return [(
+        {name: round(statistics.median(run[0][name] for run in schema_runs) / count * 1000, 3)
+         for name, count in per_report.items()},
+        schema_runs[0][1]
+    ) for schema_runs in runs]
+
+
+def canonical(value):
+    """Payload with floats rounded and categories in name order, so sums
+    taken in a different order compare equal."""
+    if isinstance(value, float):
+        return round(value, 6) if math.isfinite(value) else value
+    if isinstance(value, dict):
+        return {key: canonical(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands.bench_categories")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=200000, help="total across all users")
+    parser.add_argument("--categories", type=int, default=12, help=f"per user, at most {len(CATEGORY_NAMES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the reports; the median is kept")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON result here")
+    args = parser.parse_args(argv)
+    if storage.name != "sqlite":
+        parser.error("runs on the embedded engine; set DB_BACKEND=sqlite")
+    if not 1 <= args.categories <= len(CATEGORY_NAMES):
+        parser.error(f"--categories must be between 1 and {len(CATEGORY_NAMES)}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        before_path, after_path = os.path.join(directory, "version2.db"), os.path.join(directory, "dictionary.db")
+        before = sqlite3.connect(before_path)
+        after = None
+        try:
+            migrate(before, target=2)
+            started = time.perf_counter()
+            seed(before, args)
+            print(f"Seeded {args.transactions} transactions in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+            before_sizes = table_sizes(before)
+
+            shutil.copyfile(before_path, after_path)
+            after = sqlite3.connect(after_path)
+            started = time.perf_counter()
+            migrate(after)
+            migration_ms = (time.perf_counter() - started) * 1000
+            after_sizes = table_sizes(after)
+
+            (before_times, before_payloads), (after_times, after_payloads) = measure(args, before, after)
+        finally:
+            before.close()
+            if after is not None:
+                after.close()
+
+    mismatched = [key for key in before_payloads if canonical(before_payloads[key]) != canonical(after_payloads[key])]
+
+    rows = [(f"{name} bytes", before_sizes[name], after_sizes[name]) for name in before_sizes] + [
+        (f"{name} ms/report", before_times[name], after_times[name]) for name in before_times
+    ]
+    print(f"{'':<24} {'version 2':>12} {'dictionary':>12} {'change':>8}", file=sys.stderr)
+    for label, before, after in rows:
+        change = f"{(after - before) / before:+.0%}" if before else ""
+        print(f"{label:<24} {before:>12} {after:>12} {change:>8}", file=sys.stderr)
+    print(f"Migration to the dictionary took {migration_ms:.0f}ms", file=sys.stderr)
+
+    body = json.dumps({
+        "config": {"users": args.users, "transactions": args.transactions, "categories": args.categories,
+                   "repeat": args.repeat, "sqlite": sqlite3.sqlite_version},
+        "before": {"bytes": before_sizes, "msPerReport": before_times},
+        "after": {"bytes": after_sizes, "msPerReport": after_times},
+        "migrationMs": round(migration_ms, 1),
+        "mismatched": mismatched
+    }, indent=2)
+    print(body)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(body + "\n")
+    if mismatched:
+        print(f"{len(mismatched)} reports differ after the migration, e.g. {mismatched[0]}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
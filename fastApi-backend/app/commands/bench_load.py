@@ -0,0 +1,452 @@
+"""Load test the API with a realistic request mix and check for regressions.
+
+    python -m app.commands.bench_load [--backend sqlite] [--transactions 100000]
+        [--duration 30] [--concurrency 32] [--baseline benchmarks/load-baseline.json]
+        [--save-baseline] [--url http://localhost:3000] [--clients 1,10,50,100,200]
+        [--walk-rows 1000000] [--walk-page-size 100] [--import-rows 10000]
+
+Unless --url points at a running server, boots the app under uvicorn against
+DB_BACKEND=--backend (the SQLite stand-in at --database by default, or a
+local Oracle from the usual DB_* variables). Seeds --users synthetic users
+with --transactions spread over 2023-2024 through the batch import
+endpoint; seeding is deterministic and skipped for users that already exist,
+so re-runs against the same database reuse it.
+
+Workers then pick scenarios by weight (--mix) for --duration seconds after a
+--warmup, and the run is summarised as JSON: throughput, error count and
+p50/p90/p95/p99/max latency per scenario. With a baseline file present, any
+scenario whose p95 grows or throughput drops by more than --tolerance fails
+the run with status 1; --save-baseline writes this run as the new baseline.
+
+--clients adds a sweep: the same mix runs again at each listed number of
+parallel clients (--warmup, then --duration each), and p50/p99 per level go
+under "sweep" in the result. The baseline check covers the main run only.
+
+--walk-rows seeds one more user with that many transactions (once, like the
+others) and pages through all of them with GET /api/transactions?limit=
+--walk-page-size, following nextCursor. Latency and body size are reported
+per tenth of the walk under "cursorWalk": with keyset pagination the last
+pages should cost what the first ones do.
+
+--import-rows imports that many transactions for a fresh user through the
+batch endpoint (in requests of up to IMPORT_BATCH_SIZE rows), and the same
+rows for another fresh user as one POST /api/transactions each, one after
+another. Both wall times go under "importComparison".
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+SCENARIOS = {
+    "login": 5,
+    "list": 30,
+    "month_view": 25,
+    "monthly_report": 15,
+    "yearly_report": 10,
+    "batch_write": 15
+}
+PERIODS = [(year, month) for year in (2023, 2024) for month in range(1, 13)]
+CATEGORIES = {
+    "income": ["Salary", "Freelance", "Investments"],
+    "expense": ["Food", "Rent", "Transport", "Utilities", "Entertainment", "Health", "Shopping"]
+}
+PASSWORD = "bench-password"
+SEED_BATCH_SIZE = 5000
+WRITE_BATCH_SIZE = 20
+# The server's default MAX_BATCH_SIZE
+IMPORT_BATCH_SIZE = 10000
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def parse_levels(text):
+    levels = [int(part) for part in text.split(",") if part.strip()]
+    if not levels or min(levels) < 1:
+        raise argparse.ArgumentTypeError("expected client counts like 1,10,50,100,200")
+    return levels
+
+
+def parse_mix(text):
+    mix = dict(SCENARIOS)
+    for part in filter(None, (text or "").split(",")):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def synthetic_transactions(rng, count):
+    for i in range(count):
+        year, month = rng.choice(PERIODS)
+        type_ = "income" if rng.random() < 0.2 else "expense"
+        yield {
+            "amount": round(rng.uniform(5, 3000 if type_ == "income" else 400), 2),
+            "desc": f"Synthetic transaction {i}",
+            "type": type_,
+            "category": rng.choice(CATEGORIES[type_]),
+            "date": f"{year}-{month:02d}-{rng.randint(1, 28):02d}"
+        }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def boot_server(args, port):
+    env = {**os.environ, "DB_BACKEND": args.backend, "SQLITE_PATH": args.database}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=env
+    )
+
+
+async def wait_until_healthy(client, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise SystemExit(f"Server exited during startup with status {server.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise SystemExit(f"Server was not healthy after {timeout}s")
+
+
+async def login(client, email):
+    response = await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+    if response.status_code != 200:
+        return None
+    return {"Authorization": f"Bearer {response.json()['data']['token']}"}
+
+
+async def seed_user(client, email, name, transactions, rng):
+    headers = await login(client, email)
+    if headers is not None:
+        return email, headers
+
+    response = await client.post("/api/auth/register", json={
+        "name": name, "email": email, "password": PASSWORD, "date_of_birth": "1990-01-01"
+    })
+    response.raise_for_status()
+    headers = await login(client, email)
+    if headers is None:
+        raise SystemExit(f"Could not log in as freshly registered {email}")
+
+    rows = list(synthetic_transactions(rng, transactions))
+    for start in range(0, len(rows), SEED_BATCH_SIZE):
+        response = await client.post(
+            "/api/transactions/batch", json={"transactions": rows[start:start + SEED_BATCH_SIZE]}, headers=headers
+        )
+        response.raise_for_status()
+    return email, headers
+
+
+async def seed(client, args):
+    started = time.perf_counter()
+    per_user, extra = divmod(args.transactions, args.users)
+    users = []
+    for index in range(args.users):
+        # One generator per user keeps each user's data independent of --users
+        rng = random.Random(f"{args.seed}-{index}")
+        users.append(await seed_user(
+            client, f"bench-user-{index}@example.com", f"Bench User {index}", per_user + (index < extra), rng
+        ))
+    print(f"Seeded {args.users} users / {args.transactions} transactions in {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+    return users
+
+
+def scenario_request(name, rng, email, headers):
+    year, month = rng.choice(PERIODS)
+    if name == "login":
+        return "POST", "/api/auth/login", {"json": {"email": email, "password": PASSWORD}}
+    if name == "list":
+        return "GET", "/api/transactions", {"params": {"limit": 50}, "headers": headers}
+    if name == "month_view":
+        return "GET", f"/api/transactions/month/{month}/{year}", {"headers": headers}
+    if name == "monthly_report":
+        return "GET", "/api/report", {"params": {"month": month, "year": year}, "headers": headers}
+    if name == "yearly_report":
+        return "GET", "/api/report/yearly", {"params": {"year": year}, "headers": headers}
+    rows = list(synthetic_transactions(rng, WRITE_BATCH_SIZE))
+    return "POST", "/api/transactions/batch", {"json": {"transactions": rows}, "headers": headers}
+
+
+async def generate_load(client, users, mix, args, concurrency=None):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    warm_until = time.perf_counter() + args.warmup
+    deadline = warm_until + args.duration
+
+    async def worker(number):
+        rng = random.Random(f"{args.seed}-worker-{number}")
+        while True:
+            name = rng.choices(names, weights)[0]
+            email, headers = rng.choice(users)
+            method, url, kwargs = scenario_request(name, rng, email, headers)
+            started = time.perf_counter()
+            if started >= deadline:
+                return
+            try:
+                response = await client.request(method, url, **kwargs)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            finished = time.perf_counter()
+            if started < warm_until:
+                continue
+            if failed:
+                errors[name] += 1
+            else:
+                latencies[name].append((finished - started) * 1000)
+
+    await asyncio.gather(*(worker(number) for number in range(concurrency or args.concurrency)))
+    return latencies, errors
+
+
+async def client_sweep(client, users, mix, args):
+    """The mix at each --clients level in turn: p50/p99 overall and per scenario."""
+    levels = []
+    for clients in args.clients:
+        latencies, errors = await generate_load(client, users, mix, args, clients)
+        everything = [sample for samples in latencies.values() for sample in samples]
+        total = summarise(everything, sum(errors.values()), args.duration)
+        levels.append({
+            "clients": clients,
+            **{key: total[key] for key in ("requests", "errors", "rps", "p50", "p99")},
+            "scenarios": {
+                name: {"p50": round(percentile(samples, 50), 2), "p99": round(percentile(samples, 99), 2)}
+                for name, samples in latencies.items()
+            }
+        })
+        print(f"{clients:>4} clients: {total['rps']} req/s, p50 {total['p50']} ms, p99 {total['p99']} ms, "
+              f"{total['errors']} errors", file=sys.stderr)
+    return levels
+
+
+async def cursor_walk(client, args):
+    """Page through the --walk-rows user's transactions, newest first, and
+    summarise latency and body size per tenth of the walk."""
+    started = time.perf_counter()
+    _, headers = await seed_user(
+        client, "bench-walk-user@example.com", "Bench Walk User", args.walk_rows, random.Random(f"{args.seed}-walk")
+    )
+    print(f"Seeded the walk user in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    pages = []
+    params = {"limit": args.walk_page_size}
+    while True:
+        started = time.perf_counter()
+        response = await client.get("/api/transactions", params=params, headers=headers)
+        elapsed = (time.perf_counter() - started) * 1000
+        response.raise_for_status()
+        body = response.json()
+        pages.append((elapsed, len(response.content), len(body["data"])))
+        if body["pagination"]["nextCursor"] is None:
+            break
+        params = {"limit": args.walk_page_size, "after": body["pagination"]["nextCursor"]}
+
+    tenths = []
+    for tenth in range(10):
+        part = pages[len(pages) * tenth // 10:len(pages) * (tenth + 1) // 10]
+        if not part:
+            continue
+        latencies = [ms for ms, _, _ in part]
+        tenths.append({
+            "pages": len(part),
+            "p50": round(percentile(latencies, 50), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "avgBytes": round(sum(size for _, size, _ in part) / len(part))
+        })
+        print(f"walk {tenth * 10:>3}-{tenth * 10 + 10}%: p50 {tenths[-1]['p50']} ms, p99 {tenths[-1]['p99']} ms, "
+              f"{tenths[-1]['avgBytes']} bytes/page", file=sys.stderr)
+    return {
+        "rows": sum(count for _, _, count in pages),
+        "pageSize": args.walk_page_size,
+        "pages": len(pages),
+        "totalSeconds": round(sum(ms for ms, _, _ in pages) / 1000, 2),
+        "tenths": tenths
+    }
+
+
+async def import_comparison(client, args):
+    """Wall time to import --import-rows transactions through the batch
+    endpoint and as single POSTs, each for a user registered for the run."""
+    rows = list(synthetic_transactions(random.Random(f"{args.seed}-import"), args.import_rows))
+    run_id = uuid.uuid4().hex[:8]
+    timings = {}
+    for way in ("batch", "single"):
+        _, headers = await seed_user(client, f"bench-import-{way}-{run_id}@example.com", "Bench Import", 0, None)
+        started = time.perf_counter()
+        if way == "batch":
+            for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+                response = await client.post(
+                    "/api/transactions/batch", json={"transactions": rows[start:start + IMPORT_BATCH_SIZE]},
+                    headers=headers
+                )
+                response.raise_for_status()
+        else:
+            for row in rows:
+                response = await client.post("/api/transactions", json=row, headers=headers)
+                response.raise_for_status()
+        timings[way] = time.perf_counter() - started
+
+    result = {"rows": len(rows)}
+    for way, seconds in timings.items():
+        result[way] = {"seconds": round(seconds, 3), "rowsPerSecond": round(len(rows) / seconds, 1)}
+        print(f"import {len(rows)} rows {way:>6}: {seconds:.2f}s ({len(rows) / seconds:.0f} rows/s)", file=sys.stderr)
+    result["speedup"] = round(timings["single"] / timings["batch"], 1)
+    return result
+
+
+def summarise(samples, errors, duration):
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / duration, 2),
+        "p50": round(percentile(samples, 50), 2),
+        "p90": round(percentile(samples, 90), 2),
+        "p95": round(percentile(samples, 95), 2),
+        "p99": round(percentile(samples, 99), 2),
+        "max": round(max(samples, default=0.0), 2)
+    }
+
+
+def compare(result, baseline, tolerance, min_samples=20):
+    """Regressions of `result` against `baseline`, as readable strings."""
+    regressions = []
+    for name, current in result["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous or current["requests"] < min_samples or previous["requests"] < min_samples:
+            continue
+        if current["p95"] > previous["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95']} ms vs baseline {previous['p95']} ms")
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['rps']} req/s vs baseline {previous['rps']} req/s")
+        if current["errors"] > previous["errors"] + max(1, previous["requests"] * 0.01):
+            regressions.append(f"{name}: {current['errors']} errors vs baseline {previous['errors']}")
+    return regressions
+
+
+async def run(args, base_url, server):
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=max([args.concurrency] + (args.clients or [])))
+    sweep = walk = imports = None
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await wait_until_healthy(client, server)
+        users = await seed(client, args)
+        latencies, errors = await generate_load(client, users, mix, args)
+        if args.clients:
+            sweep = await client_sweep(client, users, mix, args)
+        if args.walk_rows:
+            walk = await cursor_walk(client, args)
+        if args.import_rows:
+            imports = await import_comparison(client, args)
+
+    scenarios = {name: summarise(latencies[name], errors[name], args.duration) for name in mix}
+    everything = [sample for samples in latencies.values() for sample in samples]
+    result = {
+        "config": {
+            "backend": args.backend if server is not None else None,
+            "url": base_url,
+            "users": args.users,
+            "transactions": args.transactions,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": mix,
+            "seed": args.seed
+        },
+        "total": summarise(everything, sum(errors.values()), args.duration),
+        "scenarios": scenarios
+    }
+    if sweep is not None:
+        result["sweep"] = sweep
+    if walk is not None:
+        result["cursorWalk"] = walk
+    if imports is not None:
+        result["importComparison"] = imports
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands.bench_load")
+    parser.add_argument("--url", help="benchmark a running server instead of booting one")
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "oracle"])
+    parser.add_argument("--database", default="bench.db", help="SQLite file for --backend sqlite")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--transactions", type=int, default=100000, help="total across all users (1k-1M)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--clients", type=parse_levels, help="also sweep these client counts, e.g. 1,10,50,100,200")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--walk-rows", type=int, default=0, help="page through a user with this many rows (e.g. 1000000)")
+    parser.add_argument("--walk-page-size", type=int, default=100)
+    parser.add_argument("--import-rows", type=int, default=0, help="compare importing this many rows in batches and one by one")
+    parser.add_argument("--mix", help="scenario weights, e.g. list=50,batch_write=0")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON result here")
+    parser.add_argument("--baseline", default="benchmarks/load-baseline.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95/throughput change")
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = free_port()
+        server = boot_server(args, port)
+        base_url = f"http://127.0.0.1:{port}"
+    try:
+        result = asyncio.run(run(args, base_url, server))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    body = json.dumps(result, indent=2)
+    print(body)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(body + "\n")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as file:
+            file.write(body + "\n")
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+        return 0
+    with open(args.baseline) as file:
+        regressions = compare(result, json.load(file), args.tolerance)
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
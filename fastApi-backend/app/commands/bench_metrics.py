@@ -0,0 +1,96 @@
+"""Measure the per-request cost of MetricsMiddleware.
+
+    python -m app.commands.bench_metrics [--requests 50000] [--budget-us 50]
+
+Drives a minimal ASGI app directly, bare and wrapped in MetricsMiddleware
+(with and without Server-Timing), so only the middleware's own work is
+timed. The inner app records a few statements and a pool wait per request
+the way the data layer does. Exits with status 1 if the added time per
+request exceeds the budget.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from app.middleware.metrics import MetricsMiddleware
+from app.utils.metrics import record_db, record_pool_wait, render_metrics
+
+
+class Route:
+    path = "/api/transactions/{id}"
+
+
+ROUTE = Route()
+BODY = b'{"success":true,"data":{"id":1,"amount":12.5}}'
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = ROUTE
+    record_pool_wait(0.0001)
+    for _ in range(3):
+        record_db(0.0005, 1)
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": BODY})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def run(app, count):
+    base = {"type": "http", "method": "GET", "path": "/api/transactions/1", "headers": []}
+    started = time.perf_counter()
+    for _ in range(count):
+        await app(dict(base), receive, send)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+async def measure(count, repeat):
+    variants = [
+        ("bare", endpoint),
+        ("metrics", MetricsMiddleware(endpoint, server_timing=False)),
+        ("metrics + Server-Timing", MetricsMiddleware(endpoint, server_timing=True))
+    ]
+    best = {}
+    for _ in range(repeat):
+        for name, app in variants:
+            per_request = await run(app, count)
+            best[name] = min(best.get(name, per_request), per_request)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands.bench_metrics")
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-us", type=float, default=50.0)
+    args = parser.parse_args(argv)
+
+    best = asyncio.run(measure(args.requests, args.repeat))
+    bare = best.pop("bare")
+    print(f"{args.requests} requests, best of {args.repeat}")
+    print(f"{'bare':>24}: {bare:6.2f} us/request")
+    worst = 0.0
+    for name, per_request in best.items():
+        overhead = per_request - bare
+        worst = max(worst, overhead)
+        print(f"{name:>24}: {per_request:6.2f} us/request (+{overhead:.2f} us)")
+
+    started = time.perf_counter()
+    render_metrics()
+    print(f"{'render /metrics':>24}: {(time.perf_counter() - started) * 1000:6.2f} ms")
+
+    if worst > args.budget_us:
+        print(f"Middleware overhead {worst:.2f} us exceeds the {args.budget_us:.0f} us budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Compare memory held by transaction rows as dicts and as TransactionRow.
+
+    python -m app.commands.bench_row_memory [--rows 100000]
+
+Feeds the same driver-style tuples to the old per-row dict conversion and to
+TransactionRow (the cursor rowfactory) and reports, via tracemalloc, the
+memory retained by the resulting list and the peak while building it. Both
+results must serialize to identical JSON.
+"""
+import argparse
+import gc
+import random
+import sys
+import tracemalloc
+from datetime import date, timedelta
+
+from app.models.rows import TransactionRow
+from app.utils.responses import dumps
+
+
+def driver_rows(count):
+    """Tuples in TRANSACTION_COLUMNS order, with fresh strings per row as the
+    driver would produce them."""
+    rng = random.Random(42)
+    start = date(2023, 1, 1)
+    categories = ["Food", "Rent", "Salary", "Transport", "Utilities", "Entertainment"]
+    for i in range(count):
+        day = (start + timedelta(days=rng.randrange(730))).isoformat()
+        yield (
+            i + 1,
+            round(rng.uniform(1, 5000), 2),
+            f"Transaction {i}",
+            "".join(rng.choice(["income", "expense"])),
+            "".join(rng.choice(categories)),
+            day,
+            f"{day}T12:{i % 60:02d}:00.000"
+        )
+
+
+def as_dict(row):
+    # The conversion Transaction.get_all used to run per row
+    return {
+        "id": row[0],
+        "amount": float(row[1]),
+        "desc": row[2],
+        "type": row[3],
+        "category": row[4],
+        "date": row[5],
+        "date_created": row[6]
+    }
+
+
+def measure(count, build):
+    gc.collect()
+    tracemalloc.start()
+    rows = [build(row) for row in driver_rows(count)]
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, retained, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands.bench_row_memory")
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    dicts, dict_retained, dict_peak = measure(args.rows, as_dict)
+    dict_body = dumps(dicts)
+    del dicts
+    rows, row_retained, row_peak = measure(args.rows, lambda row: TransactionRow(*row))
+    row_body = dumps(rows)
+
+    mib = 1024 * 1024
+    print(f"{args.rows} transactions")
+    print(f"{'dict':>15}: retained {dict_retained / mib:7.1f} MiB, peak {dict_peak / mib:7.1f} MiB")
+    print(f"{'TransactionRow':>15}: retained {row_retained / mib:7.1f} MiB, peak {row_peak / mib:7.1f} MiB")
+    print(f"{'saved':>15}: {(1 - row_retained / dict_retained) * 100:.0f}% of retained memory")
+
+    if dict_body != row_body:
+        print("Rows and dicts serialize differently")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
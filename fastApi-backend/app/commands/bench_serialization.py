@@ -0,0 +1,83 @@
+"""Time JSON serialization of a GET /api/transactions payload.
+
+    python -m app.commands.bench_serialization [--rows 10000] [--repeat 20]
+
+Builds TransactionRow objects like Transaction.get_all returns and encodes the response body
+three ways: FastAPI's default (jsonable_encoder + stdlib json), the route's
+response_model serialized by pydantic-core and rendered by FastJSONResponse,
+and FastJSONResponse on the rows directly. Exits with status 1 if any of them
+produce different bytes.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.models.rows import TransactionListResponse, TransactionRow
+from app.utils.responses import FastJSONResponse
+
+
+def sample_rows(count):
+    rng = random.Random(42)
+    start = date(2023, 1, 1)
+    categories = ["Food", "Rent", "Salary", "Transport", "Utilities", "Entertainment"]
+    rows = []
+    for i in range(count):
+        day = start + timedelta(days=rng.randrange(730))
+        rows.append((
+            i + 1,
+            round(rng.uniform(1, 5000), 2),
+            f"Transaction {i}",
+            rng.choice(["income", "expense"]),
+            rng.choice(categories),
+            day.isoformat(),
+            f"{day.isoformat()}T12:{i % 60:02d}:00.000"
+        ))
+    return rows
+
+
+def timed(repeat, func):
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = func()
+    return (time.perf_counter() - started) / repeat * 1000, body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands.bench_serialization")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    payload = {"success": True, "data": [TransactionRow(*row) for row in sample_rows(args.rows)]}
+    adapter = TypeAdapter(TransactionListResponse)
+
+    def typed():
+        model = adapter.validate_python(payload)
+        return FastJSONResponse(adapter.dump_python(model, mode="json", exclude_unset=True)).body
+
+    results = [
+        ("jsonable_encoder + json", *timed(args.repeat, lambda: JSONResponse(jsonable_encoder(payload)).body)),
+        ("response_model + FastJSONResponse", *timed(args.repeat, typed)),
+        ("FastJSONResponse only", *timed(args.repeat, lambda: FastJSONResponse(payload).body))
+    ]
+
+    print(f"{args.rows} transactions, {len(results[0][2]) / 1024:.0f} KiB body")
+    for name, ms, body in results:
+        print(f"{name:>34}: {ms:8.2f} ms  ({results[0][1] / ms:5.1f}x)")
+
+    bodies = {body for _, _, body in results}
+    if len(bodies) != 1:
+        print("Serializers disagree on the encoded body")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Measure how read throughput scales with the number of worker processes.
+
+    python -m app.commands.bench_workers [--workers 1,2,4,8] [--clients 4]
+        [--transactions 50000] [--duration 20] [--min-efficiency 0.75]
+
+For each worker count, boots app.commands.serve against the SQLite stand-in
+at --database (seeded once, as in bench_load), drives it with a read-only
+mix (transaction lists, month views, monthly and yearly reports) from
+--clients load generator processes, then SIGTERMs it. Prints a table and
+JSON with requests/s, p50/p95 latency, speedup over the first count and
+efficiency (speedup / workers relative to it).
+
+The load generators share the machine with the workers, so a count is only
+held to --min-efficiency (exit status 1 below it) when workers + clients
+fit in the CPUs; beyond that the numbers show the machine, not the app.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app.commands.bench_load import free_port, generate_load, seed, summarise, wait_until_healthy
+
+READ_MIX = {"list": 35, "month_view": 30, "monthly_report": 20, "yearly_report": 15}
+
+
+def boot_workers(args, workers, port):
+    env = {**os.environ, "DB_BACKEND": "sqlite", "SQLITE_PATH": args.database}
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.commands.serve", "--workers", str(workers), "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL
+    )
+
+
+def stop_workers(server):
+    server.terminate()  # SIGTERM: the graceful path
+    try:
+        server.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def client_load(base_url, users, args):
+    """One load generator process: bench_load's workers at --concurrency / --clients."""
+    async def run():
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            return await generate_load(client, users, READ_MIX, args)
+    return asyncio.run(run())
+
+
+async def prepare(base_url, server, args):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        await wait_until_healthy(client, server)
+        return await seed(client, args)
+
+
+def measure(args, workers, pool):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = boot_workers(args, workers, port)
+    try:
+        users = asyncio.run(prepare(base_url, server, args))
+        per_client = []
+        for number in range(args.clients):
+            client_args = copy.copy(args)
+            client_args.concurrency = max(1, args.concurrency // args.clients)
+            client_args.seed = f"{args.seed}-client-{number}"
+            per_client.append(client_args)
+        results = pool.starmap(client_load, [(base_url, users, client_args) for client_args in per_client])
+    finally:
+        stop_workers(server)
+
+    latencies = [sample for client_latencies, _ in results for samples in client_latencies.values()
+                 for sample in samples]
+    errors = sum(sum(client_errors.values()) for _, client_errors in results)
+    return summarise(latencies, errors, args.duration)
+
+
+def main(argv=None):
+    cpus = os.cpu_count() or 1
+    default_counts = ",".join(str(2 ** power) for power in range(cpus.bit_length()) if 2 ** power <= cpus)
+
+    parser = argparse.ArgumentParser(prog="python -m app.commands.bench_workers")
+    parser.add_argument("--workers", default=default_counts, help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=max(1, cpus // 4), help="load generator processes")
+    parser.add_argument("--database", default="bench.db")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--transactions", type=int, default=50000, help="total across all users")
+    parser.add_argument("--concurrency", type=int, default=64, help="requests in flight across all clients")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--min-efficiency", type=float, default=0.75)
+    parser.add_argument("--output", help="also write the JSON result here")
+    args = parser.parse_args(argv)
+    counts = [int(count) for count in args.workers.split(",")]
+
+    runs = []
+    with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+        for workers in counts:
+            started = time.perf_counter()
+            result = measure(args, workers, pool)
+            runs.append({"workers": workers, **result})
+            print(f"{workers} worker(s): {result['rps']} req/s, p95 {result['p95']} ms "
+                  f"({time.perf_counter() - started:.0f}s)", file=sys.stderr)
+
+    base = runs[0]
+    failures = []
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8} {'efficiency':>10}",
+          file=sys.stderr)
+    for run in runs:
+        run["speedup"] = round(run["rps"] / base["rps"], 2) if base["rps"] else 0.0
+        run["efficiency"] = round(run["speedup"] * base["workers"] / run["workers"], 2)
+        run["checked"] = run["workers"] + args.clients <= cpus
+        print(f"{run['workers']:>7} {run['rps']:>9} {run['p50']:>8} {run['p95']:>8} {run['speedup']:>8} "
+              f"{run['efficiency']:>10}{'' if run['checked'] else '  (oversubscribed, not checked)'}",
+              file=sys.stderr)
+        if run["checked"] and run["efficiency"] < args.min_efficiency:
+            failures.append(f"{run['workers']} workers at {run['efficiency']:.0%} efficiency")
+
+    body = json.dumps({
+        "config": {"cpus": cpus, "clients": args.clients, "concurrency": args.concurrency,
+                   "duration": args.duration, "transactions": args.transactions, "mix": READ_MIX},
+        "runs": runs
+    }, indent=2)
+    print(body)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(body + "\n")
+    for failure in failures:
+        print(f"Scaling below {args.min_efficiency:.0%}: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
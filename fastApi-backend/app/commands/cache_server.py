@@ -0,0 +1,358 @@
+"""Run a small Redis-compatible cache server for the API workers to share.
+
+    python -m app.commands.cache_server [--host 127.0.0.1] [--port 6379]
+        [--max-bytes 268435456]
+
+A stand-in for Redis on single-host deployments: app.commands.serve starts
+one next to its workers so the auth and report caches (and their
+invalidations) are shared, without installing Redis. It speaks enough of the
+RESP2 protocol for redis-py and redis-cli: GET, SET (EX/PX/NX/XX), DEL,
+EXISTS, INCR/INCRBY, EXPIRE, TTL, MULTI/EXEC/DISCARD, DBSIZE, FLUSHDB, INFO
+and PING. Everything is kept in memory in one database; once the values
+pass --max-bytes the least recently used keys are evicted, like Redis with
+maxmemory-policy allkeys-lru. Point REPORT_CACHE_URL/AUTH_CACHE_URL at a
+real Redis instead when workers span several hosts.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import OrderedDict
+
+SWEEP_INTERVAL = 5  # seconds between passes dropping expired keys
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class CommandError(Exception):
+    pass
+
+
+class Store:
+    """Byte keys to byte values with optional expiry and an LRU size cap."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data = OrderedDict()  # key -> value
+        self._expires = {}  # key -> time.monotonic() deadline
+
+    def _alive(self, key):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self.delete(key)
+            self.expirations += 1
+            return False
+        return key in self._data
+
+    def get(self, key):
+        if not self._alive(key):
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def set(self, key, value, ttl=None, keep_ttl=False):
+        previous = self._data.pop(key, None)
+        if previous is not None:
+            self.bytes -= len(key) + len(previous)
+        self._data[key] = value
+        self.bytes += len(key) + len(value)
+        if ttl is not None:
+            self._expires[key] = time.monotonic() + ttl
+        elif not keep_ttl:
+            self._expires.pop(key, None)
+        while self.bytes > self.max_bytes and len(self._data) > 1:
+            self.delete(next(iter(self._data)))
+            self.evictions += 1
+
+    def delete(self, key):
+        value = self._data.pop(key, None)
+        self._expires.pop(key, None)
+        if value is None:
+            return False
+        self.bytes -= len(key) + len(value)
+        return True
+
+    def exists(self, key):
+        return self._alive(key)
+
+    def expire(self, key, ttl):
+        if not self._alive(key):
+            return False
+        self._expires[key] = time.monotonic() + ttl
+        return True
+
+    def ttl(self, key):
+        if not self._alive(key):
+            return -2
+        expires = self._expires.get(key)
+        return -1 if expires is None else max(0, round(expires - time.monotonic()))
+
+    def sweep(self):
+        now = time.monotonic()
+        for key in [key for key, expires in self._expires.items() if expires <= now]:
+            self.delete(key)
+            self.expirations += 1
+
+    def clear(self):
+        self._data.clear()
+        self._expires.clear()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+def encode(reply):
+    """RESP2 encoding of a command reply."""
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, bool):
+        return b":1\r\n" if reply else b":0\r\n"
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode()
+    if isinstance(reply, CommandError):
+        return b"-%s\r\n" % str(reply).encode()
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join(encode(item) for item in reply)
+    raise TypeError(f"Cannot encode {reply!r}")
+
+
+def integer(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise CommandError("ERR value is not an integer or out of range")
+
+
+class CacheServer:
+    def __init__(self, max_bytes):
+        self.store = Store(max_bytes)
+        self.started = time.monotonic()
+        self.clients = 0
+        self.commands = 0
+        self.hits = 0
+        self.misses = 0
+
+    # Commands: each takes the argument list (bytes) and returns a reply
+
+    def cmd_ping(self, args):
+        return args[0] if args else "PONG"
+
+    def cmd_echo(self, args):
+        return args[0]
+
+    def cmd_get(self, args):
+        value = self.store.get(args[0])
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def cmd_set(self, args):
+        key, value, options = args[0], args[1], [arg.upper() for arg in args[2:]]
+        ttl = None
+        keep_ttl = False
+        only_if = None
+        index = 0
+        while index < len(options):
+            option = options[index]
+            if option in (b"EX", b"PX") and index + 1 < len(options):
+                ttl = integer(options[index + 1]) / (1 if option == b"EX" else 1000)
+                if ttl <= 0:
+                    raise CommandError("ERR invalid expire time in 'set' command")
+                index += 1
+            elif option in (b"NX", b"XX"):
+                only_if = option
+            elif option == b"KEEPTTL":
+                keep_ttl = True
+            else:
+                raise CommandError("ERR syntax error")
+            index += 1
+        exists = self.store.exists(key)
+        if (only_if == b"NX" and exists) or (only_if == b"XX" and not exists):
+            return None
+        self.store.set(key, value, ttl, keep_ttl)
+        return "OK"
+
+    def cmd_del(self, args):
+        return sum(self.store.delete(key) for key in args)
+
+    def cmd_exists(self, args):
+        return sum(self.store.exists(key) for key in args)
+
+    def cmd_incrby(self, args):
+        value = integer(self.store.get(args[0]) or b"0") + integer(args[1])
+        self.store.set(args[0], str(value).encode(), keep_ttl=True)
+        return value
+
+    def cmd_incr(self, args):
+        return self.cmd_incrby([args[0], b"1"])
+
+    def cmd_expire(self, args):
+        return self.store.expire(args[0], integer(args[1]))
+
+    def cmd_ttl(self, args):
+        return self.store.ttl(args[0])
+
+    def cmd_dbsize(self, args):
+        return len(self.store)
+
+    def cmd_flushdb(self, args):
+        self.store.clear()
+        return "OK"
+
+    cmd_flushall = cmd_flushdb
+
+    def cmd_select(self, args):
+        # One database; accepted so redis:// URLs ending in /0 work
+        return "OK"
+
+    def cmd_client(self, args):
+        # CLIENT SETNAME / SETINFO sent by client libraries on connect
+        return "OK"
+
+    def cmd_info(self, args):
+        stats = {
+            "uptime_in_seconds": int(time.monotonic() - self.started),
+            "connected_clients": self.clients,
+            "total_commands_processed": self.commands,
+            "used_memory": self.store.bytes,
+            "maxmemory": self.store.max_bytes,
+            "keyspace_hits": self.hits,
+            "keyspace_misses": self.misses,
+            "evicted_keys": self.store.evictions,
+            "expired_keys": self.store.expirations,
+            "db0": f"keys={len(self.store)}"
+        }
+        return "".join(f"{name}:{value}\r\n" for name, value in stats.items()).encode()
+
+    ARITY = {
+        "ping": (0, 1), "echo": (1, 1), "get": (1, 1), "set": (2, None), "del": (1, None),
+        "exists": (1, None), "incr": (1, 1), "incrby": (2, 2), "expire": (2, 2), "ttl": (1, 1),
+        "dbsize": (0, 0), "flushdb": (0, 1), "flushall": (0, 1), "select": (1, 1), "client": (1, None),
+        "info": (0, None)
+    }
+
+    def execute(self, command):
+        self.commands += 1
+        name, args = command[0].decode(errors="replace").lower(), command[1:]
+        arity = self.ARITY.get(name)
+        if arity is None:
+            return CommandError(f"ERR unknown command '{name}'")
+        low, high = arity
+        if len(args) < low or (high is not None and len(args) > high):
+            return CommandError(f"ERR wrong number of arguments for '{name}' command")
+        try:
+            return getattr(self, f"cmd_{name}")(args)
+        except CommandError as error:
+            return error
+
+    async def read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.endswith(b"\r\n"):
+            raise ProtocolError("ERR Protocol error: unterminated line")
+        if not line.startswith(b"*"):
+            # Inline command, as typed into telnet
+            return line.split() or []
+        count = integer(line[1:-2])
+        command = []
+        for _ in range(count):
+            header = await reader.readline()
+            if not header.startswith(b"$"):
+                raise ProtocolError("ERR Protocol error: expected '$'")
+            length = integer(header[1:-2])
+            command.append((await reader.readexactly(length + 2))[:-2])
+        return command
+
+    async def handle(self, reader, writer):
+        self.clients += 1
+        queued = None  # commands between MULTI and EXEC
+        try:
+            while True:
+                try:
+                    command = await self.read_command(reader)
+                except (ProtocolError, CommandError) as error:
+                    writer.write(encode(CommandError(str(error))))
+                    break
+                if command is None:
+                    break
+                if not command:
+                    continue
+                name = command[0].upper()
+                if name == b"QUIT":
+                    writer.write(encode("OK"))
+                    break
+                if name == b"MULTI":
+                    reply = CommandError("ERR MULTI calls can not be nested") if queued is not None else "OK"
+                    if queued is None:
+                        queued = []
+                elif name == b"EXEC":
+                    if queued is None:
+                        reply = CommandError("ERR EXEC without MULTI")
+                    else:
+                        # Commands run to completion on the loop, so the
+                        # queue executes without interleaving other clients
+                        reply = [self.execute(queued_command) for queued_command in queued]
+                        queued = None
+                elif name == b"DISCARD":
+                    reply = CommandError("ERR DISCARD without MULTI") if queued is None else "OK"
+                    queued = None
+                elif queued is not None:
+                    queued.append(command)
+                    reply = "QUEUED"
+                else:
+                    reply = self.execute(command)
+                writer.write(encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def sweep_expired(self):
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            self.store.sweep()
+
+
+async def serve(host, port, max_bytes):
+    cache = CacheServer(max_bytes)
+    server = await asyncio.start_server(cache.handle, host, port)
+    sweeper = asyncio.create_task(cache.sweep_expired())
+    print(f"Cache server listening on {host}:{port} (pid {os.getpid()}, max {max_bytes} bytes)", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        sweeper.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands.cache_server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--max-bytes", type=int, default=256 * 1024 * 1024)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_bytes))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
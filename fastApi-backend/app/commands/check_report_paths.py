@@ -0,0 +1,79 @@
+"""Check that both REPORT_AGGREGATION paths build the same monthly report.
+
+    python -m app.commands.check_report_paths --user-id N --year YYYY [--month M]
+
+For each month (all twelve unless --month is given) builds the report's
+summary, analytics and chart data twice from the live database: from
+Transaction.aggregate() with monthly_report_payload(), as the "sql" path
+does, and from Transaction.get_by_month() with build_monthly_report(), as
+the "python" path does. Keys must match in the same order, and lists (top
+categories included) element by element. Floats may differ only in the
+last bits, since the database sums in a different order. Exits with status
+1 on any difference.
+"""
+import argparse
+import asyncio
+import math
+import sys
+
+from app.config.database import init_database, close_connection, bound_connection
+from app.models.goal import Goal
+from app.models.transaction import Transaction
+from app.utils.helpers import build_monthly_report, month_bounds, monthly_report_payload
+
+SECTIONS = ("analytics", "summary", "chartData")
+
+def differences(sql, python, path=""):
+    """Where two payloads differ, as (path, sql value, python value)."""
+    if isinstance(sql, dict) and isinstance(python, dict):
+        if list(sql) != list(python):
+            return [(path or "/", list(sql), list(python))]
+        return [d for key in sql for d in differences(sql[key], python[key], f"{path}/{key}")]
+    if isinstance(sql, (list, tuple)) and isinstance(python, (list, tuple)):
+        if len(sql) != len(python):
+            return [(path, sql, python)]
+        return [d for i, (a, b) in enumerate(zip(sql, python)) for d in differences(a, b, f"{path}/{i}")]
+    if isinstance(sql, float) or isinstance(python, float):
+        if isinstance(sql, (int, float)) and isinstance(python, (int, float)) \
+                and math.isclose(sql, python, rel_tol=1e-9, abs_tol=1e-6):
+            return []
+    elif sql == python:
+        return []
+    return [(path, sql, python)]
+
+async def compare_month(user_id, month, year):
+    goal = await Goal.get_by_user_and_month(user_id, month, year)
+    start_date, end_date = month_bounds(month, year)
+    agg = await Transaction.aggregate(user_id, start_date, end_date)
+    sql = dict(zip(SECTIONS, monthly_report_payload(agg, goal, month, year)))
+    transactions = await Transaction.get_by_month(user_id, month, year)
+    python = dict(zip(SECTIONS, build_monthly_report(transactions, goal, month, year)))
+    return len(transactions), differences(sql, python)
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands.check_report_paths")
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--month", type=int, choices=range(1, 13), metavar="1-12")
+    args = parser.parse_args(argv)
+
+    await init_database()
+    failures = 0
+    try:
+        async with bound_connection():
+            for month in [args.month] if args.month else range(1, 13):
+                count, diffs = await compare_month(args.user_id, month, args.year)
+                label = f"user={args.user_id} {args.year}-{month:02d} ({count} transactions)"
+                if not diffs:
+                    print(f"ok   {label}")
+                    continue
+                failures += 1
+                print(f"FAIL {label}")
+                for path, sql, python in diffs[:10]:
+                    print(f"     {path}: sql {sql!r} != python {python!r}")
+    finally:
+        await close_connection()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
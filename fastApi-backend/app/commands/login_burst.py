@@ -0,0 +1,95 @@
+"""Measure /api/transactions latency with and without a concurrent login burst.
+
+    python -m app.commands.login_burst --email a@b.c --password secret [--url http://localhost:3000]
+
+Runs the same read load twice against a running server, once on its own and
+once while --logins concurrent logins hammer /api/auth/login, and prints
+p50/p99 for both phases. With bcrypt on its own pool the two p99s should stay
+close; exits with status 1 when the burst p99 exceeds --max-ratio times the
+baseline.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import httpx
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def read_load(client, headers, readers, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def reader():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get("/api/transactions", params={"limit": 50}, headers=headers)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(reader() for _ in range(readers)))
+    return latencies
+
+
+async def login_load(client, credentials, logins, duration):
+    statuses = {}
+    deadline = time.perf_counter() + duration
+
+    async def login():
+        while time.perf_counter() < deadline:
+            response = await client.post("/api/auth/login", json=credentials)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+    return statuses
+
+
+def report(name, latencies):
+    print(
+        f"{name:>9}: {len(latencies)} requests, "
+        f"p50 {percentile(latencies, 50):.1f} ms, p99 {percentile(latencies, 99):.1f} ms"
+    )
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands.login_burst")
+    parser.add_argument("--url", default="http://localhost:3000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--max-ratio", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    credentials = {"email": args.email, "password": args.password}
+    limits = httpx.Limits(max_connections=args.readers + args.logins)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        response = await client.post("/api/auth/login", json=credentials)
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['data']['token']}"}
+
+        baseline = await read_load(client, headers, args.readers, args.duration)
+        burst, statuses = await asyncio.gather(
+            read_load(client, headers, args.readers, args.duration),
+            login_load(client, credentials, args.logins, args.duration)
+        )
+
+    report("baseline", baseline)
+    report("burst", burst)
+    print("   logins: " + ", ".join(f"{count} x {status}" for status, count in sorted(statuses.items())))
+
+    ratio = percentile(burst, 99) / (percentile(baseline, 99) or 1)
+    print(f"p99 ratio {ratio:.2f} (limit {args.max_ratio})")
+    return 1 if ratio > args.max_ratio else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
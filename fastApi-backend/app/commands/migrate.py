@@ -0,0 +1,39 @@
+"""Apply pending schema migrations and check database startup time.
+
+    python -m app.commands.migrate [--status]
+
+Runs the same init_database() a worker runs at boot (pool creation plus
+migrations), prints the schema version, the migrations applied and the
+time taken, and exits with status 1 when startup went over
+STARTUP_BUDGET_MS. With --status, only reports the schema version.
+"""
+import argparse
+import asyncio
+import sys
+
+from app.config.database import init_database, close_connection, get_startup_stats
+from app.config.migrations import LATEST_VERSION
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands.migrate")
+    parser.add_argument("--status", action="store_true", help="report the schema version without migrating")
+    args = parser.parse_args(argv)
+    
+    await init_database(migrate_schema=not args.status)
+    await close_connection()
+    stats = get_startup_stats()
+    version = stats["migrations"]["version"]
+    if args.status:
+        print(f"Schema version {version if version is not None else 'none'}, latest {LATEST_VERSION}")
+        return 0 if version == LATEST_VERSION else 1
+    
+    for migration in stats["migrations"]["applied"]:
+        print(f"  {migration['version']}: {migration['description']} ({migration['ms']:.0f}ms)")
+    print(
+        f"Schema version {stats['migrations']['version']}; startup {stats['totalMs']:.0f}ms "
+        f"(pool {stats['poolMs']:.0f}ms, budget {stats['budgetMs']:.0f}ms)"
+    )
+    return 1 if stats["overBudget"] else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,42 @@
+"""Verify or rebuild the transaction_rollups table against the raw rows.
+
+    python -m app.commands.rollups reconcile [--user-id N]
+    python -m app.commands.rollups rebuild [--user-id N]
+
+reconcile exits with status 1 when any rollup disagrees with the raw rows.
+"""
+import argparse
+import asyncio
+import sys
+
+from app.config.database import init_database, close_connection, bound_connection, run_in_db
+from app.models.rollup import Rollup
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands.rollups")
+    parser.add_argument("action", choices=["reconcile", "rebuild"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args(argv)
+    
+    await init_database()
+    try:
+        async with bound_connection() as conn:
+            if args.action == "rebuild":
+                rows = await run_in_db(Rollup.rebuild, conn, args.user_id)
+                print(f"Rebuilt {rows} rollup rows")
+                return 0
+            
+            mismatches = await run_in_db(Rollup.reconcile, conn, args.user_id)
+            for m in mismatches:
+                print(
+                    f"user={m['user_id']} {m['year']}-{m['month']:02d} {m['type']}/{m['category']}: "
+                    f"rollup {m['rollup']['amount']} ({m['rollup']['count']}) != "
+                    f"actual {m['actual']['amount']} ({m['actual']['count']})"
+                )
+            print(f"{len(mismatches)} mismatched rollup rows")
+            return 1 if mismatches else 0
+    finally:
+        await close_connection()
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,122 @@
+"""Run the API for production: several worker processes on one port.
+
+    python -m app.commands.serve [--workers 4] [--host 0.0.0.0] [--port 3000]
+        [--graceful-timeout 30] [--cache-url redis://cache:6379/0 | --no-shared-cache]
+
+Migrates the schema once, then starts --workers uvicorn workers (WEB_WORKERS,
+default one per CPU). Each worker runs app.main's lifespan: its own
+connection pool of up to DB_POOL_MAX connections, so size the database for
+workers x DB_POOL_MAX sessions. Workers that die are restarted.
+
+On SIGTERM (or Ctrl-C) every worker stops accepting connections, lets
+in-flight requests finish for up to --graceful-timeout seconds, then waits
+DB_DRAIN_TIMEOUT for checked-out connections before closing its pool.
+
+The auth and report caches are shared between workers through Redis at
+--cache-url (SHARED_CACHE_URL); without one, a local stand-in
+(app.commands.cache_server) is started alongside the workers. Explicit
+AUTH_CACHE_*/REPORT_CACHE_* settings take precedence.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import uvicorn
+
+from app.config.database import init_database, close_connection, pool_config
+
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL")
+CACHE_SERVER_MAX_BYTES = int(os.getenv("CACHE_SERVER_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_cache_server(port, timeout=10):
+    """Start the local cache stand-in and wait until it accepts connections.
+
+    It gets its own session so a Ctrl-C meant for the workers does not stop
+    it while they are still draining; main() stops it once they have exited.
+    """
+    server = subprocess.Popen([
+        sys.executable, "-m", "app.commands.cache_server",
+        "--port", str(port), "--max-bytes", str(CACHE_SERVER_MAX_BYTES)
+    ], start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"Cache server exited with status {server.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.terminate()
+    raise SystemExit(f"Cache server did not start within {timeout}s")
+
+
+def share_caches(url):
+    # Inherited by the worker processes, which read them when app.main is imported
+    for cache in ("AUTH", "REPORT"):
+        os.environ.setdefault(f"{cache}_CACHE_BACKEND", "redis")
+        os.environ.setdefault(f"{cache}_CACHE_URL", url)
+
+
+async def migrate_once():
+    # Done here so the workers find the schema current and start on the
+    # single-query fast path instead of queueing for the migration lock
+    await init_database()
+    await close_connection()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands.serve")
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "3000")))
+    parser.add_argument("--graceful-timeout", type=int, default=GRACEFUL_TIMEOUT,
+                        help="seconds in-flight requests get to finish on shutdown")
+    parser.add_argument("--cache-url", default=SHARED_CACHE_URL, help="Redis shared by the workers' caches")
+    parser.add_argument("--no-shared-cache", action="store_true", help="keep caches per worker")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args(argv)
+
+    asyncio.run(migrate_once())
+
+    cache_server = None
+    if args.cache_url:
+        share_caches(args.cache_url)
+    elif args.workers > 1 and not args.no_shared_cache:
+        port = free_port()
+        cache_server = start_cache_server(port)
+        share_caches(f"redis://127.0.0.1:{port}/0")
+
+    print(f"Starting {args.workers} worker(s) on {args.host}:{args.port}, each with up to "
+          f"{pool_config['max_size']} database connections ({args.workers * pool_config['max_size']} total)")
+    try:
+        uvicorn.run(
+            "app.main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            timeout_graceful_shutdown=args.graceful_timeout,
+            log_level=args.log_level
+        )
+    finally:
+        if cache_server is not None:
+            cache_server.terminate()
+            cache_server.wait(timeout=10)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,20 @@
 import os
-import oracledb
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar, copy_context
+from functools import partial, wraps
+
 from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.config.migrations import migrate, current_version, get_migration_stats
+from app.config.pool import OraclePool, SQLitePool, PoolTimeout
+from app.config.statements import close_cursors
+from app.config.storage import DB_BACKEND
+from app.utils.metrics import record_pool_wait, register_collector
+from app.utils.profiler import run_tracked
 
 load_dotenv()
 
@@ -10,216 +24,212 @@ db_config = {
     "dsn": f"{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '1521')}/{os.getenv('DB_SID', 'xe')}"
 }
 
-connection = None
+pool_config = {
+    "min_size": int(os.getenv("DB_POOL_MIN", "2")),
+    "max_size": int(os.getenv("DB_POOL_MAX", "10")),
+    "increment": int(os.getenv("DB_POOL_INCREMENT", "1")),
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", "5")),  # seconds to wait for a free connection
+    "ping_interval": int(os.getenv("DB_POOL_PING_INTERVAL", "60")),  # 0 pings on every checkout
+    # Parsed statements kept per connection; sized to hold every registered
+    # statement (app/config/statements.py) with room for ad-hoc ones
+    "stmt_cache_size": int(os.getenv("DB_STMT_CACHE_SIZE", "64"))
+}
+
+# Pool creation plus schema migration; going over is logged and shown in /health
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "2000"))
+
+# On shutdown, how long to wait for checked-out connections to be returned
+# before the pool is closed underneath them
+DB_DRAIN_TIMEOUT = float(os.getenv("DB_DRAIN_TIMEOUT", "10"))
+
+# Blocking driver calls run here so they never stall the event loop
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(pool_config["max_size"])))
+
+pool = None
+_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+_checkout_slots = None
+_checkout_stats = {"waiting": 0, "checkouts": 0, "timeouts": 0, "wait_time": 0.0}
+_startup_stats = {"poolMs": None, "totalMs": None, "overBudget": False}
+
+# Connection checked out for the current request by get_db()
+_request_connection = ContextVar("request_connection", default=None)
+
+def create_pool():
+    if DB_BACKEND == "sqlite":
+        return SQLitePool(os.getenv("SQLITE_PATH", "monevo.db"), **pool_config)
+    return OraclePool(**db_config, **pool_config)
+
+async def run_in_db(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    call = partial(copy_context().run, run_tracked, func, *args, **kwargs)
+    return await loop.run_in_executor(_executor, call)
+
+def db_call(func):
+    """Turn a blocking model method into a coroutine that runs on the DB executor."""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_in_db(func, *args, **kwargs)
+    return wrapper
 
-async def init_database():
-    global connection
+async def init_database(migrate_schema=True):
+    global pool, _checkout_slots
+    started = time.perf_counter()
     try:
-        connection = oracledb.connect(**db_config)
-        print("Connected to Oracle Database")
+        pool = await run_in_db(create_pool)
+        # Requests queue here rather than inside pool.acquire(), so waiting
+        # for a connection never ties up an executor thread
+        _checkout_slots = asyncio.Semaphore(pool.max_size)
+        print(f"Created {pool.backend} connection pool (min={pool.min_size}, max={pool.max_size})")
+        _startup_stats["poolMs"] = (time.perf_counter() - started) * 1000
         
-        # Create sequences
-        await create_sequence_if_not_exists("USERS_SEQ")
-        await create_sequence_if_not_exists("TRANSACTIONS_SEQ")
-        await create_sequence_if_not_exists("GOALS_SEQ")
+        conn = await run_in_db(pool.acquire)
+        try:
+            version = await run_in_db(migrate if migrate_schema else current_version, conn)
+        finally:
+            await run_in_db(pool.release, conn)
         
-        # Check and create tables
-        await check_and_create_users_table()
-        await check_and_create_transactions_table()
-        await check_and_create_goals_table()
-        
-        print("Database initialized successfully")
-        return connection
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _startup_stats["totalMs"] = elapsed_ms
+        _startup_stats["overBudget"] = elapsed_ms > STARTUP_BUDGET_MS
+        print(f"Database initialized at schema version {version} in {elapsed_ms:.0f}ms")
+        if elapsed_ms > STARTUP_BUDGET_MS:
+            print(f"Database startup took {elapsed_ms:.0f}ms, over the {STARTUP_BUDGET_MS:.0f}ms budget")
+        return pool
     except Exception as error:
         print(f"Database initialization error: {error}")
         raise error
 
-async def create_sequence_if_not_exists(seq_name):
-    cursor = connection.cursor()
-    try:
-        cursor.execute(f"""
-            BEGIN
-                EXECUTE IMMEDIATE 'CREATE SEQUENCE {seq_name} START WITH 1 INCREMENT BY 1 NOCACHE NOCYCLE';
-            EXCEPTION
-                WHEN OTHERS THEN
-                    IF SQLCODE != -955 THEN
-                        RAISE;
-                    END IF;
-            END;
-        """)
-        connection.commit()
-    finally:
-        cursor.close()
+def get_startup_stats():
+    return {**_startup_stats, "budgetMs": STARTUP_BUDGET_MS, "migrations": get_migration_stats()}
 
-async def check_and_create_users_table():
-    cursor = connection.cursor()
+@asynccontextmanager
+async def checkout():
+    if pool is None:
+        raise RuntimeError("Database connection pool is closed")
+    # The pool and its slots as of this call; close_connection() may clear them
+    slots, timeout = _checkout_slots, pool.timeout
+    started = time.perf_counter()
+    _checkout_stats["waiting"] += 1
     try:
-        cursor.execute("SELECT table_name FROM user_tables WHERE table_name = 'USERS'")
-        table_exists = cursor.fetchone()
-        
-        if not table_exists:
-            await create_users_table()
-            return
-        
-        required_columns = [
-            'ID', 'NAME', 'EMAIL', 'PASSWORD', 'DATE_OF_BIRTH',
-            'IS_ACTIVE', 'LAST_LOGIN', 'CREATED_AT'
-        ]
-        
-        cursor.execute("SELECT column_name FROM user_tab_columns WHERE table_name = 'USERS'")
-        existing_columns = [row[0] for row in cursor.fetchall()]
-        
-        missing_columns = [col for col in required_columns if col not in existing_columns]
-        
-        if missing_columns:
-            print(f"Missing columns in USERS table: {', '.join(missing_columns)}")
-            print("Dropping and recreating USERS table...")
-            cursor.execute('DROP TABLE users CASCADE CONSTRAINTS')
-            await create_users_table()
-        else:
-            print("USERS table exists with all required columns")
-    except Exception as error:
-        print(f"Error checking/creating users table: {error}")
-        raise error
+        await asyncio.wait_for(slots.acquire(), timeout)
+    except asyncio.TimeoutError:
+        _checkout_stats["timeouts"] += 1
+        raise PoolTimeout(f"Timed out after {timeout}s waiting for a database connection")
     finally:
-        cursor.close()
-
-async def create_users_table():
-    cursor = connection.cursor()
+        _checkout_stats["waiting"] -= 1
     try:
-        cursor.execute("""
-            CREATE TABLE users (
-                id NUMBER PRIMARY KEY,
-                name VARCHAR2(100) NOT NULL,
-                email VARCHAR2(255) UNIQUE NOT NULL,
-                password VARCHAR2(255) NOT NULL,
-                date_of_birth DATE NOT NULL,
-                is_active NUMBER(1) DEFAULT 1,
-                last_login TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        connection.commit()
-        print("Created USERS table")
-    finally:
-        cursor.close()
-
-# Similar functions for transactions and goals
-async def check_and_create_transactions_table():
-    cursor = connection.cursor()
+        if pool is None:
+            # Closed while this checkout was queued behind drain()
+            raise RuntimeError("Database connection pool is closed")
+        conn = await run_in_db(pool.acquire)
+    except BaseException:
+        slots.release()
+        raise
+    waited = time.perf_counter() - started
+    _checkout_stats["checkouts"] += 1
+    _checkout_stats["wait_time"] += waited
+    record_pool_wait(waited)
     try:
-        cursor.execute("SELECT table_name FROM user_tables WHERE table_name = 'TRANSACTIONS'")
-        table_exists = cursor.fetchone()
-        
-        if not table_exists:
-            await create_transactions_table()
-            return
-        
-        required_columns = [
-            'ID', 'AMOUNT', 'DESCRIPTION', 'TYPE', 'CATEGORY',
-            'USER_ID', 'DATE_CREATED', 'TRANSACTION_DATE'
-        ]
-        
-        cursor.execute("SELECT column_name FROM user_tab_columns WHERE table_name = 'TRANSACTIONS'")
-        existing_columns = [row[0] for row in cursor.fetchall()]
-        
-        missing_columns = [col for col in required_columns if col not in existing_columns]
-        
-        if missing_columns:
-            print(f"Missing columns in TRANSACTIONS table: {', '.join(missing_columns)}")
-            print("Dropping and recreating TRANSACTIONS table...")
-            cursor.execute('DROP TABLE transactions CASCADE CONSTRAINTS')
-            await create_transactions_table()
-        else:
-            print("TRANSACTIONS table exists with all required columns")
-            
-            cursor.execute("""
-                SELECT constraint_name
-                FROM user_constraints
-                WHERE table_name = 'TRANSACTIONS'
-                AND constraint_name = 'FK_USER_TRANSACTION'
-            """)
-            fk_exists = cursor.fetchone()
-            
-            if not fk_exists:
-                print("Adding foreign key constraint...")
-                cursor.execute("""
-                    ALTER TABLE transactions
-                    ADD CONSTRAINT fk_user_transaction
-                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-                """)
-                connection.commit()
-    except Exception as error:
-        print(f"Error checking/creating transactions table: {error}")
-        raise error
+        yield conn
     finally:
-        cursor.close()
+        try:
+            await run_in_db(release_connection, conn)
+        finally:
+            slots.release()
 
-async def create_transactions_table():
-    cursor = connection.cursor()
+def release_connection(conn):
     try:
-        cursor.execute("""
-            CREATE TABLE transactions (
-                id NUMBER PRIMARY KEY,
-                amount NUMBER NOT NULL,
-                description VARCHAR2(500) NOT NULL,
-                type VARCHAR2(10) NOT NULL,
-                category VARCHAR2(100) NOT NULL,
-                user_id NUMBER NOT NULL,
-                date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                transaction_date DATE NOT NULL,
-                CONSTRAINT fk_user_transaction FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        """)
-        connection.commit()
-        print("Created TRANSACTIONS table with foreign key constraint")
+        close_cursors(conn)
     finally:
-        cursor.close()
+        pool.release(conn)
+
+@asynccontextmanager
+async def bound_connection():
+    """Check out a connection and make it the one get_connection() returns."""
+    async with checkout() as conn:
+        _request_connection.set(conn)
+        try:
+            yield conn
+        finally:
+            _request_connection.set(None)
+
+@asynccontextmanager
+async def db_session():
+    """bound_connection() for request handlers: a pool timeout becomes a 503.
 
-async def check_and_create_goals_table():
-    cursor = connection.cursor()
+    Handlers that do slow non-database work (password hashing) use this
+    around just their queries instead of holding get_db for the whole request.
+    """
     try:
-        cursor.execute("SELECT table_name FROM user_tables WHERE table_name = 'GOALS'")
-        table_exists = cursor.fetchone()
-        
-        if not table_exists:
-            await create_goals_table()
-            return
-        
-        print("GOALS table already exists")
-    except Exception as error:
-        print(f"Error checking/creating goals table: {error}")
-        raise error
-    finally:
-        cursor.close()
+        async with bound_connection() as conn:
+            yield conn
+    except PoolTimeout:
+        raise HTTPException(503, {"success": False, "message": "Database is busy, please try again"})
+
+async def get_db():
+    async with db_session() as conn:
+        yield conn
 
-async def create_goals_table():
-    cursor = connection.cursor()
+def get_connection():
+    conn = _request_connection.get()
+    if conn is None:
+        raise RuntimeError("No database connection bound to this request; depend on get_db")
+    return conn
+
+def get_pool_stats():
+    if not pool:
+        return None
+    checkouts = _checkout_stats["checkouts"]
+    return {
+        **pool.stats(),
+        "waiting": _checkout_stats["waiting"],
+        "checkouts": checkouts,
+        "timeouts": _checkout_stats["timeouts"],
+        "avgWaitMs": (_checkout_stats["wait_time"] / checkouts) * 1000 if checkouts else 0
+    }
+
+def _collect_pool(key):
+    def collect():
+        stats = get_pool_stats()
+        return [((), stats[key])] if stats and stats.get(key) is not None else []
+    return collect
+
+register_collector("monevo_db_pool_busy", "Connections checked out of the pool.", (), _collect_pool("busy"))
+register_collector("monevo_db_pool_open", "Connections open in the pool.", (), _collect_pool("opened"))
+register_collector("monevo_db_pool_waiting", "Requests queued for a connection.", (), _collect_pool("waiting"))
+register_collector("monevo_db_pool_timeouts_total", "Checkouts that gave up waiting for a connection.", (),
+                   _collect_pool("timeouts"), "counter")
+
+@asynccontextmanager
+async def drain(timeout=DB_DRAIN_TIMEOUT):
+    """Wait for every checked-out connection to come back, then hold all the
+    checkout slots until the block exits, so nothing new is checked out
+    meanwhile. Yields False if connections were still out after `timeout`
+    seconds. The slots are given back on exit; checkouts queued behind them
+    then find the pool closed rather than waiting forever.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    slots = _checkout_slots
+    acquired = 0
     try:
-        cursor.execute("""
-            CREATE TABLE goals (
-                id NUMBER PRIMARY KEY,
-                user_id NUMBER NOT NULL,
-                target_amount NUMBER NOT NULL,
-                target_month NUMBER NOT NULL,
-                target_year NUMBER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                CONSTRAINT fk_user_goal FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-                CONSTRAINT unique_user_month_goal UNIQUE (user_id, target_month, target_year)
-            )
-        """)
-        connection.commit()
-        print("Created GOALS table")
+        for _ in range(pool.max_size):
+            try:
+                await asyncio.wait_for(slots.acquire(), max(deadline - loop.time(), 0.01))
+            except asyncio.TimeoutError:
+                break
+            acquired += 1
+        yield acquired == pool.max_size
     finally:
-        cursor.close()
-
-async def get_connection():
-    global connection
-    if not connection:
-        connection = oracledb.connect(**db_config)
-    return connection
+        for _ in range(acquired):
+            slots.release()
 
 async def close_connection():
-    if connection:
-        connection.close()
-        print("Database connection closed")
\ No newline at end of file
+    global pool
+    if pool:
+        async with drain() as idle:
+            if not idle:
+                print(f"{pool.busy} database connection(s) still in use after {DB_DRAIN_TIMEOUT:.0f}s; closing anyway")
+            await run_in_db(pool.close)
+            pool = None
+        print("Database connection pool closed")
@@ -0,0 +1,613 @@
+"""Versioned, forward-only schema migrations run by init_database().
+
+A booting worker reads MAX(version) from schema_migrations; when that is
+already the latest version, that single query is all it does. Otherwise it
+takes the schema_lock lease, re-reads the version (another worker may have
+just finished), applies the pending migrations in order and records each
+one. Every step is safe to re-run: DDL tolerates "already exists" (or,
+for drops, "already gone") and data moves are guarded by the column they
+read from, so a migration interrupted halfway is simply applied again, and
+the first migration also adopts databases created by the old
+check-and-create startup code.
+"""
+import os
+import time
+import uuid
+
+from app.config.storage import storage
+
+# Ids handed out per sequence round trip; bulk inserts draw many at once
+SEQUENCE_CACHE_SIZE = int(os.getenv("SEQUENCE_CACHE_SIZE", "100"))
+MIGRATION_LOCK_TIMEOUT = float(os.getenv("MIGRATION_LOCK_TIMEOUT", "120"))
+# A lease left by a worker that died mid-migration is taken over after this
+MIGRATION_LEASE_SECONDS = float(os.getenv("MIGRATION_LEASE_SECONDS", "300"))
+
+
+class Migration:
+    def __init__(self, version, description, oracle, sqlite):
+        self.version = version
+        self.description = description
+        self.steps = storage.sql(oracle=oracle, sqlite=sqlite)
+
+
+def create(ddl, *then):
+    """Run `ddl`, then `then` only if it created something; a step whose
+    object already exists is skipped with its follow-ups."""
+    def step(cursor):
+        try:
+            cursor.execute(ddl)
+        except Exception as error:
+            if storage.already_exists(error):
+                return
+            raise
+        for statement in then:
+            cursor.execute(statement)
+    return step
+
+
+def drop(ddl):
+    """Run `ddl`, skipping it when what it drops is already gone."""
+    def step(cursor):
+        try:
+            cursor.execute(ddl)
+        except Exception as error:
+            if not storage.already_dropped(error):
+                raise
+    return step
+
+
+def while_column(table, column, *steps):
+    """Run `steps` only while `table` still has `column`, for data moves
+    out of a column that a later step drops."""
+    def step(cursor):
+        if storage.has_column(cursor, table, column):
+            for then in steps:
+                _run(cursor, then)
+    return step
+
+
+ORACLE_BASELINE = [
+    *(create(f"CREATE SEQUENCE {name} START WITH 1 INCREMENT BY 1 CACHE {SEQUENCE_CACHE_SIZE} NOCYCLE")
+      for name in ("users_seq", "transactions_seq", "goals_seq")),
+    # Sequences created before caching was enabled are NOCACHE
+    *(f"ALTER SEQUENCE {name} CACHE {SEQUENCE_CACHE_SIZE}" for name in ("users_seq", "transactions_seq", "goals_seq")),
+    create("""
+        CREATE TABLE users (
+            id NUMBER PRIMARY KEY,
+            name VARCHAR2(100) NOT NULL,
+            email VARCHAR2(255) UNIQUE NOT NULL,
+            password VARCHAR2(255) NOT NULL,
+            date_of_birth DATE NOT NULL,
+            is_active NUMBER(1) DEFAULT 1,
+            last_login TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """),
+    create("""
+        CREATE TABLE transactions (
+            id NUMBER PRIMARY KEY,
+            amount NUMBER NOT NULL,
+            description VARCHAR2(500) NOT NULL,
+            type VARCHAR2(10) NOT NULL,
+            category VARCHAR2(100) NOT NULL,
+            user_id NUMBER NOT NULL,
+            date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            transaction_date DATE NOT NULL
+        )
+    """),
+    create("""
+        ALTER TABLE transactions
+        ADD CONSTRAINT fk_user_transaction
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    """),
+    create("""
+        CREATE TABLE goals (
+            id NUMBER PRIMARY KEY,
+            user_id NUMBER NOT NULL,
+            target_amount NUMBER NOT NULL,
+            target_month NUMBER NOT NULL,
+            target_year NUMBER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT fk_user_goal FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+            CONSTRAINT unique_user_month_goal UNIQUE (user_id, target_month, target_year)
+        )
+    """),
+    create("""
+        CREATE TABLE transaction_rollups (
+            user_id NUMBER NOT NULL,
+            period_year NUMBER(4) NOT NULL,
+            period_month NUMBER(2) NOT NULL,
+            category VARCHAR2(100) NOT NULL,
+            type VARCHAR2(10) NOT NULL,
+            total_amount NUMBER DEFAULT 0 NOT NULL,
+            txn_count NUMBER DEFAULT 0 NOT NULL,
+            CONSTRAINT pk_transaction_rollups PRIMARY KEY (user_id, period_year, period_month, category, type),
+            CONSTRAINT fk_user_rollup FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    """, """
+        INSERT INTO transaction_rollups (user_id, period_year, period_month, category, type, total_amount, txn_count)
+        SELECT user_id, EXTRACT(YEAR FROM transaction_date), EXTRACT(MONTH FROM transaction_date),
+               category, type, SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY user_id, EXTRACT(YEAR FROM transaction_date), EXTRACT(MONTH FROM transaction_date), category, type
+    """),
+    # Change tracking for delta sync
+    create("ALTER TABLE users ADD (sync_version NUMBER DEFAULT 0 NOT NULL)"),
+    *(create(f"ALTER TABLE {table} ADD (change_version NUMBER DEFAULT 0 NOT NULL)") for table in ("transactions", "goals")),
+    *(create(f"ALTER TABLE {table} ADD (updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)") for table in ("transactions", "goals")),
+    create("""
+        CREATE TABLE sync_tombstones (
+            user_id NUMBER NOT NULL,
+            entity VARCHAR2(20) NOT NULL,
+            entity_id NUMBER NOT NULL,
+            change_version NUMBER NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT pk_sync_tombstones PRIMARY KEY (user_id, entity, entity_id),
+            CONSTRAINT fk_user_tombstone FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    """),
+    # Indexes for the hot per-user queries
+    create("CREATE INDEX idx_transactions_user_date ON transactions (user_id, transaction_date, date_created, id)"),
+    create("CREATE INDEX idx_goals_user_period ON goals (user_id, target_year, target_month)"),
+    create("CREATE INDEX idx_transactions_user_change ON transactions (user_id, change_version)"),
+    create("CREATE INDEX idx_goals_user_change ON goals (user_id, change_version)"),
+    create("CREATE INDEX idx_tombstones_user_change ON sync_tombstones (user_id, change_version)")
+]
+
+# Embedded schema: the Oracle tables with dates stored as ISO-8601 text (see
+# SQLiteStorage), VARCHAR2 limits as CHECKs so over-long values fail like they
+# do on Oracle, and sequences as rows of a table
+SQLITE_BASELINE = [
+    """
+    CREATE TABLE IF NOT EXISTS sequences (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO sequences (name, value) VALUES ('users_seq', 0), ('transactions_seq', 0), ('goals_seq', 0)",
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL CHECK (length(name) <= 100),
+        email TEXT UNIQUE NOT NULL CHECK (length(email) <= 255),
+        password TEXT NOT NULL,
+        date_of_birth TEXT NOT NULL,
+        is_active INTEGER DEFAULT 1,
+        last_login TEXT,
+        created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+        sync_version INTEGER DEFAULT 0 NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY,
+        amount REAL NOT NULL,
+        description TEXT NOT NULL CHECK (length(description) <= 500),
+        type TEXT NOT NULL CHECK (length(type) <= 10),
+        category TEXT NOT NULL CHECK (length(category) <= 100),
+        user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        date_created TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+        transaction_date TEXT NOT NULL,
+        change_version INTEGER DEFAULT 0 NOT NULL,
+        updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (user_id, transaction_date, date_created, id)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_user_change ON transactions (user_id, change_version)",
+    """
+    CREATE TABLE IF NOT EXISTS goals (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        target_amount REAL NOT NULL,
+        target_month INTEGER NOT NULL,
+        target_year INTEGER NOT NULL,
+        created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+        change_version INTEGER DEFAULT 0 NOT NULL,
+        updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+        UNIQUE (user_id, target_month, target_year)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_goals_user_period ON goals (user_id, target_year, target_month)",
+    "CREATE INDEX IF NOT EXISTS idx_goals_user_change ON goals (user_id, change_version)",
+    """
+    CREATE TABLE IF NOT EXISTS transaction_rollups (
+        user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        period_year INTEGER NOT NULL,
+        period_month INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        type TEXT NOT NULL,
+        total_amount REAL DEFAULT 0 NOT NULL,
+        txn_count INTEGER DEFAULT 0 NOT NULL,
+        PRIMARY KEY (user_id, period_year, period_month, category, type)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sync_tombstones (
+        user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        entity TEXT NOT NULL,
+        entity_id INTEGER NOT NULL,
+        change_version INTEGER NOT NULL,
+        deleted_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+        PRIMARY KEY (user_id, entity, entity_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_tombstones_user_change ON sync_tombstones (user_id, change_version)"
+]
+
+# Append only; never edit or reorder a migration that has shipped
+# Text search over description and category (GET /api/transactions/search)
+ORACLE_TEXT_SEARCH = [
+    # Preferences live in the CTXSYS dictionary; DRG-10701 (already exists)
+    # surfaces as ORA-20000
+    *(f"""
+        BEGIN
+            {create_preference}
+        EXCEPTION
+            WHEN OTHERS THEN
+                IF SQLCODE != -20000 THEN RAISE; END IF;
+        END;
+    """ for create_preference in (
+        """CTX_DDL.CREATE_PREFERENCE('monevo_txn_datastore', 'MULTI_COLUMN_DATASTORE');
+           CTX_DDL.SET_ATTRIBUTE('monevo_txn_datastore', 'COLUMNS', 'description, category');""",
+        """CTX_DDL.CREATE_PREFERENCE('monevo_txn_wordlist', 'BASIC_WORDLIST');
+           CTX_DDL.SET_ATTRIBUTE('monevo_txn_wordlist', 'PREFIX_INDEX', 'TRUE');
+           CTX_DDL.SET_ATTRIBUTE('monevo_txn_wordlist', 'PREFIX_MIN_LENGTH', '2');
+           CTX_DDL.SET_ATTRIBUTE('monevo_txn_wordlist', 'PREFIX_MAX_LENGTH', '6');"""
+    )),
+    # One index covers both columns through the datastore; writers always
+    # set description, which is what marks a row for re-indexing. FILTER BY
+    # user_id lets the index itself apply the per-user predicate
+    create("""
+        CREATE INDEX idx_transactions_text ON transactions (description)
+        INDEXTYPE IS CTXSYS.CONTEXT
+        FILTER BY user_id
+        PARAMETERS ('DATASTORE monevo_txn_datastore WORDLIST monevo_txn_wordlist
+                     STOPLIST CTXSYS.EMPTY_STOPLIST SYNC (ON COMMIT)')
+    """)
+]
+
+# Contentless FTS5 table keyed by transaction id. The owner column holds a
+# "u<user_id>" token so a search only walks its own user's postings
+SQLITE_TEXT_SEARCH = [
+    create("""
+        CREATE VIRTUAL TABLE transaction_search USING fts5(
+            owner, description, category,
+            content='', prefix='2 3 4', tokenize='unicode61 remove_diacritics 2'
+        )
+    """, """
+        INSERT INTO transaction_search (rowid, owner, description, category)
+        SELECT id, 'u' || user_id, description, category FROM transactions
+    """),
+    """
+    CREATE TRIGGER IF NOT EXISTS transactions_search_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO transaction_search (rowid, owner, description, category)
+        VALUES (new.id, 'u' || new.user_id, new.description, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transactions_search_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transaction_search (transaction_search, rowid, owner, description, category)
+        VALUES ('delete', old.id, 'u' || old.user_id, old.description, old.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transactions_search_update
+    AFTER UPDATE OF description, category, user_id ON transactions BEGIN
+        INSERT INTO transaction_search (transaction_search, rowid, owner, description, category)
+        VALUES ('delete', old.id, 'u' || old.user_id, old.description, old.category);
+        INSERT INTO transaction_search (rowid, owner, description, category)
+        VALUES (new.id, 'u' || new.user_id, new.description, new.category);
+    END
+    """
+]
+
+# Categories as a per-user dictionary (see app/models/category.py):
+# transactions and rollups keep a small integer id instead of the name.
+# Existing names are numbered from 1 per user, in name order
+CATEGORY_BACKFILL = """
+    INSERT INTO categories (user_id, id, name)
+    SELECT user_id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY category), category
+    FROM (SELECT DISTINCT user_id, category FROM transactions) t
+    WHERE NOT EXISTS (SELECT 1 FROM categories c WHERE c.user_id = t.user_id)
+"""
+
+ORACLE_CATEGORIES = [
+    create("""
+        CREATE TABLE categories (
+            user_id NUMBER NOT NULL,
+            id NUMBER NOT NULL,
+            name VARCHAR2(100) NOT NULL,
+            CONSTRAINT pk_categories PRIMARY KEY (user_id, id),
+            CONSTRAINT unique_user_category UNIQUE (user_id, name),
+            CONSTRAINT fk_user_category FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    """),
+    create("ALTER TABLE transactions ADD (category_id NUMBER)"),
+    while_column("transactions", "category", CATEGORY_BACKFILL, """
+        UPDATE transactions t
+        SET category_id = (SELECT c.id FROM categories c WHERE c.user_id = t.user_id AND c.name = t.category)
+        WHERE category_id IS NULL
+    """),
+    create("ALTER TABLE transactions MODIFY (category_id NOT NULL)"),
+    # The text index reads the name through the dictionary from now on; the
+    # text it indexes is unchanged, so only the index metadata is replaced
+    """
+        CREATE OR REPLACE FUNCTION category_name(p_user_id NUMBER, p_id NUMBER) RETURN VARCHAR2 IS
+            v_name categories.name%TYPE;
+        BEGIN
+            SELECT name INTO v_name FROM categories WHERE user_id = p_user_id AND id = p_id;
+            RETURN v_name;
+        EXCEPTION
+            WHEN NO_DATA_FOUND THEN RETURN NULL;
+        END;
+    """,
+    """
+        BEGIN
+            CTX_DDL.SET_ATTRIBUTE('monevo_txn_datastore', 'COLUMNS',
+                                  'description, category_name(user_id, category_id) category');
+        END;
+    """,
+    "ALTER INDEX idx_transactions_text REBUILD PARAMETERS ('REPLACE METADATA DATASTORE monevo_txn_datastore')",
+    drop("ALTER TABLE transactions DROP COLUMN category"),
+    # Rollups are derived data: re-keyed while empty, then rebuilt
+    create("ALTER TABLE transaction_rollups ADD (category_id NUMBER)"),
+    "DELETE FROM transaction_rollups",
+    drop("ALTER TABLE transaction_rollups DROP CONSTRAINT pk_transaction_rollups"),
+    drop("ALTER TABLE transaction_rollups DROP COLUMN category"),
+    create("ALTER TABLE transaction_rollups MODIFY (category_id NOT NULL)"),
+    create("""
+        ALTER TABLE transaction_rollups ADD CONSTRAINT pk_transaction_rollups
+        PRIMARY KEY (user_id, period_year, period_month, category_id, type)
+    """),
+    """
+        INSERT INTO transaction_rollups (user_id, period_year, period_month, category_id, type, total_amount, txn_count)
+        SELECT user_id, EXTRACT(YEAR FROM transaction_date), EXTRACT(MONTH FROM transaction_date),
+               category_id, type, SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY user_id, EXTRACT(YEAR FROM transaction_date), EXTRACT(MONTH FROM transaction_date), category_id, type
+    """
+]
+
+
+def _category_name(row):
+    return f"(SELECT name FROM categories WHERE user_id = {row}.user_id AND id = {row}.category_id)"
+
+
+SQLITE_CATEGORIES = [
+    """
+    CREATE TABLE IF NOT EXISTS categories (
+        user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        id INTEGER NOT NULL,
+        name TEXT NOT NULL CHECK (length(name) <= 100),
+        PRIMARY KEY (user_id, id),
+        UNIQUE (user_id, name)
+    ) WITHOUT ROWID
+    """,
+    # 0 marks a row not moved yet; ids start at 1
+    create("ALTER TABLE transactions ADD COLUMN category_id INTEGER NOT NULL DEFAULT 0"),
+    # The search triggers read the old column, so they go before it does
+    while_column(
+        "transactions", "category",
+        CATEGORY_BACKFILL,
+        """
+        UPDATE transactions
+        SET category_id = (SELECT id FROM categories
+                           WHERE categories.user_id = transactions.user_id AND categories.name = transactions.category)
+        WHERE category_id = 0
+        """,
+        *(f"DROP TRIGGER IF EXISTS transactions_search_{event}" for event in ("insert", "delete", "update")),
+        "ALTER TABLE transactions DROP COLUMN category"
+    ),
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transactions_search_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO transaction_search (rowid, owner, description, category)
+        VALUES (new.id, 'u' || new.user_id, new.description, {_category_name('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transactions_search_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transaction_search (transaction_search, rowid, owner, description, category)
+        VALUES ('delete', old.id, 'u' || old.user_id, old.description, {_category_name('old')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transactions_search_update
+    AFTER UPDATE OF description, category_id, user_id ON transactions BEGIN
+        INSERT INTO transaction_search (transaction_search, rowid, owner, description, category)
+        VALUES ('delete', old.id, 'u' || old.user_id, old.description, {_category_name('old')});
+        INSERT INTO transaction_search (rowid, owner, description, category)
+        VALUES (new.id, 'u' || new.user_id, new.description, {_category_name('new')});
+    END
+    """,
+    # A primary key cannot change in place; rollups are derived data, so
+    # they are rebuilt into a new table that replaces the old one
+    while_column(
+        "transaction_rollups", "category",
+        "DROP TABLE IF EXISTS transaction_rollups_new",
+        """
+        CREATE TABLE transaction_rollups_new (
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            period_year INTEGER NOT NULL,
+            period_month INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            total_amount REAL DEFAULT 0 NOT NULL,
+            txn_count INTEGER DEFAULT 0 NOT NULL,
+            PRIMARY KEY (user_id, period_year, period_month, category_id, type)
+        )
+        """,
+        """
+        INSERT INTO transaction_rollups_new (user_id, period_year, period_month, category_id, type, total_amount, txn_count)
+        SELECT user_id, CAST(strftime('%Y', transaction_date) AS INTEGER), CAST(strftime('%m', transaction_date) AS INTEGER),
+               category_id, type, SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY 1, 2, 3, category_id, type
+        """,
+        "DROP TABLE transaction_rollups",
+        "ALTER TABLE transaction_rollups_new RENAME TO transaction_rollups"
+    )
+]
+
+MIGRATIONS = [
+    Migration(1, "baseline schema", oracle=ORACLE_BASELINE, sqlite=SQLITE_BASELINE),
+    Migration(2, "transaction text search", oracle=ORACLE_TEXT_SEARCH, sqlite=SQLITE_TEXT_SEARCH),
+    Migration(3, "category dictionary", oracle=ORACLE_CATEGORIES, sqlite=SQLITE_CATEGORIES)
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+BOOTSTRAP = storage.sql(oracle=[
+    create("""
+        CREATE TABLE schema_migrations (
+            version NUMBER PRIMARY KEY,
+            description VARCHAR2(200) NOT NULL,
+            duration_ms NUMBER NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """),
+    create("""
+        CREATE TABLE schema_lock (
+            id NUMBER PRIMARY KEY,
+            owner VARCHAR2(64),
+            expires NUMBER DEFAULT 0 NOT NULL
+        )
+    """, "INSERT INTO schema_lock (id, owner, expires) VALUES (1, NULL, 0)")
+], sqlite=[
+    create("""
+        CREATE TABLE schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            duration_ms REAL NOT NULL,
+            applied_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+        )
+    """),
+    create("""
+        CREATE TABLE schema_lock (
+            id INTEGER PRIMARY KEY,
+            owner TEXT,
+            expires REAL DEFAULT 0 NOT NULL
+        )
+    """, "INSERT INTO schema_lock (id, owner, expires) VALUES (1, NULL, 0)")
+])
+
+_stats = {"version": None, "latest": LATEST_VERSION, "applied": [], "metadataQueries": 0, "lockWaitMs": 0.0}
+
+
+def _run(cursor, step):
+    if callable(step):
+        step(cursor)
+    else:
+        cursor.execute(step)
+
+
+def current_version(conn):
+    """MAX(version) from schema_migrations, or None if the table does not exist."""
+    cursor = conn.cursor()
+    try:
+        _stats["metadataQueries"] += 1
+        try:
+            cursor.execute("SELECT MAX(version) FROM schema_migrations")
+        except Exception as error:
+            if storage.missing_table(error):
+                conn.rollback()
+                return None
+            raise
+        version = _stats["version"] = cursor.fetchone()[0] or 0
+        return version
+    finally:
+        cursor.close()
+
+
+def _bootstrap(conn):
+    cursor = conn.cursor()
+    try:
+        for step in BOOTSTRAP:
+            _run(cursor, step)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def _try_lock(conn, owner):
+    cursor = conn.cursor()
+    try:
+        now = time.time()
+        cursor.execute("""
+            UPDATE schema_lock SET owner = :owner, expires = :expires
+            WHERE id = 1 AND (owner IS NULL OR owner = :owner OR expires < :now)
+        """, {"owner": owner, "expires": now + MIGRATION_LEASE_SECONDS, "now": now})
+        conn.commit()
+        return cursor.rowcount == 1
+    finally:
+        cursor.close()
+
+
+def _unlock(conn, owner):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE schema_lock SET owner = NULL, expires = 0 WHERE id = 1 AND owner = :owner", {"owner": owner})
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def _apply(conn, migration):
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        for step in migration.steps:
+            _run(cursor, step)
+        duration_ms = (time.perf_counter() - started) * 1000
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, description, duration_ms) VALUES (:version, :description, :duration_ms)",
+            {"version": migration.version, "description": migration.description, "duration_ms": duration_ms}
+        )
+        conn.commit()
+    except Exception:
+        # Oracle DDL commits as it goes; every step is idempotent, so the
+        # next boot simply retries the migration
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    _stats["applied"].append({"version": migration.version, "description": migration.description, "ms": duration_ms})
+    print(f"Applied migration {migration.version} ({migration.description}) in {duration_ms:.0f}ms")
+
+
+def migrate(conn, target=LATEST_VERSION):
+    """Bring the schema up to `target` (the latest version by default);
+    returns the version reached."""
+    version = current_version(conn)
+    if version is not None and version >= target:
+        if version > LATEST_VERSION:
+            print(f"Schema version {version} is newer than this build ({LATEST_VERSION}); not migrating")
+        _stats["version"] = version
+        return version
+
+    if version is None:
+        _bootstrap(conn)
+
+    owner = uuid.uuid4().hex
+    started = time.perf_counter()
+    while not _try_lock(conn, owner):
+        if time.perf_counter() - started > MIGRATION_LOCK_TIMEOUT:
+            raise RuntimeError(f"Timed out after {MIGRATION_LOCK_TIMEOUT}s waiting for the schema migration lock")
+        time.sleep(0.2)
+    _stats["lockWaitMs"] = (time.perf_counter() - started) * 1000
+    try:
+        # Whoever held the lock may have done the work already
+        version = current_version(conn)
+        for migration in MIGRATIONS:
+            if version < migration.version <= target:
+                _apply(conn, migration)
+                version = migration.version
+                # Keep the lease alive across long migrations
+                _try_lock(conn, owner)
+    finally:
+        _unlock(conn, owner)
+    _stats["version"] = version
+    return version
+
+
+def get_migration_stats():
+    return dict(_stats)
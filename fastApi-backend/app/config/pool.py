@@ -0,0 +1,167 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import oracledb
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Sizing and stats shared by every pool backend."""
+
+    def __init__(self, min_size, max_size, increment, timeout, ping_interval, stmt_cache_size=20):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.increment = increment
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.stmt_cache_size = stmt_cache_size
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "min": self.min_size,
+            "max": self.max_size,
+            "increment": self.increment,
+            "stmtCacheSize": self.stmt_cache_size,
+            "opened": self.opened,
+            "busy": self.busy
+        }
+
+
+class OraclePool(ConnectionPool):
+    backend = "oracle"
+
+    def __init__(self, user, password, dsn, **kwargs):
+        super().__init__(**kwargs)
+        self._pool = oracledb.create_pool(
+            user=user,
+            password=password,
+            dsn=dsn,
+            min=self.min_size,
+            max=self.max_size,
+            increment=self.increment,
+            getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+            wait_timeout=int(self.timeout * 1000),
+            ping_interval=self.ping_interval,
+            stmtcachesize=self.stmt_cache_size
+        )
+
+    def acquire(self):
+        try:
+            return self._pool.acquire()
+        except oracledb.Error as error:
+            # DPY-4005: timed out waiting for a free connection
+            if "DPY-4005" in str(error):
+                raise PoolTimeout(str(error)) from error
+            raise
+
+    def release(self, conn):
+        self._pool.release(conn)
+
+    def close(self):
+        self._pool.close(force=True)
+
+    @property
+    def opened(self):
+        return self._pool.opened
+
+    @property
+    def busy(self):
+        return self._pool.busy
+
+
+class SQLitePool(ConnectionPool):
+    """Embedded SQLite connections with the same semantics as the Oracle session pool."""
+
+    backend = "sqlite"
+
+    def __init__(self, database, **kwargs):
+        super().__init__(**kwargs)
+        self.database = database
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._opened = 0
+        self._busy = 0
+        with self._cond:
+            self._grow(self.min_size)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database, check_same_thread=False, timeout=self.timeout, cached_statements=self.stmt_cache_size
+        )
+        # WAL lets readers run alongside the single writer; NORMAL syncs at
+        # checkpoints rather than every commit, which WAL keeps crash-safe
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def _grow(self, count):
+        count = min(count, self.max_size - self._opened)
+        for _ in range(count):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._opened += 1
+        return count
+
+    def _is_alive(self, conn, idle_since):
+        if time.monotonic() - idle_since < self.ping_interval:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if not self._idle and not self._grow(max(self.increment, 1)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if not self._idle:
+                            raise PoolTimeout(f"Timed out after {self.timeout}s waiting for a database connection")
+                    continue
+                conn, idle_since = self._idle.pop()
+                if not self._is_alive(conn, idle_since):
+                    self._opened -= 1
+                    try:
+                        conn.close()
+                    except sqlite3.Error:
+                        pass
+                    continue
+                self._busy += 1
+                return conn
+
+    def release(self, conn):
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            conn = None
+        with self._cond:
+            self._busy -= 1
+            if conn is None:
+                self._opened -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                conn.close()
+                self._opened -= 1
+
+    @property
+    def opened(self):
+        return self._opened
+
+    @property
+    def busy(self):
+        return self._busy
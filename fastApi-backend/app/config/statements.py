@@ -0,0 +1,195 @@
+import threading
+import time
+
+from app.config.storage import storage
+from app.utils.metrics import record_db, register_collector
+
+_lock = threading.Lock()
+
+# Every named statement, so stats can be listed and the statement cache
+# sized to hold them all
+STATEMENTS = {}
+
+# Cursors kept open per checked-out connection for statements registered
+# with reuse=True. The pool hands out a new connection object on every
+# acquire, so they live until checkout() releases the connection (and
+# close_cursors() drops the entry); parses are shared across checkouts by the
+# session statement cache instead. A plain dict: sqlite3 connections cannot
+# be weakly referenced.
+_cursors = {}
+
+
+class Statement:
+    """A named SQL statement with its bind types and execution counters.
+
+    `input_sizes` are passed to setinputsizes() before every execute on
+    Oracle so the bind types never change between calls and the cached parse
+    is reused. `sql` is composed for the active engine (app/config/storage.py).
+    With `reuse`, fetch_all()/fetch_one() keep one open cursor per
+    checked-out connection for this statement instead of opening and
+    closing one per call; only use it for statements that are always fully
+    fetched.
+    """
+
+    __slots__ = ("name", "sql", "input_sizes", "reuse", "calls", "errors", "rows", "total_time", "max_time")
+
+    def __init__(self, name, sql, input_sizes=None, reuse=False):
+        self.name = name
+        self.sql = sql
+        self.input_sizes = input_sizes or {}
+        self.reuse = reuse
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, elapsed, rows=0, failed=False):
+        record_db(elapsed, rows)
+        with _lock:
+            self.calls += 1
+            self.rows += rows
+            self.total_time += elapsed
+            if elapsed > self.max_time:
+                self.max_time = elapsed
+            if failed:
+                self.errors += 1
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "totalMs": self.total_time * 1000,
+            "avgMs": self.total_time / self.calls * 1000 if self.calls else 0,
+            "maxMs": self.max_time * 1000
+        }
+
+
+def statement(name, sql, input_sizes=None, reuse=False):
+    """Register a statement under `name`. Pass sql=None for statements whose
+    text is built per call (then given to execute() as `sql`)."""
+    if name in STATEMENTS:
+        raise ValueError(f"Statement {name!r} is already registered")
+    stmt = STATEMENTS[name] = Statement(name, sql, input_sizes, reuse)
+    return stmt
+
+
+def _execute(cursor, stmt, params, sql, row_type):
+    storage.before_execute(cursor, stmt.input_sizes, row_type)
+    cursor.execute(sql or stmt.sql, params or {})
+    storage.after_execute(cursor, row_type)
+    return cursor
+
+
+def execute(cursor, stmt, params=None, sql=None, row_type=None):
+    """Execute `stmt` on the caller's cursor, counting it towards the
+    statement's stats. Rows fetched afterwards are not counted or timed."""
+    started = time.perf_counter()
+    failed = True
+    try:
+        _execute(cursor, stmt, params, sql, row_type)
+        failed = False
+        return cursor
+    finally:
+        stmt.record(time.perf_counter() - started, failed=failed)
+
+
+def next_ids(cursor, stmt, n=1):
+    """Draw `n` values from a sequence registered with storage.sequence_sql()."""
+    return storage.sequence_values(execute(cursor, stmt, {"n": n}), n)
+
+
+def execute_many(cursor, stmt, rows, batch_errors=False):
+    """executemany() counterpart of execute(); every row counts towards `rows`.
+    With batch_errors, returns {offset: message} for the rows that failed."""
+    started = time.perf_counter()
+    failed = True
+    try:
+        storage.before_execute(cursor, stmt.input_sizes, None)
+        errors = storage.execute_many(cursor, stmt.sql, rows, batch_errors)
+        failed = False
+        return errors
+    finally:
+        stmt.record(time.perf_counter() - started, len(rows), failed)
+
+
+def _cursor_for(conn, stmt):
+    if not stmt.reuse:
+        return conn.cursor()
+    cursors = _cursors.get(conn)
+    if cursors is None:
+        cursors = _cursors[conn] = {}
+    cursor = cursors.get(stmt.name)
+    if cursor is None:
+        cursor = cursors[stmt.name] = conn.cursor()
+    return cursor
+
+
+def _fetch(conn, stmt, params, sql, row_type, one):
+    cursor = _cursor_for(conn, stmt)
+    started = time.perf_counter()
+    failed = True
+    rows = 0
+    try:
+        _execute(cursor, stmt, params, sql, row_type)
+        if one:
+            result = cursor.fetchone()
+            rows = 0 if result is None else 1
+            if result is not None and stmt.reuse:
+                # Leave the reused cursor with nothing pending
+                cursor.fetchall()
+        else:
+            result = cursor.fetchall()
+            rows = len(result)
+        failed = False
+        return result
+    finally:
+        stmt.record(time.perf_counter() - started, rows, failed)
+        if not stmt.reuse:
+            cursor.close()
+        elif failed:
+            # A cursor that errored mid-statement is not worth keeping
+            _cursors.get(conn, {}).pop(stmt.name, None)
+            cursor.close()
+
+
+def close_cursors(conn):
+    """Close the reused cursors of a connection about to go back to the pool."""
+    for cursor in _cursors.pop(conn, {}).values():
+        cursor.close()
+
+
+def fetch_all(conn, stmt, params=None, sql=None, row_type=None):
+    """Execute `stmt` and fetch every row, timing the execute and fetch together.
+    `row_type` (TransactionRow, GoalRow) is used as the rowfactory."""
+    return _fetch(conn, stmt, params, sql, row_type, one=False)
+
+
+def fetch_one(conn, stmt, params=None, sql=None, row_type=None):
+    return _fetch(conn, stmt, params, sql, row_type, one=True)
+
+
+def get_statement_stats():
+    return {name: stmt.stats() for name, stmt in STATEMENTS.items() if stmt.calls}
+
+
+def _collect(attr):
+    return lambda: [((stmt.name,), getattr(stmt, attr)) for stmt in STATEMENTS.values() if stmt.calls]
+
+
+register_collector("monevo_db_statement_calls_total", "Executions per registered statement.",
+                   ("statement",), _collect("calls"), "counter")
+register_collector("monevo_db_statement_errors_total", "Failed executions per registered statement.",
+                   ("statement",), _collect("errors"), "counter")
+register_collector("monevo_db_statement_seconds_total", "Execute and fetch time per registered statement.",
+                   ("statement",), _collect("total_time"), "counter")
+register_collector("monevo_db_statement_rows_total", "Rows fetched or written per registered statement.",
+                   ("statement",), _collect("rows"), "counter")
+
+
+def reset_statement_stats():
+    with _lock:
+        for stmt in STATEMENTS.values():
+            stmt.calls = stmt.errors = stmt.rows = 0
+            stmt.total_time = stmt.max_time = 0.0
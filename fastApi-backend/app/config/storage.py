@@ -0,0 +1,309 @@
+import os
+import sqlite3
+
+import oracledb
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "oracle", or "sqlite" for the embedded engine used by small single-node
+# deployments, tests and benchmarks
+DB_BACKEND = os.getenv("DB_BACKEND", "oracle")
+
+
+class Storage:
+    """What differs between database engines, so models can write one query.
+
+    SQL fragments (date formatting, date binds, limits, locking) are composed
+    into statement text when the statement is registered, and the driver
+    differences (sequences, RETURNING, batch errors, row factories) are
+    methods the statement registry and models call.
+    """
+
+    name = None
+
+    def sql(self, **variants):
+        """Pick the statement text for this engine when a query cannot be
+        written once, e.g. storage.sql(oracle=MERGE_SQL, sqlite=UPSERT_SQL)."""
+        return variants[self.name]
+
+    def begin_write(self, cursor):
+        """Called before a read-then-write so no other writer can slip in between."""
+
+    def before_execute(self, cursor, input_sizes, row_type):
+        pass
+
+    def after_execute(self, cursor, row_type):
+        pass
+
+    def set_fetch_size(self, cursor, rows):
+        cursor.arraysize = rows
+
+    def missing_table(self, error):
+        """The error says a referenced table does not exist."""
+        return False
+
+    def already_exists(self, error):
+        """The error says a DDL object (table, column, index, constraint) exists."""
+        return False
+
+    def already_dropped(self, error):
+        """The error says the object a DROP names (column, constraint) is gone."""
+        return False
+
+    def has_column(self, cursor, table, column):
+        cursor.execute(self.column_exists_sql, {"table_name": table, "column_name": column})
+        return cursor.fetchone()[0] > 0
+
+
+class OracleStorage(Storage):
+    name = "oracle"
+
+    now = "CURRENT_TIMESTAMP"
+    for_update = "FOR UPDATE"
+    column_exists_sql = """
+        SELECT COUNT(*) FROM user_tab_columns
+        WHERE table_name = UPPER(:table_name) AND column_name = UPPER(:column_name)
+    """
+
+    def date_text(self, column):
+        return f"TO_CHAR({column}, 'YYYY-MM-DD')"
+
+    def timestamp_text(self, column, digits=3):
+        return f"""TO_CHAR({column}, 'YYYY-MM-DD"T"HH24:MI:SS.FF{digits}')"""
+
+    def double(self, column):
+        # Amounts are unconstrained NUMBERs, which the driver hands back as
+        # int when the value is whole; the API has always sent floats
+        return f"CAST({column} AS BINARY_DOUBLE)"
+
+    def to_date(self, bind):
+        return f"TO_DATE({bind}, 'YYYY-MM-DD')"
+
+    def day_after(self, bind):
+        return f"TO_DATE({bind}, 'YYYY-MM-DD') + 1"
+
+    def to_timestamp(self, bind):
+        return f"""TO_TIMESTAMP({bind}, 'YYYY-MM-DD"T"HH24:MI:SS.FF6')"""
+
+    def year(self, column):
+        return f"EXTRACT(YEAR FROM {column})"
+
+    def month(self, column):
+        return f"EXTRACT(MONTH FROM {column})"
+
+    def day(self, column):
+        return f"EXTRACT(DAY FROM {column})"
+
+    def week(self, column):
+        return f"TRUNC((EXTRACT(DAY FROM {column}) - 1) / 7)"
+
+    def limit(self, bind, offset=None):
+        if offset:
+            return f"OFFSET {offset} ROWS FETCH NEXT {bind} ROWS ONLY"
+        return f"FETCH FIRST {bind} ROWS ONLY"
+
+    def text_query(self, terms):
+        """Oracle Text CONTAINS query requiring every (word, prefix) term.
+        Words are letters and digits only; whole words go in braces so a
+        word like "and" is not read as an operator."""
+        return " AND ".join(f"{word}%" if prefix else f"{{{word}}}" for word, prefix in terms)
+
+    def sequence_sql(self, sequence):
+        # Draws :n values in one round trip; the sequences are cached
+        return f"SELECT {sequence}.NEXTVAL FROM DUAL CONNECT BY LEVEL <= :n"
+
+    def sequence_values(self, cursor, n):
+        return [row[0] for row in cursor.fetchall()]
+
+    def returning(self, column):
+        return f"RETURNING {column} INTO :returned"
+
+    def returning_binds(self, cursor, type_):
+        return {"returned": cursor.var(type_)}
+
+    def returned_value(self, cursor, binds):
+        return binds["returned"].getvalue()[0]
+
+    def before_execute(self, cursor, input_sizes, row_type):
+        if input_sizes:
+            cursor.setinputsizes(**input_sizes)
+        if row_type is not None:
+            # Type handlers apply at execute; the rowfactory is reset by
+            # every execute, so it goes on in after_execute()
+            cursor.outputtypehandler = fractional_numbers_as_float
+
+    def after_execute(self, cursor, row_type):
+        if row_type is not None:
+            cursor.rowfactory = row_type
+
+    def execute_many(self, cursor, sql, rows, batch_errors=False):
+        """executemany(); with batch_errors, failed rows are skipped and
+        returned as {offset: message} instead of failing the batch."""
+        cursor.executemany(sql, rows, batcherrors=batch_errors)
+        if not batch_errors:
+            return {}
+        return {error.offset: error.message for error in cursor.getbatcherrors()}
+
+    def set_fetch_size(self, cursor, rows):
+        cursor.arraysize = rows
+        cursor.prefetchrows = rows + 1
+
+    def _code(self, error):
+        if isinstance(error, oracledb.DatabaseError) and error.args:
+            return getattr(error.args[0], "code", None)
+        return None
+
+    def missing_table(self, error):
+        # ORA-00942: table or view does not exist
+        return self._code(error) == 942
+
+    def already_exists(self, error):
+        # ORA-00955 name already used, ORA-01430 column already exists,
+        # ORA-01408 column list already indexed, ORA-01442 column already NOT
+        # NULL, ORA-02260/02261 key already exists, ORA-02264 constraint name
+        # used, ORA-02275 FK already exists
+        return self._code(error) in (955, 1430, 1408, 1442, 2260, 2261, 2264, 2275)
+
+    def already_dropped(self, error):
+        # ORA-00904 invalid identifier (column), ORA-02443 nonexistent constraint
+        return self._code(error) in (904, 2443)
+
+
+def fractional_numbers_as_float(cursor, metadata):
+    # NUMBER(p, s) columns with a scale are fetched straight into binary
+    # doubles; unconstrained NUMBERs (ids, COUNT(*)) keep coming back as int,
+    # so amount columns are selected through Storage.double()
+    if metadata.type_code is oracledb.DB_TYPE_NUMBER and metadata.scale > 0:
+        return cursor.var(oracledb.DB_TYPE_BINARY_DOUBLE, arraysize=cursor.arraysize)
+
+
+class SQLiteStorage(Storage):
+    """Embedded SQLite in WAL mode (see SQLitePool). Dates are stored as
+    ISO-8601 text in exactly the format the API returns, so formatting is
+    a no-op and comparisons are plain string comparisons."""
+
+    name = "sqlite"
+
+    now = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+    # Rows are locked by begin_write() instead
+    for_update = ""
+    column_exists_sql = "SELECT COUNT(*) FROM pragma_table_info(:table_name) WHERE name = :column_name"
+
+    def __init__(self):
+        self._row_factories = {}
+
+    def date_text(self, column):
+        return column
+
+    def timestamp_text(self, column, digits=3):
+        return column
+
+    def double(self, column):
+        return column
+
+    def to_date(self, bind):
+        return bind
+
+    def day_after(self, bind):
+        return f"date({bind}, '+1 day')"
+
+    def to_timestamp(self, bind):
+        return bind
+
+    def year(self, column):
+        return f"CAST(strftime('%Y', {column}) AS INTEGER)"
+
+    def month(self, column):
+        return f"CAST(strftime('%m', {column}) AS INTEGER)"
+
+    def day(self, column):
+        return f"CAST(strftime('%d', {column}) AS INTEGER)"
+
+    def week(self, column):
+        return f"(CAST(strftime('%d', {column}) AS INTEGER) - 1) / 7"
+
+    def limit(self, bind, offset=None):
+        if offset:
+            return f"LIMIT {bind} OFFSET {offset}"
+        return f"LIMIT {bind}"
+
+    def text_query(self, terms):
+        """FTS5 MATCH expression requiring every (word, prefix) term in the
+        description or category column of transaction_search."""
+        words = " AND ".join(f'"{word}"*' if prefix else f'"{word}"' for word, prefix in terms)
+        return f"{{description category}} : ({words})"
+
+    def sequence_sql(self, sequence):
+        # Sequences are rows of the sequences table; the bump takes the write
+        # lock, so the range handed out is never shared
+        return f"UPDATE sequences SET value = value + :n WHERE name = '{sequence}' RETURNING value"
+
+    def sequence_values(self, cursor, n):
+        last = cursor.fetchone()[0]
+        return list(range(last - n + 1, last + 1))
+
+    def returning(self, column):
+        return f"RETURNING {column}"
+
+    def returning_binds(self, cursor, type_):
+        return {}
+
+    def returned_value(self, cursor, binds):
+        return cursor.fetchone()[0]
+
+    def begin_write(self, cursor):
+        # A deferred transaction would let another writer commit between our
+        # read and our first write; take the write lock up front instead
+        if not cursor.connection.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+
+    def after_execute(self, cursor, row_type):
+        if row_type is not None:
+            factory = self._row_factories.get(row_type)
+            if factory is None:
+                factory = self._row_factories[row_type] = lambda cursor, row: row_type(*row)
+            cursor.row_factory = factory
+
+    def execute_many(self, cursor, sql, rows, batch_errors=False):
+        if not batch_errors:
+            cursor.executemany(sql, rows)
+            return {}
+        # Try the whole batch first; if any row fails, redo it row by row so
+        # only the failing rows are left out, as Oracle's batcherrors does
+        errors = {}
+        cursor.execute("SAVEPOINT batch_rows")
+        try:
+            cursor.executemany(sql, rows)
+        except sqlite3.DatabaseError:
+            cursor.execute("ROLLBACK TO batch_rows")
+            for offset, row in enumerate(rows):
+                try:
+                    cursor.execute(sql, row)
+                except sqlite3.DatabaseError as error:
+                    errors[offset] = str(error)
+        cursor.execute("RELEASE batch_rows")
+        return errors
+
+    def missing_table(self, error):
+        return isinstance(error, sqlite3.OperationalError) and "no such table" in str(error)
+
+    def already_exists(self, error):
+        message = str(error)
+        return isinstance(error, sqlite3.OperationalError) and (
+            "already exists" in message or "duplicate column name" in message
+        )
+
+    def already_dropped(self, error):
+        return isinstance(error, sqlite3.OperationalError) and "no such column" in str(error)
+
+
+def create_storage(backend):
+    if backend == "sqlite":
+        return SQLiteStorage()
+    if backend == "oracle":
+        return OracleStorage()
+    raise ValueError(f"Unknown DB_BACKEND {backend!r}; expected 'oracle' or 'sqlite'")
+
+
+storage = create_storage(DB_BACKEND)
@@ -1,18 +1,40 @@
 # app/main.py
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from datetime import datetime
 
-from app.config.database import init_database, close_connection
-from app.routers import auth, transaction, goal, report
+from app.config.database import init_database, close_connection, get_pool_stats, get_startup_stats
+from app.config.statements import get_statement_stats
+from app.routers import auth, transaction, goal, report, sync
+from app.models.category import category_cache
+from app.models.user import active_user_cache
+from app.utils.passwords import get_hasher_stats
+from app.utils.report_cache import report_cache
+from app.utils.responses import default_response_class
+from app.utils.metrics import render_metrics
 from app.middleware.auth import authenticate_token
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiler import ProfilerMiddleware
 
 load_dotenv()
 
-app = FastAPI(title="Finance API")
+# Runs once per worker process. Under uvicorn, SIGTERM stops the listener and
+# waits for in-flight requests (see app/commands/serve.py) before the
+# shutdown half runs, which then waits for connections still checked out
+@asynccontextmanager
+async def lifespan(app):
+    await init_database()
+    try:
+        yield
+    finally:
+        await close_connection()
+
+# orjson-rendered responses unless JSON_RESPONSE=json
+app = FastAPI(title="Finance API", default_response_class=default_response_class(), lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -23,11 +45,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in sampling of slow requests (PROFILE_SLOW_REQUESTS or X-Profile)
+app.add_middleware(ProfilerMiddleware)
+
+# Outermost, so CORS preflights and error responses are measured too
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
+# Auth handlers check out connections themselves around their queries
 app.include_router(auth.router, prefix="/api/auth")
 app.include_router(transaction.router, prefix="/api", dependencies=[Depends(authenticate_token)])
 app.include_router(goal.router, prefix="/api", dependencies=[Depends(authenticate_token)])
 app.include_router(report.router, prefix="/api", dependencies=[Depends(authenticate_token)])
+app.include_router(sync.router, prefix="/api", dependencies=[Depends(authenticate_token)])
 
 # Health check
 @app.get("/health")
@@ -35,9 +65,22 @@ async def health():
     return {
         "success": True,
         "message": "Finance API is running",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "worker": os.getpid(),
+        "database": get_pool_stats(),
+        "startup": get_startup_stats(),
+        "authCache": active_user_cache.stats(),
+        "categoryCache": category_cache.stats(),
+        "passwordHasher": get_hasher_stats(),
+        "reportCache": report_cache.stats(),
+        "statements": get_statement_stats()
     }
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # Root
 @app.get("/")
 async def root():
@@ -46,9 +89,11 @@ async def root():
         "message": "Finance API Server",
         "endpoints": {
             "health": "/health",
+            "metrics": "/metrics",
             "auth": "/api/auth",
             "transactions": "/api/transactions",
-            "goals": "/api/goals"
+            "goals": "/api/goals",
+            "sync": "/api/sync"
         }
     }
 
@@ -75,15 +120,7 @@ async def not_found_handler(request: Request, exc: Exception):
         }
     )
 
-# Startup and shutdown
-@app.on_event("startup")
-async def startup():
-    await init_database()
-
-@app.on_event("shutdown")
-async def shutdown():
-    await close_connection()
-
+# Single-process development server; production runs app.commands.serve
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=3000)
\ No newline at end of file
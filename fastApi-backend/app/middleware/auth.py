@@ -2,11 +2,12 @@ from fastapi import HTTPException, Header, Depends
 import jwt
 import os
 
+from app.config.database import get_db
 from app.models.user import User
 
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key")
 
-async def authenticate_token(authorization: str = Header(None)):
+async def authenticate_token(authorization: str = Header(None), db=Depends(get_db)):
     if not authorization:
         raise HTTPException(401, {"success": False, "message": "Access token required"})
     
@@ -14,7 +15,7 @@ async def authenticate_token(authorization: str = Header(None)):
         token = authorization.split(" ")[1]
         decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
         
-        user = await User.get_by_id(decoded["userId"])
+        user = await User.get_active(decoded["userId"])
         if not user:
             raise HTTPException(401, {"success": False, "message": "User not found"})
         
@@ -0,0 +1,64 @@
+import os
+import time
+
+from app.utils.metrics import end_request, observe_request, start_request
+
+# Add a Server-Timing header (db, pool, app and total milliseconds) to every
+# response, for browser dev tools and load test clients
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, response size and the request's
+    database work (see app/utils/metrics.py) per route template.
+
+    Written against the raw ASGI interface rather than BaseHTTPMiddleware so
+    it adds no extra task or response buffering per request.
+    """
+
+    def __init__(self, app, server_timing=METRICS_SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        metrics, token = start_request()
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            elif message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    message = {**message, "headers": [
+                        *message.get("headers", ()),
+                        (b"server-timing", _server_timing(metrics, time.perf_counter() - started))
+                    ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            end_request(token)
+            # The router leaves the matched route in the scope; label by its
+            # template so /api/transactions/1 and /2 share a series
+            route = scope.get("route")
+            observe_request(
+                scope["method"], route.path if route is not None else "unmatched",
+                status, time.perf_counter() - started, size, metrics
+            )
+
+
+def _server_timing(metrics, elapsed):
+    app_time = max(elapsed - metrics.db_time - metrics.pool_wait, 0.0)
+    return (
+        f"db;dur={metrics.db_time * 1000:.2f}, pool;dur={metrics.pool_wait * 1000:.2f}, "
+        f"app;dur={app_time * 1000:.2f}, total;dur={elapsed * 1000:.2f}"
+    ).encode("latin-1")
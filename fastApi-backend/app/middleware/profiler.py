@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+from app.utils.profiler import PROFILE_THRESHOLD_MS, should_profile, start_session, stop_session, write_profile
+
+
+class ProfilerMiddleware:
+    """Sample the stacks of opted-in requests (see app/utils/profiler.py) and
+    keep a profile of those slower than the threshold.
+
+    Requests that are not opted in only pay for the header check.
+    """
+
+    def __init__(self, app, threshold_ms=PROFILE_THRESHOLD_MS):
+        self.app = app
+        self.threshold_ms = threshold_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not should_profile(scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        session, token = start_session(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stop_session(session, token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= self.threshold_ms and session.samples:
+                route = scope.get("route")
+                if route is not None:
+                    session.name = f"{scope['method']} {route.path}"
+                # The response has already been sent; keep the file I/O off the loop
+                await asyncio.get_running_loop().run_in_executor(None, write_profile, session, elapsed_ms)
@@ -0,0 +1,105 @@
+import os
+
+from app.config.statements import statement, execute, execute_many, fetch_all
+from app.utils.cache import TTLCache
+
+# Per-worker copies of users' category dictionaries. Entries never change
+# once committed, so the TTL only bounds memory; a stale copy can lack a
+# category, never name one wrongly
+CATEGORY_CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", "10000"))
+CATEGORY_CACHE_TTL = float(os.getenv("CATEGORY_CACHE_TTL", "3600"))
+
+category_cache = TTLCache(maxsize=CATEGORY_CACHE_SIZE, ttl=CATEGORY_CACHE_TTL)
+
+GET_ALL = statement("categories.get_all", """
+    SELECT name, id FROM categories WHERE user_id = :user_id
+""", {"user_id": int})
+
+INSERT = statement("categories.insert", """
+    INSERT INTO categories (user_id, id, name) VALUES (:user_id, :id, :name)
+""", {"user_id": int, "id": int, "name": 100})
+
+
+def category_name(user_id="transactions.user_id", category_id="transactions.category_id"):
+    """SQL expression for the name behind a category id, for queries that
+    hand rows straight to a person rather than through Category.names()."""
+    return f"""(SELECT name FROM categories
+            WHERE categories.user_id = {user_id} AND categories.id = {category_id})"""
+
+
+class CategoryDictionary:
+    """One user's categories both ways: `ids` by name, and `names` as a list
+    indexed by id (None where no category has that id)."""
+
+    __slots__ = ("ids", "names")
+
+    def __init__(self, rows):
+        self.ids = dict(rows)
+        self.names = [None] * (max(self.ids.values(), default=0) + 1)
+        for name, id_ in self.ids.items():
+            self.names[id_] = name
+
+
+class Category:
+    """Per-user dictionary of category names.
+
+    Transactions and rollups store a category_id numbered from 1 per user,
+    and the name is stored once, in the categories table. Rows are only ever
+    added, and ids are handed out above the highest one, so a cached
+    dictionary that lacks an id is simply older than it and is reloaded.
+    Reads select the id, aggregate by it, and swap in names at the end; the
+    API keeps speaking in names.
+    """
+
+    @staticmethod
+    def names(conn, user_id, max_id=0):
+        """The user's names indexed by id, covering ids up to `max_id`."""
+        dictionary = category_cache.get(user_id)
+        if dictionary is None or max_id >= len(dictionary.names):
+            dictionary = CategoryDictionary(fetch_all(conn, GET_ALL, {"user_id": user_id}))
+            category_cache.set(user_id, dictionary)
+        return dictionary.names
+
+    @staticmethod
+    def name_rows(conn, user_id, rows):
+        """Replace the category id in each row (TRANSACTION_COLUMNS selects
+        the id) with its name, in place; returns `rows`."""
+        if rows:
+            names = Category.names(conn, user_id, max(row.category for row in rows))
+            for row in rows:
+                row.category = names[row.category]
+        return rows
+
+    @staticmethod
+    def id_for(cursor, user_id, name):
+        """The id of `name`, added to the dictionary if new. A name the
+        table rejects raises, as the row being written would have."""
+        ids, _ = Category._resolve(cursor, user_id, {name}, batch_errors=False)
+        return ids[name]
+
+    @staticmethod
+    def ids_for(cursor, user_id, names):
+        """name -> id for every name in `names`, adding the new ones, plus
+        {name: message} for names the table rejected."""
+        return Category._resolve(cursor, user_id, set(names), batch_errors=True)
+
+    @staticmethod
+    def _resolve(cursor, user_id, names, batch_errors):
+        dictionary = category_cache.get(user_id)
+        if dictionary is None or not names <= dictionary.ids.keys():
+            # Read before this transaction adds anything, so only committed
+            # names are cached
+            dictionary = CategoryDictionary(execute(cursor, GET_ALL, {"user_id": user_id}).fetchall())
+            category_cache.set(user_id, dictionary)
+
+        new = sorted(names - dictionary.ids.keys())
+        if not new:
+            return dictionary.ids, {}
+        # Callers hold the user's row lock from Sync.next_version, so no
+        # other writer can hand out the same ids
+        first = len(dictionary.names)
+        rows = [{"user_id": user_id, "id": first + offset, "name": name} for offset, name in enumerate(new)]
+        errors = execute_many(cursor, INSERT, rows, batch_errors=batch_errors)
+        ids = dict(dictionary.ids)
+        ids.update((row["name"], row["id"]) for offset, row in enumerate(rows) if offset not in errors)
+        return ids, {rows[offset]["name"]: message for offset, message in errors.items()}
@@ -1,9 +1,57 @@
-from app.config.database import get_connection
+from app.config.database import get_connection, db_call
+from app.config.statements import statement, execute, next_ids, fetch_all, fetch_one
+from app.config.storage import storage
+from app.models.rows import GOAL_COLUMNS, GoalRow
+from app.models.sync import Sync
+from app.utils.report_cache import report_cache
+
+GET_USER_GOALS_SQL = f"""
+    SELECT {GOAL_COLUMNS}
+    FROM goals
+    WHERE user_id = :user_id
+    ORDER BY target_year DESC, target_month DESC
+"""
+
+GET_USER_GOALS = statement("goals.get_user_goals", GET_USER_GOALS_SQL, {"user_id": int})
+
+GET_BY_MONTH = statement("goals.get_by_month", f"""
+    SELECT {GOAL_COLUMNS}
+    FROM goals
+    WHERE user_id = :user_id AND target_month = :target_month AND target_year = :target_year
+""", {"user_id": int, "target_month": int, "target_year": int}, reuse=True)
+
+LOCK_FOR_WRITE = statement("goals.lock_for_write", f"""
+    SELECT target_year, target_month
+    FROM goals
+    WHERE id = :id AND user_id = :user_id
+    {storage.for_update}
+""", {"id": int, "user_id": int})
+
+NEXT_ID = statement("goals.next_id", storage.sequence_sql("goals_seq"), {"n": int})
+
+WRITE_BINDS = {"id": int, "user_id": int, "target_month": int, "target_year": int, "change_version": int}
+
+INSERT = statement("goals.insert", """
+    INSERT INTO goals (id, user_id, target_amount, target_month, target_year, change_version)
+    VALUES (:id, :user_id, :target_amount, :target_month, :target_year, :change_version)
+""", WRITE_BINDS)
+
+UPDATE = statement("goals.update", f"""
+    UPDATE goals
+    SET target_amount = :target_amount, target_month = :target_month, target_year = :target_year,
+        change_version = :change_version, updated_at = {storage.now}
+    WHERE id = :id AND user_id = :user_id
+""", WRITE_BINDS)
+
+DELETE = statement("goals.delete", """
+    DELETE FROM goals WHERE id = :id AND user_id = :user_id
+""", {"id": int, "user_id": int})
 
 class Goal:
     @staticmethod
-    async def create(goal_data):
-        conn = await get_connection()
+    @db_call
+    def create(goal_data):
+        conn = get_connection()
         cursor = conn.cursor()
         try:
             user_id = goal_data['user_id']
@@ -11,105 +59,87 @@ class Goal:
             target_month = goal_data['target_month']
             target_year = goal_data['target_year']
             
-            cursor.execute("SELECT goals_seq.NEXTVAL AS id FROM DUAL")
-            next_id = cursor.fetchone()[0]
+            version = Sync.next_version(cursor, user_id)
+            next_id = next_ids(cursor, NEXT_ID)[0]
             
-            cursor.execute("""
-                INSERT INTO goals (id, user_id, target_amount, target_month, target_year)
-                VALUES (:id, :user_id, :target_amount, :target_month, :target_year)
-            """, {
+            execute(cursor, INSERT, {
                 "id": next_id,
                 "user_id": user_id,
                 "target_amount": target_amount,
                 "target_month": target_month,
-                "target_year": target_year
+                "target_year": target_year,
+                "change_version": version
             })
             conn.commit()
+            report_cache.invalidate(user_id, [(target_year, target_month)])
             return next_id
         finally:
             cursor.close()
 
     @staticmethod
-    async def get_by_user_and_month(user_id, month, year):
-        conn = await get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                SELECT id, target_amount, target_month, target_year,
-                       TO_CHAR(created_at, 'YYYY-MM-DD"T"HH24:MI:SS.FF3') as created_at
-                FROM goals
-                WHERE user_id = :user_id AND target_month = :target_month AND target_year = :target_year
-            """, {"user_id": user_id, "target_month": month, "target_year": year})
-            row = cursor.fetchone()
-            if not row:
-                return None
-            return {
-                "id": row[0],
-                "target_amount": float(row[1]),
-                "target_month": row[2],
-                "target_year": row[3],
-                "created_at": row[4]
-            }
-        finally:
-            cursor.close()
+    @db_call
+    def get_by_user_and_month(user_id, month, year):
+        params = {"user_id": user_id, "target_month": month, "target_year": year}
+        return fetch_one(get_connection(), GET_BY_MONTH, params, row_type=GoalRow)
 
     @staticmethod
-    async def get_user_goals(user_id):
-        conn = await get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                SELECT id, target_amount, target_month, target_year,
-                       TO_CHAR(created_at, 'YYYY-MM-DD"T"HH24:MI:SS.FF3') as created_at
-                FROM goals
-                WHERE user_id = :user_id
-                ORDER BY target_year DESC, target_month DESC
-            """, {"user_id": user_id})
-            rows = cursor.fetchall()
-            return [{
-                "id": row[0],
-                "target_amount": float(row[1]),
-                "target_month": row[2],
-                "target_year": row[3],
-                "created_at": row[4]
-            } for row in rows]
-        finally:
-            cursor.close()
+    @db_call
+    def get_user_goals(user_id):
+        return fetch_all(get_connection(), GET_USER_GOALS, {"user_id": user_id}, row_type=GoalRow)
 
     @staticmethod
-    async def update(id_, goal_data, user_id):
-        conn = await get_connection()
+    @db_call
+    def update(id_, goal_data, user_id):
+        conn = get_connection()
         cursor = conn.cursor()
         try:
             target_amount = goal_data['target_amount']
             target_month = goal_data['target_month']
             target_year = goal_data['target_year']
             
-            cursor.execute("""
-                UPDATE goals
-                SET target_amount = :target_amount, target_month = :target_month, target_year = :target_year
-                WHERE id = :id AND user_id = :user_id
-            """, {
+            old = Goal._lock_for_write(cursor, id_, user_id)
+            if not old:
+                return False
+            
+            version = Sync.next_version(cursor, user_id)
+            execute(cursor, UPDATE, {
                 "target_amount": target_amount,
                 "target_month": target_month,
                 "target_year": target_year,
+                "change_version": version,
                 "id": id_,
                 "user_id": user_id
             })
             conn.commit()
-            return cursor.rowcount > 0
+            report_cache.invalidate(user_id, {old, (target_year, target_month)})
+            return True
         finally:
             cursor.close()
 
     @staticmethod
-    async def delete(id_, user_id):
-        conn = await get_connection()
+    @db_call
+    def delete(id_, user_id):
+        conn = get_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute("""
-                DELETE FROM goals WHERE id = :id AND user_id = :user_id
-            """, {"id": id_, "user_id": user_id})
+            old = Goal._lock_for_write(cursor, id_, user_id)
+            if not old:
+                return False
+            
+            version = Sync.next_version(cursor, user_id)
+            execute(cursor, DELETE, {"id": id_, "user_id": user_id})
+            Sync.record_delete(cursor, user_id, "goals", id_, version)
             conn.commit()
-            return cursor.rowcount > 0
+            report_cache.invalidate(user_id, [old])
+            return True
         finally:
-            cursor.close()
\ No newline at end of file
+            cursor.close()
+
+    @staticmethod
+    def _lock_for_write(cursor, id_, user_id):
+        # The old period is needed to invalidate its cached reports
+        storage.begin_write(cursor)
+        row = execute(cursor, LOCK_FOR_WRITE, {"id": id_, "user_id": user_id}).fetchone()
+        if not row:
+            return None
+        return row[0], row[1]
\ No newline at end of file
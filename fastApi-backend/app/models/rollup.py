@@ -0,0 +1,191 @@
+from app.config.database import get_connection, db_call
+from app.config.statements import statement, execute, execute_many, fetch_all, fetch_one
+from app.config.storage import storage
+from app.models.category import Category, category_name
+from app.utils.analytics import Aggregates
+
+GET_YEAR_SQL = """
+    SELECT period_month, category_id, type, total_amount, txn_count
+    FROM transaction_rollups
+    WHERE user_id = :user_id AND period_year = :period_year AND txn_count > 0
+    ORDER BY total_amount DESC
+"""
+
+# Months are compared as year * 12 + month - 1 ordinals; the year bounds
+# keep the primary key range scan to the years involved
+GET_RANGE_SQL = """
+    SELECT period_year, period_month, category_id, type, total_amount, txn_count
+    FROM transaction_rollups
+    WHERE user_id = :user_id
+      AND period_year BETWEEN :first_year AND :last_year
+      AND period_year * 12 + period_month - 1 BETWEEN :first_month AND :last_month
+      AND txn_count > 0
+"""
+
+NET_BEFORE_SQL = """
+    SELECT COALESCE(SUM(CASE type WHEN 'income' THEN total_amount WHEN 'expense' THEN -total_amount ELSE 0 END), 0)
+    FROM transaction_rollups
+    WHERE user_id = :user_id
+      AND period_year <= :first_year
+      AND period_year * 12 + period_month - 1 < :first_month
+"""
+
+MERGE_SQL = """
+    MERGE INTO transaction_rollups r
+    USING (
+        SELECT :user_id AS user_id, :period_year AS period_year, :period_month AS period_month,
+               :category_id AS category_id, :type AS type
+        FROM DUAL
+    ) s
+    ON (r.user_id = s.user_id AND r.period_year = s.period_year AND r.period_month = s.period_month
+        AND r.category_id = s.category_id AND r.type = s.type)
+    WHEN MATCHED THEN
+        UPDATE SET r.total_amount = r.total_amount + :amount, r.txn_count = r.txn_count + :txn_count
+    WHEN NOT MATCHED THEN
+        INSERT (user_id, period_year, period_month, category_id, type, total_amount, txn_count)
+        VALUES (s.user_id, s.period_year, s.period_month, s.category_id, s.type, :amount, :txn_count)
+"""
+
+UPSERT_SQL = """
+    INSERT INTO transaction_rollups (user_id, period_year, period_month, category_id, type, total_amount, txn_count)
+    VALUES (:user_id, :period_year, :period_month, :category_id, :type, :amount, :txn_count)
+    ON CONFLICT (user_id, period_year, period_month, category_id, type) DO UPDATE
+    SET total_amount = total_amount + excluded.total_amount, txn_count = txn_count + excluded.txn_count
+"""
+
+MERGE_BINDS = {"user_id": int, "period_year": int, "period_month": int, "category_id": int, "type": 10}
+
+GET_YEAR = statement("rollups.get_year", GET_YEAR_SQL, {"user_id": int, "period_year": int})
+GET_RANGE = statement("rollups.get_range", GET_RANGE_SQL, {
+    "user_id": int, "first_year": int, "last_year": int, "first_month": int, "last_month": int
+})
+NET_BEFORE = statement("rollups.net_before", NET_BEFORE_SQL, {"user_id": int, "first_year": int, "first_month": int})
+MERGE = statement("rollups.merge", storage.sql(oracle=MERGE_SQL, sqlite=UPSERT_SQL), MERGE_BINDS)
+
+YEAR = storage.year("transaction_date")
+MONTH = storage.month("transaction_date")
+
+class Rollup:
+    """Per user/month/category/type totals kept in step with the transactions table.
+
+    apply() is called by every transaction writer on its own cursor, before
+    the writer commits, so a rollup change always lands in the same commit
+    as the row change that caused it.
+    """
+
+    @staticmethod
+    def apply(cursor, user_id, transaction_date, category_id, type_, amount, count):
+        execute(cursor, MERGE, {
+            "user_id": user_id,
+            "period_year": int(transaction_date[0:4]),
+            "period_month": int(transaction_date[5:7]),
+            "category_id": category_id,
+            "type": type_,
+            "amount": amount,
+            "txn_count": count
+        })
+
+    @staticmethod
+    def apply_many(cursor, user_id, transactions):
+        """Fold many inserted transactions into their rollups with one executemany."""
+        groups = {}
+        for t in transactions:
+            date = t["transaction_date"]
+            key = (int(date[0:4]), int(date[5:7]), t["category_id"], t["type"])
+            total, count = groups.get(key, (0, 0))
+            groups[key] = (total + t["amount"], count + 1)
+        if not groups:
+            return
+        execute_many(cursor, MERGE, [{
+            "user_id": user_id,
+            "period_year": year,
+            "period_month": month,
+            "category_id": category_id,
+            "type": type_,
+            "amount": total,
+            "txn_count": count
+        } for (year, month, category_id, type_), (total, count) in groups.items()])
+
+    @staticmethod
+    @db_call
+    def get_year(user_id, year):
+        conn = get_connection()
+        rows = fetch_all(conn, GET_YEAR, {"user_id": user_id, "period_year": year})
+        return Aggregates.from_rollups(rows, Category.names(conn, user_id, max((row[1] for row in rows), default=0)))
+
+    @staticmethod
+    @db_call
+    def get_months(user_id, first, last):
+        """Rollup rows for month ordinals first..last (see app/utils/trends.py),
+        the user's category names by id, and the net of every month before them."""
+        conn = get_connection()
+        rows = fetch_all(conn, GET_RANGE, {
+            "user_id": user_id,
+            "first_year": first // 12,
+            "last_year": last // 12,
+            "first_month": first,
+            "last_month": last
+        })
+        net_before = fetch_one(conn, NET_BEFORE, {"user_id": user_id, "first_year": first // 12, "first_month": first})
+        names = Category.names(conn, user_id, max((row[2] for row in rows), default=0))
+        return rows, names, float(net_before[0])
+
+    @staticmethod
+    def rebuild(conn, user_id=None):
+        """Recompute rollups from the raw rows; commits once."""
+        cursor = conn.cursor()
+        try:
+            user_filter = "WHERE user_id = :user_id" if user_id is not None else ""
+            params = {"user_id": user_id} if user_id is not None else {}
+            cursor.execute(f"DELETE FROM transaction_rollups {user_filter}", params)
+            cursor.execute(f"""
+                INSERT INTO transaction_rollups (user_id, period_year, period_month, category_id, type, total_amount, txn_count)
+                SELECT user_id, {YEAR}, {MONTH}, category_id, type, SUM(amount), COUNT(*)
+                FROM transactions
+                {user_filter}
+                GROUP BY user_id, {YEAR}, {MONTH}, category_id, type
+            """, params)
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def reconcile(conn, user_id=None):
+        """Rollup keys whose totals or counts disagree with the raw rows.
+        Totals are compared with a tolerance: SQLite sums binary doubles."""
+        cursor = conn.cursor()
+        try:
+            user_filter = "WHERE user_id = :user_id" if user_id is not None else ""
+            params = {"user_id": user_id} if user_id is not None else {}
+            category = category_name("COALESCE(r.user_id, t.user_id)", "COALESCE(r.category_id, t.category_id)")
+            cursor.execute(f"""
+                SELECT COALESCE(r.user_id, t.user_id), COALESCE(r.period_year, t.period_year),
+                       COALESCE(r.period_month, t.period_month), {category},
+                       COALESCE(r.type, t.type),
+                       COALESCE(r.total_amount, 0), COALESCE(r.txn_count, 0),
+                       COALESCE(t.total_amount, 0), COALESCE(t.txn_count, 0)
+                FROM (SELECT * FROM transaction_rollups {user_filter}) r
+                FULL OUTER JOIN (
+                    SELECT user_id, {YEAR} AS period_year, {MONTH} AS period_month,
+                           category_id, type, SUM(amount) AS total_amount, COUNT(*) AS txn_count
+                    FROM transactions
+                    {user_filter}
+                    GROUP BY user_id, {YEAR}, {MONTH}, category_id, type
+                ) t
+                ON r.user_id = t.user_id AND r.period_year = t.period_year AND r.period_month = t.period_month
+                   AND r.category_id = t.category_id AND r.type = t.type
+                WHERE ABS(COALESCE(r.total_amount, 0) - COALESCE(t.total_amount, 0)) > 0.000001
+                   OR COALESCE(r.txn_count, 0) != COALESCE(t.txn_count, 0)
+            """, params)
+            return [{
+                "user_id": row[0],
+                "year": row[1],
+                "month": row[2],
+                "category": row[3],
+                "type": row[4],
+                "rollup": {"amount": float(row[5]), "count": row[6]},
+                "actual": {"amount": float(row[7]), "count": row[8]}
+            } for row in cursor.fetchall()]
+        finally:
+            cursor.close()
@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from app.config.storage import storage
+
+# Select lists whose column order matches the row classes below, so the row
+# class itself is the cursor's rowfactory (the row_type of fetch_all() and
+# friends in app/config/statements.py) and no per-row dict is built.
+# Timestamps stay formatted in the database because that string is exactly
+# what the API returns, and amounts are selected as doubles so whole ones
+# still come back as floats. The category comes back as its id and is
+# swapped for the name by Category.name_rows().
+TRANSACTION_COLUMNS = f"""id, {storage.double('amount')} as amount, description, type,
+           category_id as category, {storage.date_text('transaction_date')} as transaction_date,
+           {storage.timestamp_text('date_created')} as date_created"""
+
+GOAL_COLUMNS = f"""id, {storage.double('target_amount')} as target_amount, target_month, target_year,
+           {storage.timestamp_text('created_at')} as created_at"""
+
+
+class Row:
+    """Read-only mapping access (row["amount"]) for code written against
+    the dicts these rows replace."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# Field order is JSON key order: orjson and jsonable_encoder serialize
+# dataclasses field by field, giving the same body the dicts did
+@dataclass(slots=True)
+class TransactionRow(Row):
+    id: int
+    amount: float
+    desc: Optional[str]
+    type: str
+    category: str
+    date: str
+    date_created: str
+
+
+@dataclass(slots=True)
+class GoalRow(Row):
+    id: int
+    target_amount: float
+    target_month: int
+    target_year: int
+    created_at: Optional[str]
+
+
+# Typed shapes of the rows above, used as route response_models so FastAPI
+# serializes them with pydantic-core instead of walking them in jsonable_encoder.
+# Transaction fields are optional because ?fields= can project any subset;
+# routes set response_model_exclude_unset so absent keys stay absent.
+
+class TransactionOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: Optional[int] = None
+    amount: Optional[float] = None
+    desc: Optional[str] = None
+    type: Optional[str] = None
+    category: Optional[str] = None
+    date: Optional[str] = None
+    date_created: Optional[str] = None
+
+class GoalOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    target_amount: float
+    target_month: int
+    target_year: int
+    created_at: Optional[str] = None
+
+class Pagination(BaseModel):
+    limit: int
+    nextCursor: Optional[str] = None
+    hasMore: bool
+
+class TransactionListResponse(BaseModel):
+    success: bool
+    data: List[TransactionOut]
+    pagination: Optional[Pagination] = None
+
+class TransactionResponse(BaseModel):
+    success: bool
+    data: TransactionOut
+
+class GoalListResponse(BaseModel):
+    success: bool
+    data: List[GoalOut]
+
+class GoalResponse(BaseModel):
+    success: bool
+    data: Optional[GoalOut] = None
+
+class DeletedIds(BaseModel):
+    transactions: List[int]
+    goals: List[int]
+
+class SyncChanges(BaseModel):
+    transactions: List[TransactionOut]
+    goals: List[GoalOut]
+    deleted: DeletedIds
+    fullSync: bool
+    cursor: str
+
+class SyncResponse(BaseModel):
+    success: bool
+    data: SyncChanges
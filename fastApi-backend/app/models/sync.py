@@ -0,0 +1,100 @@
+import base64
+import json
+
+from app.config.database import get_connection, db_call
+from app.config.statements import statement, execute, fetch_all, fetch_one
+from app.config.storage import storage
+from app.models.category import Category
+from app.models.rows import TRANSACTION_COLUMNS, GOAL_COLUMNS, TransactionRow, GoalRow
+
+NEXT_VERSION = statement("sync.next_version", f"""
+    UPDATE users
+    SET sync_version = sync_version + 1
+    WHERE id = :user_id
+    {storage.returning('sync_version')}
+""", {"user_id": int})
+
+RECORD_DELETE = statement("sync.record_delete", """
+    INSERT INTO sync_tombstones (user_id, entity, entity_id, change_version)
+    VALUES (:user_id, :entity, :entity_id, :change_version)
+""", {"user_id": int, "entity": 20, "entity_id": int, "change_version": int})
+
+CURRENT_VERSION = statement("sync.current_version", """
+    SELECT sync_version FROM users WHERE id = :user_id
+""", {"user_id": int})
+
+CHANGES_BOUNDS = {"user_id": int, "since": int, "until": int}
+
+CHANGED_TRANSACTIONS = statement("sync.changed_transactions", f"""
+    SELECT {TRANSACTION_COLUMNS}
+    FROM transactions
+    WHERE user_id = :user_id AND change_version > :since AND change_version <= :until
+    ORDER BY change_version
+""", CHANGES_BOUNDS)
+
+CHANGED_GOALS = statement("sync.changed_goals", f"""
+    SELECT {GOAL_COLUMNS}
+    FROM goals
+    WHERE user_id = :user_id AND change_version > :since AND change_version <= :until
+    ORDER BY change_version
+""", CHANGES_BOUNDS)
+
+TOMBSTONES = statement("sync.tombstones", """
+    SELECT entity, entity_id
+    FROM sync_tombstones
+    WHERE user_id = :user_id AND change_version > :since AND change_version <= :until
+    ORDER BY change_version
+""", CHANGES_BOUNDS)
+
+class Sync:
+    """Per-user change tracking for offline clients.
+
+    Every write bumps users.sync_version and stamps the rows it touches with
+    the new value (deletes leave a tombstone instead). The bump locks the
+    user row until commit, so a user's versions are committed in order and
+    any version <= the committed sync_version is safe to hand out.
+    """
+
+    @staticmethod
+    def next_version(cursor, user_id):
+        returned = storage.returning_binds(cursor, int)
+        execute(cursor, NEXT_VERSION, {"user_id": user_id, **returned})
+        return storage.returned_value(cursor, returned)
+
+    @staticmethod
+    def record_delete(cursor, user_id, entity, entity_id, version):
+        execute(cursor, RECORD_DELETE, {
+            "user_id": user_id, "entity": entity, "entity_id": entity_id, "change_version": version
+        })
+
+    @staticmethod
+    @db_call
+    def changes(user_id, since):
+        """Rows created, updated or deleted after version `since` (None for a full sync)."""
+        conn = get_connection()
+        until = fetch_one(conn, CURRENT_VERSION, {"user_id": user_id})[0]
+        changes = {"transactions": [], "goals": [], "deleted": {"transactions": [], "goals": []}}
+        if since is not None and since >= until:
+            return changes, until
+        
+        params = {"user_id": user_id, "since": -1 if since is None else since, "until": until}
+        changes["transactions"] = Category.name_rows(
+            conn, user_id, fetch_all(conn, CHANGED_TRANSACTIONS, params, row_type=TransactionRow)
+        )
+        changes["goals"] = fetch_all(conn, CHANGED_GOALS, params, row_type=GoalRow)
+        
+        # A full sync starts from nothing, so there is nothing to delete
+        if since is not None:
+            for entity, entity_id in fetch_all(conn, TOMBSTONES, params):
+                changes["deleted"][entity].append(entity_id)
+        
+        return changes, until
+
+def encode_sync_cursor(version):
+    return base64.urlsafe_b64encode(json.dumps({"v": version}).encode()).decode()
+
+def decode_sync_cursor(cursor):
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["v"])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid sync cursor")
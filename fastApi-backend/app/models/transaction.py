@@ -1,9 +1,286 @@
-from app.config.database import get_connection
+import base64
+import json
+import os
+import re
+from datetime import datetime
+
+from app.config.database import get_connection, db_call, checkout, run_in_db
+from app.config.statements import statement, execute, execute_many, next_ids, fetch_all, fetch_one
+from app.config.storage import storage
+from app.utils.analytics import Aggregates
+from app.models.category import Category
+from app.models.rollup import Rollup
+from app.models.rows import TRANSACTION_COLUMNS, TransactionRow
+from app.models.sync import Sync
+from app.utils.report_cache import report_cache
+from app.utils.helpers import month_bounds
+
+# API field name -> SQL expression, in the order rows are serialized. The
+# category is fetched as its id and named by get_page
+TRANSACTION_FIELDS = {
+    "id": "id",
+    "amount": storage.double("amount"),
+    "desc": "description",
+    "type": "type",
+    "category": "category_id",
+    "date": storage.date_text("transaction_date"),
+    "date_created": storage.timestamp_text("date_created")
+}
+
+GET_ALL_SQL = f"""
+    SELECT {TRANSACTION_COLUMNS}
+    FROM transactions
+    WHERE user_id = :user_id
+    ORDER BY transaction_date DESC, date_created DESC
+"""
+
+# Half-open date range so the (user_id, transaction_date, ...) index is usable
+MONTH_RANGE = f"""user_id = :user_id
+    AND transaction_date >= {storage.to_date(':start_date')}
+    AND transaction_date < {storage.to_date(':end_date')}"""
+
+# Fully ordered (the index's key order) so reports built from these rows
+# see categories in the same order as the aggregate below
+GET_BY_MONTH_SQL = f"""
+    SELECT {TRANSACTION_COLUMNS}
+    FROM transactions
+    WHERE {MONTH_RANGE}
+    ORDER BY transaction_date DESC, date_created DESC, id DESC
+"""
+
+MONTH = storage.month("transaction_date")
+DAY = storage.day("transaction_date")
+WEEK = storage.week("transaction_date")
+
+# Sortable text for the latest (transaction_date, date_created, id) in a
+# group: category rows are returned latest first, the order in which a walk
+# over GET_BY_MONTH's rows first meets each category, so reports list
+# categories the same way on both paths. The Oracle form aggregates the
+# parts with KEEP and concatenates once per group
+FIRST_SEEN_ORACLE = """TO_CHAR(MAX(transaction_date), 'YYYYMMDD')
+        || TO_CHAR(MAX(date_created) KEEP (DENSE_RANK LAST ORDER BY transaction_date), 'YYYYMMDDHH24MISSFF6')
+        || LPAD(MAX(id) KEEP (DENSE_RANK LAST ORDER BY transaction_date, date_created), 20, '0')"""
+FIRST_SEEN_SQLITE = "MAX(transaction_date || COALESCE(date_created, '') || printf('%020d', id))"
+
+# Grouped-away columns come back NULL; none of them is nullable in the
+# table, so NULL identifies the grouping set of each row. Categories are
+# grouped by id, see Aggregates.from_grouping_sets
+GROUPING_SETS_SQL = f"""
+    SELECT type, category_id, {MONTH} AS month, {DAY} AS day, {WEEK} AS week,
+           SUM(amount) AS total, COUNT(*) AS count
+    FROM transactions
+    WHERE {MONTH_RANGE}
+    GROUP BY GROUPING SETS (
+        (type),
+        (type, category_id),
+        (type, {MONTH}),
+        (type, {DAY}),
+        (type, {WEEK})
+    )
+    ORDER BY {FIRST_SEEN_ORACLE} DESC
+"""
+
+def grouping_set(category="NULL", month="NULL", day="NULL", week="NULL"):
+    grouped = ", ".join(["type"] + [expr for expr in (category, month, day, week) if expr != "NULL"])
+    first_seen = FIRST_SEEN_SQLITE if category != "NULL" else "NULL"
+    return f"""
+        SELECT type, {category} AS category_id, {month} AS month, {day} AS day, {week} AS week,
+               SUM(amount) AS total, COUNT(*) AS count, {first_seen} AS first_seen
+        FROM transactions
+        WHERE {MONTH_RANGE}
+        GROUP BY {grouped}"""
+
+# SQLite has no GROUPING SETS; the same rows as one UNION ALL
+UNION_SQL = f"""
+    SELECT type, category_id, month, day, week, total, count
+    FROM ({" UNION ALL".join([
+        grouping_set(),
+        grouping_set(category="category_id"),
+        grouping_set(month=MONTH),
+        grouping_set(day=DAY),
+        grouping_set(week=WEEK)
+    ])}
+    )
+    ORDER BY first_seen DESC
+"""
+
+AGGREGATE_SQL = storage.sql(oracle=GROUPING_SETS_SQL, sqlite=UNION_SQL)
+
+MONTH_RANGE_BINDS = {"user_id": int, "start_date": 10, "end_date": 10}
+
+GET_ALL = statement("transactions.get_all", GET_ALL_SQL, {"user_id": int})
+GET_BY_MONTH = statement("transactions.get_by_month", GET_BY_MONTH_SQL, MONTH_RANGE_BINDS)
+AGGREGATE = statement("transactions.aggregate", AGGREGATE_SQL, MONTH_RANGE_BINDS)
+# Same text as get_all, counted separately; the statement cache shares the parse
+EXPORT = statement("transactions.export", GET_ALL_SQL, {"user_id": int})
+# Text depends on the requested fields and filters, see build_page_query
+PAGE = statement("transactions.page", None)
+
+GET_BY_ID = statement("transactions.get_by_id", f"""
+    SELECT {TRANSACTION_COLUMNS}
+    FROM transactions
+    WHERE id = :id AND user_id = :user_id
+""", {"id": int, "user_id": int})
+
+# Fixed string sizes so a longer description never forces a rebind
+WRITE_BINDS = {"description": 500, "type": 10, "category_id": int, "transaction_date": 10}
+
+NEXT_ID = statement("transactions.next_id", storage.sequence_sql("transactions_seq"), {"n": int})
+
+# Same text as next_id, counted separately for bulk inserts
+NEXT_IDS = statement("transactions.next_ids", storage.sequence_sql("transactions_seq"), {"n": int})
+
+INSERT = statement("transactions.insert", f"""
+    INSERT INTO transactions (id, amount, description, type, category_id, user_id, transaction_date, change_version)
+    VALUES (:id, :amount, :description, :type, :category_id, :user_id, {storage.to_date(':transaction_date')}, :change_version)
+""", WRITE_BINDS)
+
+UPDATE = statement("transactions.update", f"""
+    UPDATE transactions
+    SET amount = :amount, description = :description, type = :type, category_id = :category_id,
+        transaction_date = {storage.to_date(':transaction_date')},
+        change_version = :change_version, updated_at = {storage.now}
+    WHERE id = :id AND user_id = :user_id
+""", WRITE_BINDS)
+
+DELETE = statement("transactions.delete", """
+    DELETE FROM transactions WHERE id = :id AND user_id = :user_id
+""", {"id": int, "user_id": int})
+
+LOCK_FOR_WRITE = statement("transactions.lock_for_write", f"""
+    SELECT amount, type, category_id, {storage.date_text('transaction_date')}
+    FROM transactions
+    WHERE id = :id AND user_id = :user_id
+    {storage.for_update}
+""", {"id": int, "user_id": int})
+
+# Search ranks at most this many matches (the most recent ones) and pages
+# no deeper, so a common word on a 1M-row user still costs a bounded amount
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "10000"))
+SEARCH_MAX_TERMS = 8
+# Shorter words only match whole words; the text indexes keep prefixes from 2 characters
+SEARCH_PREFIX_MIN = 2
+
+# Higher score is better: Oracle Text's SCORE, or SQLite's bm25() negated.
+# The category counts half as much as the description on SQLite. Both engines
+# take the newest :candidates matches by id (SQLite's rowid) and rank only those
+SEARCH_ORACLE_SQL = f"""
+    SELECT {TRANSACTION_COLUMNS}, score
+    FROM (
+        SELECT /*+ FIRST_ROWS(100) */ id, amount, description, type, category_id,
+               transaction_date, date_created, SCORE(1) AS score
+        FROM transactions
+        WHERE user_id = :user_id AND CONTAINS(description, :query, 1) > 0
+        ORDER BY id DESC
+        {storage.limit(':candidates')}
+    )
+    ORDER BY score DESC, transaction_date DESC, id DESC
+    {storage.limit(':limit', offset=':offset')}
+"""
+
+SEARCH_SQLITE_SQL = f"""
+    SELECT {TRANSACTION_COLUMNS}, -matches.relevance AS score
+    FROM (
+        SELECT rowid, bm25(transaction_search, 0.0, 1.0, 0.5) AS relevance
+        FROM transaction_search
+        WHERE transaction_search MATCH 'owner:u' || :user_id || ' AND ' || :query
+        ORDER BY rowid DESC
+        LIMIT :candidates
+    ) matches
+    JOIN transactions ON transactions.id = matches.rowid
+    WHERE user_id = :user_id
+    ORDER BY matches.relevance, transaction_date DESC, id DESC
+    {storage.limit(':limit', offset=':offset')}
+"""
+
+SEARCH = statement(
+    "transactions.search",
+    storage.sql(oracle=SEARCH_ORACLE_SQL, sqlite=SEARCH_SQLITE_SQL),
+    {"user_id": int, "query": 1000, "candidates": int, "limit": int, "offset": int}
+)
+
+def search_terms(text):
+    """(word, prefix) pairs for a search box string: lowercased runs of
+    letters and digits, each matched as a prefix once it is long enough."""
+    words = list(dict.fromkeys(re.findall(r"[^\W_]+", text.lower())))[:SEARCH_MAX_TERMS]
+    if not words:
+        raise ValueError("Search text must contain a letter or digit")
+    return [(word, len(word) >= SEARCH_PREFIX_MIN) for word in words]
+
+def encode_offset(offset):
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode()).decode()
+
+def decode_offset(cursor):
+    try:
+        offset = int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["offset"])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid pagination cursor")
+    if not 0 <= offset < SEARCH_CANDIDATES:
+        raise ValueError("Invalid pagination cursor")
+    return offset
+
+def encode_cursor(transaction_date, date_created, id_):
+    raw = json.dumps([transaction_date, date_created, id_]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor):
+    try:
+        transaction_date, date_created, id_ = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return {"c_date": str(transaction_date), "c_created": str(date_created), "c_id": int(id_)}
+    except (ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+
+def build_page_query(user_id, limit, after, fields, type_=None, category=None, start_date=None, end_date=None):
+    unknown = [f for f in fields if f not in TRANSACTION_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    for value in (start_date, end_date):
+        if value:
+            datetime.strptime(value, "%Y-%m-%d")
+    
+    conditions = ["user_id = :user_id"]
+    params = {"user_id": user_id, "limit": limit + 1}
+    if type_:
+        conditions.append("type = :type")
+        params["type"] = type_
+    if category:
+        conditions.append("category_id = (SELECT id FROM categories WHERE user_id = :user_id AND name = :category)")
+        params["category"] = category
+    if start_date:
+        conditions.append(f"transaction_date >= {storage.to_date(':start_date')}")
+        params["start_date"] = start_date
+    if end_date:
+        conditions.append(f"transaction_date < {storage.day_after(':end_date')}")
+        params["end_date"] = end_date
+    if after:
+        params.update(decode_cursor(after))
+        c_date, c_created = storage.to_date(":c_date"), storage.to_timestamp(":c_created")
+        conditions.append(f"""(transaction_date < {c_date}
+                OR (transaction_date = {c_date}
+                    AND (date_created < {c_created}
+                         OR (date_created = {c_created} AND id < :c_id))))""")
+    
+    # Keyset columns are always fetched so the next cursor can be built
+    select = [TRANSACTION_FIELDS[f] for f in fields] + [
+        storage.date_text("transaction_date"),
+        storage.timestamp_text("date_created", digits=6),
+        "id"
+    ]
+    
+    sql = f"""
+        SELECT {', '.join(select)}
+        FROM transactions
+        WHERE {' AND '.join(conditions)}
+        ORDER BY transaction_date DESC, date_created DESC, id DESC
+        {storage.limit(':limit')}
+    """
+    return sql, params
 
 class Transaction:
     @staticmethod
-    async def create(transaction_data):
-        conn = await get_connection()
+    @db_call
+    def create(transaction_data):
+        conn = get_connection()
         cursor = conn.cursor()
         try:
             amount = transaction_data['amount']
@@ -13,123 +290,200 @@ class Transaction:
             user_id = transaction_data['user_id']
             transaction_date = transaction_data['transaction_date']
             
-            cursor.execute("SELECT transactions_seq.NEXTVAL AS id FROM DUAL")
-            next_id = cursor.fetchone()[0]
+            version = Sync.next_version(cursor, user_id)
+            category_id = Category.id_for(cursor, user_id, category)
+            next_id = next_ids(cursor, NEXT_ID)[0]
             
-            cursor.execute("""
-                INSERT INTO transactions (id, amount, description, type, category, user_id, transaction_date)
-                VALUES (:id, :amount, :description, :type, :category, :user_id, TO_DATE(:transaction_date, 'YYYY-MM-DD'))
-            """, {
+            execute(cursor, INSERT, {
                 "id": next_id,
                 "amount": amount,
                 "description": description,
                 "type": type_,
-                "category": category,
+                "category_id": category_id,
                 "user_id": user_id,
-                "transaction_date": transaction_date
+                "transaction_date": transaction_date,
+                "change_version": version
             })
+            Rollup.apply(cursor, user_id, transaction_date, category_id, type_, amount, 1)
             conn.commit()
+            report_cache.invalidate(user_id, [report_cache.period(transaction_date)])
             return next_id
         finally:
             cursor.close()
 
     @staticmethod
-    async def get_all(user_id):
-        conn = await get_connection()
+    @db_call
+    def create_many(user_id, transactions):
+        """Insert many rows with one executemany and one commit.
+        Returns an id, or an error message, per input row."""
+        if not transactions:
+            return []
+        conn = get_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute("""
-                SELECT id, amount, description, type, category,
-                       TO_CHAR(date_created, 'YYYY-MM-DD"T"HH24:MI:SS.FF3') as date_created,
-                       TO_CHAR(transaction_date, 'YYYY-MM-DD') as transaction_date
-                FROM transactions
-                WHERE user_id = :user_id
-                ORDER BY transaction_date DESC, date_created DESC
-            """, {"user_id": user_id})
-            rows = cursor.fetchall()
-            return [{
-                "id": row[0],
-                "amount": float(row[1]),
-                "desc": row[2],
-                "type": row[3],
-                "category": row[4],
-                "date": row[6],
-                "date_created": row[5]
-            } for row in rows]
+            version = Sync.next_version(cursor, user_id)
+            category_ids, category_errors = Category.ids_for(cursor, user_id, (t["category"] for t in transactions))
+            
+            # One round trip for all ids; the sequence is cached so this is cheap
+            ids = next_ids(cursor, NEXT_IDS, len(transactions))
+            
+            # A rejected category leaves its rows without an id, and the
+            # NOT NULL column fails them; they report the category's error
+            rows = [{
+                "id": id_,
+                "amount": t["amount"],
+                "description": t["description"],
+                "type": t["type"],
+                "category_id": category_ids.get(t["category"]),
+                "user_id": user_id,
+                "transaction_date": t["transaction_date"],
+                "change_version": version
+            } for id_, t in zip(ids, transactions)]
+            errors = execute_many(cursor, INSERT, rows, batch_errors=True)
+            for i in errors:
+                errors[i] = category_errors.get(transactions[i]["category"], errors[i])
+            inserted = [row for i, row in enumerate(rows) if i not in errors]
+            Rollup.apply_many(cursor, user_id, inserted)
+            conn.commit()
+            report_cache.invalidate(user_id, {report_cache.period(t["transaction_date"]) for t in inserted})
+            return [(None, errors[i]) if i in errors else (id_, None) for i, id_ in enumerate(ids)]
         finally:
             cursor.close()
 
     @staticmethod
-    async def get_by_id(id_, user_id):
-        conn = await get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                SELECT id, amount, description, type, category,
-                       TO_CHAR(date_created, 'YYYY-MM-DD"T"HH24:MI:SS.FF3') as date_created,
-                       TO_CHAR(transaction_date, 'YYYY-MM-DD') as transaction_date
-                FROM transactions
-                WHERE id = :id AND user_id = :user_id
-            """, {"id": id_, "user_id": user_id})
-            row = cursor.fetchone()
-            if not row:
-                return None
-            return {
-                "id": row[0],
-                "amount": float(row[1]),
-                "desc": row[2],
-                "type": row[3],
-                "category": row[4],
-                "date": row[6],
-                "date_created": row[5]
-            }
-        finally:
-            cursor.close()
+    @db_call
+    def get_all(user_id):
+        conn = get_connection()
+        return Category.name_rows(conn, user_id, fetch_all(conn, GET_ALL, {"user_id": user_id}, row_type=TransactionRow))
 
     @staticmethod
-    async def get_by_month(user_id, month, year):
-        conn = await get_connection()
+    @db_call
+    def get_page(user_id, limit, after=None, fields=None, type_=None, category=None, start_date=None, end_date=None):
+        fields = fields or list(TRANSACTION_FIELDS)
+        sql, params = build_page_query(user_id, limit, after, fields, type_, category, start_date, end_date)
+        
+        conn = get_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute("""
-                SELECT id, amount, description, type, category,
-                       TO_CHAR(date_created, 'YYYY-MM-DD"T"HH24:MI:SS.FF3') as date_created,
-                       TO_CHAR(transaction_date, 'YYYY-MM-DD') as transaction_date
-                FROM transactions
-                WHERE user_id = :user_id
-                AND EXTRACT(MONTH FROM transaction_date) = :month
-                AND EXTRACT(YEAR FROM transaction_date) = :year
-                ORDER BY transaction_date DESC
-            """, {"user_id": user_id, "month": month, "year": year})
+            cursor.arraysize = min(limit + 1, 1000)
+            execute(cursor, PAGE, params, sql=sql)
             rows = cursor.fetchall()
-            return [{
-                "id": row[0],
-                "amount": float(row[1]),
-                "desc": row[2],
-                "type": row[3],
-                "category": row[4],
-                "date": row[6],
-                "date_created": row[5]
-            } for row in rows]
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            
+            width = len(fields)
+            names = None
+            if rows and "category" in fields:
+                position = fields.index("category")
+                names = Category.names(conn, user_id, max(row[position] for row in rows))
+            items = []
+            for row in rows:
+                item = dict(zip(fields, row[:width]))
+                if "amount" in item:
+                    item["amount"] = float(item["amount"])
+                if names:
+                    item["category"] = names[item["category"]]
+                items.append(item)
+            
+            next_cursor = encode_cursor(*rows[-1][width:]) if has_more else None
+            return items, next_cursor
         finally:
             cursor.close()
 
     @staticmethod
-    async def delete(id_, user_id):
-        conn = await get_connection()
+    @db_call
+    def search(user_id, text, limit, after=None):
+        """Transactions whose description or category contain every word of
+        `text` (as word prefixes), best match first, with a score each."""
+        offset = decode_offset(after) if after else 0
+        limit = min(limit, SEARCH_CANDIDATES - offset)
+        params = {
+            "user_id": user_id,
+            "query": storage.text_query(search_terms(text)),
+            "candidates": SEARCH_CANDIDATES,
+            "limit": limit + 1,
+            "offset": offset
+        }
+        conn = get_connection()
+        rows = fetch_all(conn, SEARCH, params)
+        has_more = len(rows) > limit and offset + limit < SEARCH_CANDIDATES
+        
+        found = Category.name_rows(conn, user_id, [TransactionRow(*row[:7]) for row in rows[:limit]])
+        items = []
+        for transaction, row in zip(found, rows):
+            item = transaction.to_dict()
+            item["amount"] = float(item["amount"])
+            item["score"] = float(row[7])
+            items.append(item)
+        return items, encode_offset(offset + limit) if has_more else None
+
+    @staticmethod
+    async def iter_batches(user_id, batch_size=1000):
+        # Runs on its own connection: a streamed response outlives the
+        # request-scoped one handed out by get_db
+        async with checkout() as conn:
+            cursor = conn.cursor()
+            try:
+                storage.set_fetch_size(cursor, batch_size)
+                await run_in_db(execute, cursor, EXPORT, {"user_id": user_id}, row_type=TransactionRow)
+                while True:
+                    rows = await run_in_db(cursor.fetchmany, batch_size)
+                    if not rows:
+                        break
+                    yield await run_in_db(Category.name_rows, conn, user_id, rows)
+            finally:
+                cursor.close()
+
+    @staticmethod
+    @db_call
+    def get_by_id(id_, user_id):
+        conn = get_connection()
+        row = fetch_one(conn, GET_BY_ID, {"id": id_, "user_id": user_id}, row_type=TransactionRow)
+        return Category.name_rows(conn, user_id, [row])[0] if row else None
+
+    @staticmethod
+    @db_call
+    def get_by_month(user_id, month, year):
+        start_date, end_date = month_bounds(month, year)
+        params = {"user_id": user_id, "start_date": start_date, "end_date": end_date}
+        conn = get_connection()
+        return Category.name_rows(conn, user_id, fetch_all(conn, GET_BY_MONTH, params, row_type=TransactionRow))
+
+    @staticmethod
+    @db_call
+    def aggregate(user_id, start_date, end_date):
+        """Per-type totals plus per-category, month, day and week sums for
+        start_date <= transaction_date < end_date, aggregated in the database."""
+        params = {"user_id": user_id, "start_date": start_date, "end_date": end_date}
+        conn = get_connection()
+        rows = fetch_all(conn, AGGREGATE, params)
+        names = Category.names(conn, user_id, max((row[1] for row in rows if row[1] is not None), default=0))
+        return Aggregates.from_grouping_sets(rows, names)
+
+    @staticmethod
+    @db_call
+    def delete(id_, user_id):
+        conn = get_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute("""
-                DELETE FROM transactions WHERE id = :id AND user_id = :user_id
-            """, {"id": id_, "user_id": user_id})
+            old = Transaction._lock_for_write(cursor, id_, user_id)
+            if not old:
+                return False
+            
+            version = Sync.next_version(cursor, user_id)
+            execute(cursor, DELETE, {"id": id_, "user_id": user_id})
+            Sync.record_delete(cursor, user_id, "transactions", id_, version)
+            Rollup.apply(cursor, user_id, old["transaction_date"], old["category_id"], old["type"], -old["amount"], -1)
             conn.commit()
-            return cursor.rowcount > 0
+            report_cache.invalidate(user_id, [report_cache.period(old["transaction_date"])])
+            return True
         finally:
             cursor.close()
 
     @staticmethod
-    async def update(id_, transaction_data, user_id):
-        conn = await get_connection()
+    @db_call
+    def update(id_, transaction_data, user_id):
+        conn = get_connection()
         cursor = conn.cursor()
         try:
             amount = transaction_data['amount']
@@ -138,21 +492,38 @@ class Transaction:
             category = transaction_data['category']
             transaction_date = transaction_data['transaction_date']
             
-            cursor.execute("""
-                UPDATE transactions
-                SET amount = :amount, description = :description, type = :type, category = :category,
-                    transaction_date = TO_DATE(:transaction_date, 'YYYY-MM-DD')
-                WHERE id = :id AND user_id = :user_id
-            """, {
+            old = Transaction._lock_for_write(cursor, id_, user_id)
+            if not old:
+                return False
+            
+            version = Sync.next_version(cursor, user_id)
+            category_id = Category.id_for(cursor, user_id, category)
+            execute(cursor, UPDATE, {
                 "amount": amount,
                 "description": description,
                 "type": type_,
-                "category": category,
+                "category_id": category_id,
                 "transaction_date": transaction_date,
+                "change_version": version,
                 "id": id_,
                 "user_id": user_id
             })
+            Rollup.apply(cursor, user_id, old["transaction_date"], old["category_id"], old["type"], -old["amount"], -1)
+            Rollup.apply(cursor, user_id, transaction_date, category_id, type_, amount, 1)
             conn.commit()
-            return cursor.rowcount > 0
+            report_cache.invalidate(user_id, {
+                report_cache.period(old["transaction_date"]),
+                report_cache.period(transaction_date)
+            })
+            return True
         finally:
-            cursor.close()
\ No newline at end of file
+            cursor.close()
+
+    @staticmethod
+    def _lock_for_write(cursor, id_, user_id):
+        # The old values are needed to take the row back out of its rollup
+        storage.begin_write(cursor)
+        row = execute(cursor, LOCK_FOR_WRITE, {"id": id_, "user_id": user_id}).fetchone()
+        if not row:
+            return None
+        return {"amount": row[0], "type": row[1], "category_id": row[2], "transaction_date": row[3]}
\ No newline at end of file
@@ -1,31 +1,105 @@
-import bcrypt
-from app.config.database import get_connection
+import asyncio
+import os
+from app.config.database import get_connection, db_call
+from app.config.statements import statement, execute, next_ids, fetch_one
+from app.config.storage import storage
+from app.utils.cache import TTLCache, RedisBackend, SharedObjectCache
+from app.utils import passwords
+
+# "memory" caches users in each worker; "redis" shares them, so deactivating
+# a user takes effect in every worker at once rather than after the TTL
+AUTH_CACHE_BACKEND = os.getenv("AUTH_CACHE_BACKEND", "memory")
+AUTH_CACHE_URL = os.getenv("AUTH_CACHE_URL", "redis://localhost:6379/0")
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+
+# Active user records looked up by authenticate_token, keyed by user id
+if AUTH_CACHE_BACKEND == "redis":
+    active_user_cache = SharedObjectCache(RedisBackend(AUTH_CACHE_URL, AUTH_CACHE_TTL), prefix="user:")
+else:
+    active_user_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+# Looked up on every authenticated request that misses active_user_cache
+GET_BY_ID = statement("users.get_by_id", f"""
+    SELECT id, name, email, date_of_birth, is_active,
+           {storage.timestamp_text('created_at')} as created_at
+    FROM users
+    WHERE id = :id
+""", {"id": int}, reuse=True)
+
+GET_BY_EMAIL = statement("users.get_by_email", f"""
+    SELECT id, name, email, password, date_of_birth, is_active,
+           {storage.timestamp_text('created_at')} as created_at
+    FROM users
+    WHERE email = :email
+""", {"email": 255})
+
+EMAIL_EXISTS = statement("users.email_exists", """
+    SELECT id FROM users WHERE email = :email
+""", {"email": 255})
+
+NEXT_ID = statement("users.next_id", storage.sequence_sql("users_seq"), {"n": int})
+
+INSERT = statement("users.insert", f"""
+    INSERT INTO users (id, name, email, password, date_of_birth, is_active)
+    VALUES (:id, :name, :email, :password, {storage.to_date(':date_of_birth')}, 1)
+""", {"name": 100, "email": 255, "password": 255, "date_of_birth": 10})
+
+# Written on every login
+UPDATE_LAST_LOGIN = statement("users.update_last_login", f"""
+    UPDATE users
+    SET last_login = {storage.now}
+    WHERE id = :id
+""", {"id": int})
+
+UPDATE_PASSWORD = statement("users.update_password", """
+    UPDATE users
+    SET password = :password
+    WHERE id = :id
+""", {"password": 255, "id": int})
+
+SET_ACTIVE = statement("users.set_active", """
+    UPDATE users
+    SET is_active = :is_active
+    WHERE id = :id
+""", {"is_active": int, "id": int})
+
+async def _cache_call(func, *args):
+    if active_user_cache.remote:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
 
 class User:
     @staticmethod
-    async def create(user_data):
-        conn = await get_connection()
+    @db_call
+    def email_exists(email):
+        return fetch_one(get_connection(), EMAIL_EXISTS, {"email": email}) is not None
+
+    @staticmethod
+    async def hash_password(password):
+        return await passwords.hash_password(password)
+
+    @staticmethod
+    @db_call
+    def create(user_data, hashed_password):
+        """Insert a user whose password was already hashed with User.hash_password,
+        so no connection is held while bcrypt runs."""
+        conn = get_connection()
         cursor = conn.cursor()
         try:
-            name, email, password, date_of_birth = user_data['name'], user_data['email'], user_data['password'], user_data['date_of_birth']
+            name, email, date_of_birth = user_data['name'], user_data['email'], user_data['date_of_birth']
             
-            cursor.execute("SELECT id FROM users WHERE email = :email", {"email": email})
-            if cursor.fetchone():
+            # The router checked too; this catches a concurrent sign-up
+            if execute(cursor, EMAIL_EXISTS, {"email": email}).fetchone():
                 raise ValueError("User with this email already exists")
             
-            hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+            next_id = next_ids(cursor, NEXT_ID)[0]
             
-            cursor.execute("SELECT users_seq.NEXTVAL AS id FROM DUAL")
-            next_id = cursor.fetchone()[0]
-            
-            cursor.execute("""
-                INSERT INTO users (id, name, email, password, date_of_birth, is_active)
-                VALUES (:id, :name, :email, :password, TO_DATE(:date_of_birth, 'YYYY-MM-DD'), 1)
-            """, {
+            execute(cursor, INSERT, {
                 "id": next_id,
                 "name": name,
                 "email": email,
-                "password": hashed_password.decode(),
+                "password": hashed_password,
                 "date_of_birth": date_of_birth
             })
             conn.commit()
@@ -34,70 +108,86 @@ class User:
             cursor.close()
 
     @staticmethod
-    async def get_by_id(user_id):
-        conn = await get_connection()
+    @db_call
+    def get_by_id(user_id):
+        row = fetch_one(get_connection(), GET_BY_ID, {"id": user_id})
+        if not row:
+            return None
+        return {
+            "id": row[0],
+            "name": row[1],
+            "email": row[2],
+            "date_of_birth": row[3],
+            "is_active": row[4] == 1,
+            "created_at": row[5]
+        }
+
+    @staticmethod
+    async def get_active(user_id):
+        user = await _cache_call(active_user_cache.get, user_id)
+        if user is None:
+            user = await User.get_by_id(user_id)
+            if user and user["is_active"]:
+                await _cache_call(active_user_cache.set, user_id, user)
+        return user
+
+    @staticmethod
+    def invalidate(user_id):
+        active_user_cache.invalidate(user_id)
+
+    @staticmethod
+    @db_call
+    def get_by_email(email):
+        row = fetch_one(get_connection(), GET_BY_EMAIL, {"email": email})
+        if not row:
+            return None
+        return {
+            "id": row[0],
+            "name": row[1],
+            "email": row[2],
+            "password": row[3],
+            "date_of_birth": row[4],
+            "is_active": row[5] == 1,
+            "created_at": row[6]
+        }
+
+    @staticmethod
+    @db_call
+    def update_last_login(user_id):
+        conn = get_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute("""
-                SELECT id, name, email, date_of_birth, is_active,
-                       TO_CHAR(created_at, 'YYYY-MM-DD"T"HH24:MI:SS.FF3') as created_at
-                FROM users
-                WHERE id = :id
-            """, {"id": user_id})
-            row = cursor.fetchone()
-            if not row:
-                return None
-            return {
-                "id": row[0],
-                "name": row[1],
-                "email": row[2],
-                "date_of_birth": row[3],
-                "is_active": row[4] == 1,
-                "created_at": row[5]
-            }
+            execute(cursor, UPDATE_LAST_LOGIN, {"id": user_id})
+            conn.commit()
         finally:
             cursor.close()
 
     @staticmethod
-    async def get_by_email(email):
-        conn = await get_connection()
+    @db_call
+    def set_active(user_id, is_active):
+        conn = get_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute("""
-                SELECT id, name, email, password, date_of_birth, is_active,
-                       TO_CHAR(created_at, 'YYYY-MM-DD"T"HH24:MI:SS.FF3') as created_at
-                FROM users
-                WHERE email = :email
-            """, {"email": email})
-            row = cursor.fetchone()
-            if not row:
-                return None
-            return {
-                "id": row[0],
-                "name": row[1],
-                "email": row[2],
-                "password": row[3],
-                "date_of_birth": row[4],
-                "is_active": row[5] == 1,
-                "created_at": row[6]
-            }
+            execute(cursor, SET_ACTIVE, {"is_active": 1 if is_active else 0, "id": user_id})
+            conn.commit()
+            User.invalidate(user_id)
+            return cursor.rowcount > 0
         finally:
             cursor.close()
 
     @staticmethod
-    async def update_last_login(user_id):
-        conn = await get_connection()
+    @db_call
+    def update_password(user_id, hashed_password):
+        conn = get_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute("""
-                UPDATE users
-                SET last_login = CURRENT_TIMESTAMP
-                WHERE id = :id
-            """, {"id": user_id})
+            execute(cursor, UPDATE_PASSWORD, {"password": hashed_password, "id": user_id})
             conn.commit()
         finally:
             cursor.close()
 
     @staticmethod
-    def compare_password(plain_password, hashed_password):
-        return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
\ No newline at end of file
+    async def compare_password(plain_password, hashed_password):
+        """Returns (matches, new_hash); new_hash is a rehash at the current
+        cost factor when the stored one is stale, for update_password()."""
+        return await passwords.verify_password(plain_password, hashed_password)
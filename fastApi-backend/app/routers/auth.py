@@ -5,7 +5,9 @@ from datetime import timedelta, datetime
 
 from app.models.user import User
 from pydantic import BaseModel
+from app.config.database import db_session
 from app.middleware.auth import authenticate_token
+from app.utils.passwords import PasswordHasherBusy
 
 router = APIRouter()
 
@@ -35,11 +37,24 @@ async def register(body: RegisterRequest = Body(...)):
         if len(body.password) < 6:
             raise HTTPException(400, {"success": False, "message": "Password must be at least 6 characters long"})
         
-        user_id = await User.create(body.dict())
+        # Hashing runs on the bcrypt pool between two short connection
+        # checkouts, so a burst of sign-ups never pins database connections
+        async with db_session():
+            if await User.email_exists(body.email):
+                raise ValueError("User with this email already exists")
+        
+        hashed_password = await User.hash_password(body.password)
+        
+        async with db_session():
+            user_id = await User.create(body.dict(), hashed_password)
         
         return {"success": True, "message": "User registered successfully", "data": {"id": user_id}}, 201
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(400, {"success": False, "message": str(e)})
+    except PasswordHasherBusy:
+        raise HTTPException(503, {"success": False, "message": "Server is busy, please try again"})
     except Exception as e:
         raise HTTPException(500, {"success": False, "message": "Failed to register user", "error": str(e)})
 
@@ -49,17 +64,22 @@ async def login(body: LoginRequest = Body(...)):
         if not all([body.email, body.password]):
             raise HTTPException(400, {"success": False, "message": "Email and password are required"})
         
-        user = await User.get_by_email(body.email)
+        async with db_session():
+            user = await User.get_by_email(body.email)
         if not user:
             raise HTTPException(401, {"success": False, "message": "Invalid email or password"})
         
         if not user["is_active"]:
             raise HTTPException(401, {"success": False, "message": "Account is deactivated"})
         
-        if not User.compare_password(body.password, user["password"]):
+        matches, new_hash = await User.compare_password(body.password, user["password"])
+        if not matches:
             raise HTTPException(401, {"success": False, "message": "Invalid email or password"})
         
-        await User.update_last_login(user["id"])
+        async with db_session():
+            if new_hash:
+                await User.update_password(user["id"], new_hash)
+            await User.update_last_login(user["id"])
         
         # Calculate expiration
         expires_delta = timedelta(days=int(JWT_EXPIRES_IN[:-1])) if JWT_EXPIRES_IN.endswith('d') else timedelta(days=7)
@@ -82,6 +102,10 @@ async def login(body: LoginRequest = Body(...)):
                 "expiresIn": JWT_EXPIRES_IN
             }
         }
+    except HTTPException:
+        raise
+    except PasswordHasherBusy:
+        raise HTTPException(503, {"success": False, "message": "Server is busy, please try again"})
     except Exception as e:
         raise HTTPException(500, {"success": False, "message": "Failed to login", "error": str(e)})
 
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Body, Path
 from pydantic import BaseModel
 
 from app.models.goal import Goal
+from app.models.rows import GoalListResponse, GoalResponse
 from app.middleware.auth import authenticate_token
 from fastapi import Depends
 
@@ -27,7 +28,7 @@ async def create_goal(body: GoalRequest = Body(...), user: dict = Depends(authen
     except Exception as e:
         raise HTTPException(500, {"success": False, "message": "Failed to create goal", "error": str(e)})
 
-@router.get("/goals")
+@router.get("/goals", response_model=GoalListResponse, response_model_exclude_unset=True)
 async def get_goals(user: dict = Depends(authenticate_token)):
     try:
         goals = await Goal.get_user_goals(user["id"])
@@ -35,7 +36,7 @@ async def get_goals(user: dict = Depends(authenticate_token)):
     except Exception as e:
         raise HTTPException(500, {"success": False, "message": "Failed to fetch goals", "error": str(e)})
 
-@router.get("/goals/{month}/{year}")
+@router.get("/goals/{month}/{year}", response_model=GoalResponse, response_model_exclude_unset=True)
 async def get_goal_by_month(month: int = Path(...), year: int = Path(...), user: dict = Depends(authenticate_token)):
     try:
         goal = await Goal.get_by_user_and_month(user["id"], month, year)
@@ -1,71 +1,130 @@
-from fastapi import APIRouter, HTTPException, Query
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query, Request
+from calendar import monthrange
+from datetime import datetime, date
+import os
 
 from app.models.transaction import Transaction
 from app.models.goal import Goal
-from app.utils.helpers import calculate_transaction_analytics, calculate_monthly_summary, generate_chart_data, calculate_yearly_analytics, calculate_monthly_breakdown
+from app.models.rollup import Rollup
+from app.utils.helpers import build_monthly_report, build_yearly_report, monthly_report_payload, yearly_report_payload, month_bounds
 from app.middleware.auth import authenticate_token
+from app.utils.report_cache import report_cache
+from app.utils.trends import MAX_TREND_MONTHS, month_ordinal, parse_month, trends_payload
 from fastapi import Depends
 
 router = APIRouter()
 
+# "sql" aggregates in the database; "python" fetches raw rows and aggregates here
+REPORT_AGGREGATION = os.getenv("REPORT_AGGREGATION", "sql")
+
+async def build_monthly_report_response(user_id, target_month, target_year):
+    goal = await Goal.get_by_user_and_month(user_id, target_month, target_year)
+    
+    if REPORT_AGGREGATION == "sql":
+        start_date, end_date = month_bounds(target_month, target_year)
+        agg = await Transaction.aggregate(user_id, start_date, end_date)
+        last_day = date(target_year, target_month, monthrange(target_year, target_month)[1]).isoformat()
+        transactions, _ = await Transaction.get_page(user_id, 50, start_date=start_date, end_date=last_day)
+        analytics, monthly_summary, chart_data = monthly_report_payload(agg, goal, target_month, target_year)
+    else:
+        transactions = await Transaction.get_by_month(user_id, target_month, target_year)
+        analytics, monthly_summary, chart_data = build_monthly_report(transactions, goal, target_month, target_year)
+    
+    return {
+        "success": True,
+        "data": {
+            "period": {
+                "month": target_month,
+                "year": target_year,
+                "monthName": datetime(2000, target_month, 1).strftime("%B")
+            },
+            "summary": monthly_summary,
+            "analytics": analytics,
+            "chartData": chart_data,
+            "transactions": transactions[:50],
+            "generatedAt": datetime.now().isoformat()
+        }
+    }
+
+async def build_yearly_report_response(user_id, target_year):
+    all_goals = await Goal.get_user_goals(user_id)
+    year_goals = [g for g in all_goals if g["target_year"] == target_year]
+    
+    if REPORT_AGGREGATION == "sql":
+        agg = await Rollup.get_year(user_id, target_year)
+        yearly_analytics, monthly_breakdown = yearly_report_payload(agg, year_goals)
+    else:
+        all_transactions = await Transaction.get_all(user_id)
+        year_prefix = f"{target_year:04d}-"
+        year_transactions = [t for t in all_transactions if t["date"].startswith(year_prefix)]
+        yearly_analytics, monthly_breakdown = build_yearly_report(year_transactions, year_goals, target_year)
+    
+    return {
+        "success": True,
+        "data": {
+            "period": {
+                "year": target_year,
+                "type": "yearly"
+            },
+            "summary": yearly_analytics,
+            "monthlyBreakdown": monthly_breakdown,
+            "goalsProgress": year_goals,
+            "generatedAt": datetime.now().isoformat()
+        }
+    }
+
+# Both reports are served through report_cache: writers invalidate the
+# affected month and year, and clients revalidate with If-None-Match
 @router.get("/report")
-async def generate_report(month: int = Query(None), year: int = Query(None), user: dict = Depends(authenticate_token)):
+async def generate_report(request: Request, month: int = Query(None), year: int = Query(None), user: dict = Depends(authenticate_token)):
     try:
         target_month = month or datetime.now().month
         target_year = year or datetime.now().year
         
-        transactions = await Transaction.get_by_month(user["id"], target_month, target_year)
-        goal = await Goal.get_by_user_and_month(user["id"], target_month, target_year)
-        
-        analytics = calculate_transaction_analytics(transactions)
-        monthly_summary = calculate_monthly_summary(transactions, goal)
-        chart_data = generate_chart_data(transactions, target_month, target_year)
-        
-        return {
-            "success": True,
-            "data": {
-                "period": {
-                    "month": target_month,
-                    "year": target_year,
-                    "monthName": datetime(2000, target_month, 1).strftime("%B")
-                },
-                "summary": monthly_summary,
-                "analytics": analytics,
-                "chartData": chart_data,
-                "transactions": transactions[:50],
-                "generatedAt": datetime.now().isoformat()
-            }
-        }
+        key = report_cache.monthly_key(user["id"], target_month, target_year)
+        return await report_cache.respond(
+            request, key, user["id"], lambda: build_monthly_report_response(user["id"], target_month, target_year)
+        )
     except Exception as e:
         raise HTTPException(500, {"success": False, "message": "Failed to generate report", "error": str(e)})
 
 @router.get("/report/yearly")
-async def get_yearly_report(year: int = Query(None), user: dict = Depends(authenticate_token)):
+async def get_yearly_report(request: Request, year: int = Query(None), user: dict = Depends(authenticate_token)):
     try:
         target_year = year or datetime.now().year
         
-        all_transactions = await Transaction.get_all(user["id"])
-        year_transactions = [t for t in all_transactions if datetime.strptime(t["date"], "%Y-%m-%d").year == target_year]
-        
-        all_goals = await Goal.get_user_goals(user["id"])
-        year_goals = [g for g in all_goals if g["target_year"] == target_year]
-        
-        yearly_analytics = calculate_yearly_analytics(year_transactions, year_goals)
-        monthly_breakdown = calculate_monthly_breakdown(year_transactions, target_year)
-        
-        return {
-            "success": True,
-            "data": {
-                "period": {
-                    "year": target_year,
-                    "type": "yearly"
-                },
-                "summary": yearly_analytics,
-                "monthlyBreakdown": monthly_breakdown,
-                "goalsProgress": year_goals,
-                "generatedAt": datetime.now().isoformat()
-            }
-        }
+        key = report_cache.yearly_key(user["id"], target_year)
+        return await report_cache.respond(
+            request, key, user["id"], lambda: build_yearly_report_response(user["id"], target_year)
+        )
+    except Exception as e:
+        raise HTTPException(500, {"success": False, "message": "Failed to generate yearly report", "error": str(e)})
+
+# Computed from the monthly rollups rather than the raw rows, so the cost
+# depends on the number of months and categories, not transactions
+@router.get("/report/trends")
+async def get_trends_report(
+    start: str = Query(None, description="first month, YYYY-MM; defaults to 11 months before end"),
+    end: str = Query(None, description="last month, YYYY-MM; defaults to the current month"),
+    window: int = Query(3, ge=1, le=24, description="months in the rolling averages"),
+    user: dict = Depends(authenticate_token)
+):
+    today = date.today()
+    try:
+        last = parse_month(end) if end else month_ordinal(today.year, today.month)
+        first = parse_month(start) if start else last - 11
+    except ValueError as e:
+        raise HTTPException(400, {"success": False, "message": str(e)})
+    if first > last:
+        raise HTTPException(400, {"success": False, "message": "start must not be after end"})
+    if last - first + 1 > MAX_TREND_MONTHS:
+        raise HTTPException(400, {"success": False, "message": f"At most {MAX_TREND_MONTHS} months per trends report"})
+
+    try:
+        # `window` months of history before the range feed the first months'
+        # rolling averages and deltas
+        rows, names, net_before = await Rollup.get_months(user["id"], first - window, last)
+        data = trends_payload(rows, names, net_before, first, last, window, window, today)
+        return {"success": True, "data": {**data, "generatedAt": datetime.now().isoformat()}}
     except Exception as e:
-        raise HTTPException(500, {"success": False, "message": "Failed to generate yearly report", "error": str(e)})
\ No newline at end of file
+        raise HTTPException(500, {"success": False, "message": "Failed to generate trends report", "error": str(e)})
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, Query, Depends
+
+from app.models.sync import Sync, encode_sync_cursor, decode_sync_cursor
+from app.models.rows import SyncResponse
+from app.middleware.auth import authenticate_token
+
+router = APIRouter()
+
+@router.get("/sync", response_model=SyncResponse, response_model_exclude_unset=True)
+async def sync_changes(since: str = Query(None), user: dict = Depends(authenticate_token)):
+    try:
+        version = decode_sync_cursor(since) if since else None
+        changes, until = await Sync.changes(user["id"], version)
+        return {
+            "success": True,
+            "data": {
+                **changes,
+                "fullSync": version is None,
+                "cursor": encode_sync_cursor(until)
+            }
+        }
+    except ValueError as e:
+        raise HTTPException(400, {"success": False, "message": str(e)})
+    except Exception as e:
+        raise HTTPException(500, {"success": False, "message": "Failed to sync changes", "error": str(e)})
@@ -1,12 +1,37 @@
 from fastapi import APIRouter, HTTPException, Body, Path, Query
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from datetime import datetime
+from typing import List
+import csv
+import io
+import os
+import zlib
 
 from app.models.transaction import Transaction
+from app.models.rows import TransactionListResponse, TransactionResponse
 from app.middleware.auth import authenticate_token
+from app.utils.responses import dumps
 from fastapi import Depends
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# Column widths (VARCHAR2 in Oracle, CHECKs in SQLite), checked up front so
+# single and batch writes report the same message instead of driver text
+MAX_DESCRIPTION_LENGTH = 500
+MAX_CATEGORY_LENGTH = 100
+EXPORT_COLUMNS = ["id", "amount", "desc", "type", "category", "date", "date_created"]
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
 class TransactionRequest(BaseModel):
     amount: float
     desc: str
@@ -14,6 +39,36 @@ class TransactionRequest(BaseModel):
     category: str
     date: str
 
+class TransactionBatchRequest(BaseModel):
+    transactions: List[dict]
+
+def parse_transaction_date(text):
+    """The date as YYYY-MM-DD, zero-padding forms like 2024-3-5 that the
+    format accepts; ValueError for anything that is not a real date."""
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date().isoformat()
+    except (TypeError, ValueError):
+        raise ValueError("Date must be in YYYY-MM-DD format")
+
+def to_transaction_data(body):
+    if len(body.desc) > MAX_DESCRIPTION_LENGTH:
+        raise ValueError(f"Description must be at most {MAX_DESCRIPTION_LENGTH} characters")
+    if len(body.category) > MAX_CATEGORY_LENGTH:
+        raise ValueError(f"Category must be at most {MAX_CATEGORY_LENGTH} characters")
+    return {
+        "amount": body.amount,
+        "description": body.desc,
+        "type": body.type,
+        "category": body.category,
+        "transaction_date": parse_transaction_date(body.date)
+    }
+
+def request_transaction_data(body):
+    try:
+        return to_transaction_data(body)
+    except ValueError as e:
+        raise HTTPException(400, {"success": False, "message": str(e)})
+
 @router.post("/transactions")
 async def create_transaction(body: TransactionRequest = Body(...), user: dict = Depends(authenticate_token)):
     try:
@@ -23,21 +78,168 @@ async def create_transaction(body: TransactionRequest = Body(...), user: dict =
         if body.type not in ["income", "expense"]:
             raise HTTPException(400, {"success": False, "message": 'Type must be either "income" or "expense"'})
         
-        transaction_id = await Transaction.create({**body.dict(), "user_id": user["id"]})
+        data = request_transaction_data(body)
+        transaction_id = await Transaction.create({**data, "user_id": user["id"]})
         
         return {"success": True, "message": "Transaction created successfully", "data": {"id": transaction_id}}, 201
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, {"success": False, "message": "Failed to create transaction", "error": str(e)})
 
-@router.get("/transactions")
-async def get_transactions(user: dict = Depends(authenticate_token)):
+def validate_batch_row(row):
     try:
-        transactions = await Transaction.get_all(user["id"])
-        return {"success": True, "data": transactions}
+        body = TransactionRequest(**row)
+    except ValidationError as e:
+        fields = sorted({str(error["loc"][0]) for error in e.errors()})
+        raise ValueError(f"Invalid or missing fields: {', '.join(fields)}")
+    if not all([body.amount, body.desc, body.type, body.category, body.date]):
+        raise ValueError("All fields are required")
+    if body.type not in ["income", "expense"]:
+        raise ValueError('Type must be either "income" or "expense"')
+    return to_transaction_data(body)
+
+@router.post("/transactions/batch")
+async def create_transactions_batch(body: TransactionBatchRequest = Body(...), user: dict = Depends(authenticate_token)):
+    if len(body.transactions) > MAX_BATCH_SIZE:
+        raise HTTPException(400, {"success": False, "message": f"At most {MAX_BATCH_SIZE} transactions per batch"})
+    
+    results = [None] * len(body.transactions)
+    valid_rows, valid_indexes = [], []
+    for index, row in enumerate(body.transactions):
+        try:
+            valid_rows.append(validate_batch_row(row))
+            valid_indexes.append(index)
+        except (ValueError, TypeError) as e:
+            results[index] = {"index": index, "success": False, "message": str(e)}
+    
+    try:
+        inserted = await Transaction.create_many(user["id"], valid_rows)
+    except Exception as e:
+        raise HTTPException(500, {"success": False, "message": "Failed to import transactions", "error": str(e)})
+    
+    for index, (transaction_id, error) in zip(valid_indexes, inserted):
+        if error:
+            # The driver's text (constraint names, ORA- codes) stays in the
+            # log; the client gets what a single create would have said
+            print(f"Batch import row {index} for user {user['id']} rejected by the database: {error}")
+            results[index] = {"index": index, "success": False, "message": "Failed to create transaction"}
+        else:
+            results[index] = {"index": index, "success": True, "id": transaction_id}
+    
+    created = sum(1 for r in results if r["success"])
+    return {
+        "success": created == len(results),
+        "message": f"Imported {created} of {len(results)} transactions",
+        "data": results
+    }
+
+@router.get("/transactions", response_model=TransactionListResponse, response_model_exclude_unset=True)
+async def get_transactions(
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: str = Query(None),
+    fields: str = Query(None),
+    type: str = Query(None),
+    category: str = Query(None),
+    start_date: str = Query(None),
+    end_date: str = Query(None),
+    user: dict = Depends(authenticate_token)
+):
+    try:
+        # Without any paging/filter parameters keep returning the full list
+        if all(p is None for p in [limit, after, fields, type, category, start_date, end_date]):
+            transactions = await Transaction.get_all(user["id"])
+            return {"success": True, "data": transactions}
+        
+        page_size = limit or DEFAULT_PAGE_SIZE
+        transactions, next_cursor = await Transaction.get_page(
+            user["id"],
+            page_size,
+            after=after,
+            fields=[f.strip() for f in fields.split(",")] if fields else None,
+            type_=type,
+            category=category,
+            start_date=start_date,
+            end_date=end_date
+        )
+        return {
+            "success": True,
+            "data": transactions,
+            "pagination": {
+                "limit": page_size,
+                "nextCursor": next_cursor,
+                "hasMore": next_cursor is not None
+            }
+        }
+    except ValueError as e:
+        raise HTTPException(400, {"success": False, "message": str(e)})
     except Exception as e:
         raise HTTPException(500, {"success": False, "message": "Failed to fetch transactions", "error": str(e)})
 
-@router.get("/transactions/{id}")
+async def export_ndjson(batches):
+    async for batch in batches:
+        yield b"".join(dumps(t) + b"\n" for t in batch)
+
+async def export_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for batch in batches:
+        writer.writerows([t[c] for c in EXPORT_COLUMNS] for t in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+async def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+# Declared before /transactions/{id} so "search" is not parsed as an id
+@router.get("/transactions/search")
+async def search_transactions(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    after: str = Query(None),
+    user: dict = Depends(authenticate_token)
+):
+    try:
+        transactions, next_cursor = await Transaction.search(user["id"], q, limit, after)
+        return {
+            "success": True,
+            "data": transactions,
+            "pagination": {
+                "limit": limit,
+                "nextCursor": next_cursor,
+                "hasMore": next_cursor is not None
+            }
+        }
+    except ValueError as e:
+        raise HTTPException(400, {"success": False, "message": str(e)})
+    except Exception as e:
+        raise HTTPException(500, {"success": False, "message": "Failed to search transactions", "error": str(e)})
+
+# Declared before /transactions/{id} so "export" is not parsed as an id
+@router.get("/transactions/export")
+async def export_transactions(format: str = Query("ndjson"), gzip: bool = Query(False), user: dict = Depends(authenticate_token)):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(400, {"success": False, "message": 'Format must be either "ndjson" or "csv"'})
+    
+    batches = Transaction.iter_batches(user["id"], EXPORT_BATCH_SIZE)
+    body = export_csv(batches) if format == "csv" else export_ndjson(batches)
+    headers = {"Content-Disposition": f'attachment; filename="transactions.{format}"'}
+    if gzip:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+@router.get("/transactions/{id}", response_model=TransactionResponse, response_model_exclude_unset=True)
 async def get_transaction_by_id(id: int = Path(...), user: dict = Depends(authenticate_token)):
     try:
         transaction = await Transaction.get_by_id(id, user["id"])
@@ -47,7 +249,7 @@ async def get_transaction_by_id(id: int = Path(...), user: dict = Depends(authen
     except Exception as e:
         raise HTTPException(500, {"success": False, "message": "Failed to fetch transaction", "error": str(e)})
 
-@router.get("/transactions/month/{month}/{year}")
+@router.get("/transactions/month/{month}/{year}", response_model=TransactionListResponse, response_model_exclude_unset=True)
 async def get_transactions_by_month(month: int = Path(...), year: int = Path(...), user: dict = Depends(authenticate_token)):
     try:
         transactions = await Transaction.get_by_month(user["id"], month, year)
@@ -64,11 +266,14 @@ async def update_transaction(id: int = Path(...), body: TransactionRequest = Bod
         if body.type not in ["income", "expense"]:
             raise HTTPException(400, {"success": False, "message": 'Type must be either "income" or "expense"'})
         
-        updated = await Transaction.update(id, body.dict(), user["id"])
+        data = request_transaction_data(body)
+        updated = await Transaction.update(id, data, user["id"])
         if not updated:
             raise HTTPException(404, {"success": False, "message": "Transaction not found"})
         
         return {"success": True, "message": "Transaction updated successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, {"success": False, "message": "Failed to update transaction", "error": str(e)})
 
@@ -0,0 +1,256 @@
+from array import array
+from datetime import datetime
+
+INCOME, EXPENSE, OTHER = 0, 1, 2
+KINDS = {"income": INCOME, "expense": EXPENSE}
+
+MONTH_NAMES = [None] + [datetime(2000, m, 1).strftime("%B") for m in range(1, 13)]
+
+
+class TransactionColumns:
+    """Transactions parsed once into flat typed arrays.
+
+    Dates are split by slicing the "YYYY-MM-DD" string instead of calling
+    strptime, and categories are interned to small integer ids.
+    """
+
+    def __init__(self, transactions):
+        self.amounts = array("d")
+        self.kinds = array("B")
+        self.years = array("H")
+        self.months = array("B")
+        self.days = array("B")
+        self.category_ids = array("I")
+        self.categories = []
+        category_index = {}
+
+        for t in transactions:
+            date = t["date"]
+            category = t["category"]
+            category_id = category_index.get(category)
+            if category_id is None:
+                category_id = category_index[category] = len(self.categories)
+                self.categories.append(category)
+            self.amounts.append(t["amount"])
+            self.kinds.append(KINDS.get(t["type"], OTHER))
+            self.years.append(int(date[0:4]))
+            self.months.append(int(date[5:7]))
+            self.days.append(int(date[8:10]))
+            self.category_ids.append(category_id)
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def aggregate(self):
+        return Aggregates.from_columns(self)
+
+
+class Aggregates:
+    """Every bucket the reports need: totals, counts, per-category, daily,
+    weekly and monthly sums, indexed by kind (INCOME/EXPENSE)."""
+
+    def __init__(self):
+        self.totals = [0, 0, 0]
+        self.counts = [0, 0, 0]
+        self.count = 0
+        self.by_category = ({}, {})
+        self.daily = ([0] * 32, [0] * 32)
+        self.weekly = ([0] * 5, [0] * 5)
+        self.monthly = ([0] * 13, [0] * 13)
+        self.monthly_counts = [0] * 13
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Fill every bucket in a single pass over the columns.
+
+        Sums start from int 0 and are accumulated in input order, exactly
+        like the sum() calls they replace, so results are bit-for-bit
+        identical.
+        """
+        agg = cls()
+        totals, counts, monthly_counts = agg.totals, agg.counts, agg.monthly_counts
+        daily, weekly, monthly = agg.daily, agg.weekly, agg.monthly
+        # Category sums are lists indexed by interned id; `seen` keeps each
+        # kind's categories in first-seen order, the order the dicts had
+        names = columns.categories
+        by_category = ([0.0] * len(names), [0.0] * len(names))
+        seen = ([], [])
+        seen_flags = (bytearray(len(names)), bytearray(len(names)))
+
+        for amount, kind, month, day, category_id in zip(
+            columns.amounts, columns.kinds, columns.months, columns.days, columns.category_ids
+        ):
+            counts[kind] += 1
+            monthly_counts[month] += 1
+            if kind == OTHER:
+                continue
+            totals[kind] += amount
+            by_category[kind][category_id] += amount
+            if not seen_flags[kind][category_id]:
+                seen_flags[kind][category_id] = 1
+                seen[kind].append(category_id)
+            daily[kind][day] += amount
+            weekly[kind][(day - 1) // 7] += amount
+            monthly[kind][month] += amount
+
+        agg.count = len(columns)
+        agg.by_category = _named(by_category, seen, names)
+        return agg
+
+    @classmethod
+    def from_grouping_sets(cls, rows, names):
+        """Build buckets from (type, category_id, month, day, week, sum, count)
+        rows produced by a GROUPING SETS query; exactly one of category_id,
+        month, day or week is set per row, or none for the per-type total.
+        Category rows come in the order the Python path first sees them (see
+        GET_BY_MONTH_SQL), which fixes the order of the category dicts.
+        `names` is the user's category names indexed by id."""
+        agg = cls()
+        for type_, category_id, month, day, week, total, count in rows:
+            kind = KINDS.get(type_, OTHER)
+            total = float(total)
+            if category_id is not None:
+                if kind != OTHER:
+                    agg.by_category[kind][names[category_id]] = total
+            elif month is not None:
+                agg.monthly_counts[int(month)] += count
+                if kind != OTHER:
+                    agg.monthly[kind][int(month)] = total
+            elif day is not None:
+                if kind != OTHER:
+                    agg.daily[kind][int(day)] = total
+            elif week is not None:
+                if kind != OTHER:
+                    agg.weekly[kind][int(week)] = total
+            else:
+                agg.counts[kind] += count
+                agg.count += count
+                if kind != OTHER:
+                    agg.totals[kind] = total
+        return agg
+
+    @classmethod
+    def from_rollups(cls, rows, names):
+        """Build buckets from (month, category_id, type, total, count) rollup
+        rows, summing categories in lists indexed by id (`names` holds the
+        user's category names by id). Rollups have month granularity, so
+        daily and weekly stay empty."""
+        agg = cls()
+        by_category = ([0.0] * len(names), [0.0] * len(names))
+        seen = ([], [])
+        for month, category_id, type_, total, count in rows:
+            kind = KINDS.get(type_, OTHER)
+            month = int(month)
+            agg.counts[kind] += count
+            agg.count += count
+            agg.monthly_counts[month] += count
+            if kind == OTHER:
+                continue
+            total = float(total)
+            agg.totals[kind] += total
+            agg.monthly[kind][month] += total
+            by_category[kind][category_id] += total
+            if category_id not in seen[kind]:
+                seen[kind].append(category_id)
+        agg.by_category = _named(by_category, seen, names)
+        return agg
+
+    def month_net(self, month):
+        return self.monthly[INCOME][month] - self.monthly[EXPENSE][month]
+
+
+def _named(by_category, seen, names):
+    """Per-kind {name: sum} dicts from sums indexed by category id, in the
+    order each kind's categories were first seen."""
+    return tuple({names[c]: sums[c] for c in order} for sums, order in zip(by_category, seen))
+
+
+def analytics_payload(agg, top_n=5):
+    total_income, total_expenses = agg.totals[INCOME], agg.totals[EXPENSE]
+    income_count, expense_count = agg.counts[INCOME], agg.counts[EXPENSE]
+    income_by_category, expenses_by_category = agg.by_category
+
+    return {
+        "totals": {
+            "income": total_income,
+            "expenses": total_expenses,
+            "net": total_income - total_expenses
+        },
+        "counts": {
+            "income": income_count,
+            "expenses": expense_count,
+            "total": agg.count
+        },
+        "averages": {
+            "income": total_income / income_count if income_count else 0,
+            "expenses": total_expenses / expense_count if expense_count else 0
+        },
+        "topCategories": {
+            "income": sorted(income_by_category.items(), key=lambda x: x[1], reverse=True)[:top_n],
+            "expenses": sorted(expenses_by_category.items(), key=lambda x: x[1], reverse=True)[:top_n]
+        },
+        "categoryBreakdown": {
+            "income": income_by_category,
+            "expenses": expenses_by_category
+        }
+    }
+
+
+def goal_status_payload(net, goal):
+    if not goal:
+        return None
+    return {
+        "target": goal["target_amount"],
+        "progress": (net / goal["target_amount"]) * 100 if goal["target_amount"] else 0,
+        "achieved": net >= goal["target_amount"],
+        "remaining": max(goal["target_amount"] - net, 0)
+    }
+
+
+def chart_payload(agg, days_in_month):
+    daily_income, daily_expenses = agg.daily
+    weekly_income, weekly_expenses = agg.weekly
+    return {
+        "daily": [{
+            "day": day,
+            "income": daily_income[day],
+            "expenses": daily_expenses[day],
+            "net": daily_income[day] - daily_expenses[day]
+        } for day in range(1, days_in_month + 1)],
+        "weekly": [{
+            "week": week + 1,
+            "income": weekly_income[week],
+            "expenses": weekly_expenses[week],
+            "net": weekly_income[week] - weekly_expenses[week]
+        } for week in range(5)]
+    }
+
+
+def monthly_breakdown_payload(agg):
+    monthly_income, monthly_expenses = agg.monthly
+    return {
+        month: {
+            "month": month,
+            "monthName": MONTH_NAMES[month],
+            "income": monthly_income[month],
+            "expenses": monthly_expenses[month],
+            "net": monthly_income[month] - monthly_expenses[month],
+            "transactionCount": agg.monthly_counts[month]
+        } for month in range(1, 13)
+    }
+
+
+def yearly_summary_payload(agg, goals):
+    analytics = analytics_payload(agg)
+    totals = analytics["totals"]
+    savings_rate = (totals["net"] / totals["income"]) * 100 if totals["income"] > 0 else 0
+    achieved_goals = sum(1 for g in goals if agg.month_net(g["target_month"]) >= g["target_amount"])
+
+    return {
+        **totals,
+        "savingsRate": savings_rate,
+        "goalsAchievementRate": (achieved_goals / len(goals)) * 100 if goals else 0,
+        "totalGoals": len(goals),
+        "achievedGoals": achieved_goals,
+        "transactionCount": agg.count
+    }
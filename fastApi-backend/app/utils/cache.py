@@ -0,0 +1,198 @@
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    With `max_weight` set, `weigh(value)` sizes each entry and least recently
+    used entries are also evicted once the total weight goes over the cap.
+    """
+
+    # Lookups are in-process and cheap enough to make on the event loop
+    remote = False
+
+    def __init__(self, maxsize, ttl, max_weight=None, weigh=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weigh = weigh or (lambda value: 0)
+        self.weight = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self.weight += self.weigh(value)
+            while len(self._data) > self.maxsize or (self.max_weight is not None and self.weight > self.max_weight):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def _remove(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.weight -= self.weigh(entry[0])
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "weight": self.weight,
+                "maxWeight": self.max_weight,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": self.hits / lookups if lookups else 0
+            }
+
+
+class MemoryBackend:
+    """Byte-valued cache backend local to this process.
+
+    Counters from incr() live beside the LRU rather than in it: a report
+    cache's generation must outlive the entries it guards, or an eviction
+    would let a report computed before a write be stored after it.
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize, ttl, max_bytes):
+        self._cache = TTLCache(maxsize, ttl, max_weight=max_bytes, weigh=len)
+        self._counters = {}
+        self._incr_lock = threading.Lock()
+
+    def get(self, key):
+        value = self._counters.get(key)
+        if value is not None:
+            return str(value).encode()
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def delete(self, *keys):
+        for key in keys:
+            self._cache.invalidate(key)
+            self._counters.pop(key, None)
+
+    def incr(self, key):
+        with self._incr_lock:
+            value = self._counters[key] = self._counters.get(key, 0) + 1
+            return value
+
+    def stats(self):
+        return {"backend": self.name, **self._cache.stats(), "counters": len(self._counters)}
+
+
+class RedisBackend:
+    """Byte-valued cache backend shared by every worker through a Redis
+    server (or anything speaking its protocol) at `url`."""
+
+    name = "redis"
+
+    def __init__(self, url, ttl):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The redis cache backend requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value):
+        self._client.set(key, value, ex=max(1, int(self.ttl)))
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*keys)
+
+    def incr(self, key):
+        pipe = self._client.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, max(1, int(self.ttl)))
+        return pipe.execute()[0]
+
+    def stats(self):
+        return {"backend": self.name, "ttl": self.ttl}
+
+
+class SharedObjectCache:
+    """TTLCache's get/set/invalidate over a shared byte backend, with values
+    stored as JSON under `prefix`, so an invalidate() in one worker is seen
+    by all of them."""
+
+    # Every call is a network round trip; callers on the event loop run them
+    # in a thread
+    remote = True
+
+    def __init__(self, backend, prefix):
+        self.backend = backend
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.backend.get(f"{self.prefix}{key}")
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return orjson.loads(value)
+
+    def set(self, key, value):
+        self.backend.set(f"{self.prefix}{key}", orjson.dumps(value))
+
+    def invalidate(self, key):
+        self.backend.delete(f"{self.prefix}{key}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            **self.backend.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0
+        }
+
+
+def create_cache_backend(backend, url, maxsize, ttl, max_bytes):
+    if backend == "redis":
+        return RedisBackend(url, ttl)
+    return MemoryBackend(maxsize, ttl, max_bytes)
@@ -0,0 +1,185 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Upper bounds in seconds / bytes; +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class RequestMetrics:
+    """Database work done on behalf of one request, filled in by the data
+    layer through record_db()/record_pool_wait()."""
+
+    __slots__ = ("db_time", "rows", "pool_wait")
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.rows = 0
+        self.pool_wait = 0.0
+
+
+# Bound by MetricsMiddleware for the lifetime of each HTTP request; copied
+# into DB executor threads along with the rest of the context
+_current_request = ContextVar("request_metrics", default=None)
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current_request.set(metrics)
+
+
+def end_request(token):
+    _current_request.reset(token)
+
+
+def record_db(elapsed, rows=0):
+    metrics = _current_request.get()
+    if metrics is not None:
+        metrics.db_time += elapsed
+        metrics.rows += rows
+
+
+def record_pool_wait(elapsed):
+    metrics = _current_request.get()
+    if metrics is not None:
+        metrics.pool_wait += elapsed
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format.
+
+    observe() only bumps one bucket and the sum; buckets are made cumulative
+    at render time so the request path stays cheap.
+    """
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            # One slot per bucket, one for +Inf, then the sum
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = _format_labels(self.label_names + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Collected:
+    """A gauge or counter whose values are read from `collect()` at scrape
+    time, for numbers another module already keeps (pool, statement stats)."""
+
+    def __init__(self, name, help_text, label_names, collect, metric_type="gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.collect = collect
+        self.metric_type = metric_type
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        for labels, value in self.collect():
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+ROUTE_LABELS = ("method", "route")
+
+REQUEST_DURATION = Histogram(
+    "monevo_http_request_duration_seconds", "Time from request start to the last response byte.",
+    ROUTE_LABELS, LATENCY_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    "monevo_http_response_size_bytes", "Response body size as sent (after compression).",
+    ROUTE_LABELS, SIZE_BUCKETS
+)
+REQUESTS = Counter("monevo_http_requests_total", "Requests handled.", ROUTE_LABELS + ("status",))
+DB_SECONDS = Counter(
+    "monevo_http_request_db_seconds_total", "Time spent executing statements and fetching rows.", ROUTE_LABELS
+)
+APP_SECONDS = Counter(
+    "monevo_http_request_app_seconds_total", "Request time not spent in the database or waiting for the pool.",
+    ROUTE_LABELS
+)
+POOL_WAIT_SECONDS = Counter(
+    "monevo_http_request_pool_wait_seconds_total", "Time spent waiting for a pooled connection.", ROUTE_LABELS
+)
+ROWS_FETCHED = Counter("monevo_http_request_rows_fetched_total", "Rows fetched by registered statements.", ROUTE_LABELS)
+
+REQUEST_METRICS = [REQUEST_DURATION, RESPONSE_SIZE, REQUESTS, DB_SECONDS, APP_SECONDS, POOL_WAIT_SECONDS, ROWS_FETCHED]
+
+# Scrape-time metrics registered by the modules that own the numbers
+_collectors = []
+
+
+def register_collector(name, help_text, label_names, collect, metric_type="gauge"):
+    """`collect()` returns (label_values, value) pairs."""
+    _collectors.append(Collected(name, help_text, label_names, collect, metric_type))
+
+
+def observe_request(method, route, status, elapsed, size, metrics):
+    labels = (method, route)
+    REQUEST_DURATION.observe(labels, elapsed)
+    RESPONSE_SIZE.observe(labels, size)
+    REQUESTS.inc((method, route, status))
+    DB_SECONDS.inc(labels, metrics.db_time)
+    POOL_WAIT_SECONDS.inc(labels, metrics.pool_wait)
+    APP_SECONDS.inc(labels, max(elapsed - metrics.db_time - metrics.pool_wait, 0.0))
+    ROWS_FETCHED.inc(labels, metrics.rows)
+
+
+def render_metrics():
+    lines = []
+    for metric in REQUEST_METRICS + _collectors:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,108 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+# bcrypt cost factor for new hashes; stored hashes with a different cost are
+# rehashed the next time their owner logs in
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# bcrypt releases the GIL while it works, so a small thread pool gives real
+# parallelism without the pickling cost of a process pool
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Hashes allowed queued or running at once (callers beyond that are turned
+# away), and how long a caller waits for its own hash before giving up
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", str(PASSWORD_HASH_WORKERS * 8)))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "5"))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_slots = None
+_stats = {"inFlight": 0, "completed": 0, "rejected": 0, "timeouts": 0, "rehashed": 0}
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _hash(plain_password):
+    return bcrypt.hashpw(plain_password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
+
+
+def _verify(plain_password, hashed_password):
+    """Check a password, returning (matches, new_hash) where new_hash is set
+    only when the stored hash uses a stale cost factor."""
+    if not bcrypt.checkpw(plain_password.encode(), hashed_password.encode()):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, _hash(plain_password)
+    return True, None
+
+
+def needs_rehash(hashed_password):
+    # "$2b$12$<salt+hash>": the cost is the third "$" field
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+async def _run(func, *args):
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(PASSWORD_HASH_QUEUE)
+    # Fail fast once the queue is full rather than piling up work whose
+    # callers will have given up by the time it runs
+    if _slots.locked():
+        _stats["rejected"] += 1
+        raise PasswordHasherBusy("Too many password checks in progress")
+    # Never waits: a slot was just seen free
+    await _slots.acquire()
+    loop = asyncio.get_running_loop()
+    _stats["inFlight"] += 1
+    job = _executor.submit(func, *args)
+    # The slot belongs to the job, not to this caller: a hash that outlives
+    # its caller's timeout still occupies a worker until it finishes. One
+    # still queued when the caller gives up is cancelled with its wrapper
+    job.add_done_callback(lambda _: _call_soon(loop, _release))
+    try:
+        result = await asyncio.wait_for(asyncio.wrap_future(job), PASSWORD_HASH_TIMEOUT)
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        raise PasswordHasherBusy(f"Password check did not finish within {PASSWORD_HASH_TIMEOUT}s")
+    _stats["completed"] += 1
+    return result
+
+
+def _release():
+    _stats["inFlight"] -= 1
+    _slots.release()
+
+
+def _call_soon(loop, callback):
+    # Runs on the bcrypt worker; the loop may already be closed at shutdown
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass
+
+
+async def hash_password(plain_password):
+    return await _run(_hash, plain_password)
+
+
+async def verify_password(plain_password, hashed_password):
+    matches, new_hash = await _run(_verify, plain_password, hashed_password)
+    if new_hash:
+        _stats["rehashed"] += 1
+    return matches, new_hash
+
+
+def get_hasher_stats():
+    return {
+        "rounds": BCRYPT_ROUNDS,
+        "workers": PASSWORD_HASH_WORKERS,
+        "queue": PASSWORD_HASH_QUEUE,
+        **_stats
+    }
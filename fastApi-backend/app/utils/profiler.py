@@ -0,0 +1,178 @@
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+
+# Profile every request ("true") or only those carrying an X-Profile header
+# equal to PROFILE_ADMIN_TOKEN; either way a profile is only written when
+# the request takes longer than PROFILE_THRESHOLD_MS
+PROFILE_SLOW_REQUESTS = os.getenv("PROFILE_SLOW_REQUESTS", "false").lower() in ("1", "true", "yes")
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_THRESHOLD_MS = float(os.getenv("PROFILE_THRESHOLD_MS", "500"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))  # newest profiles kept in PROFILE_DIR
+PROFILE_TOP_FRAMES = 5
+
+# Session of the request being profiled; run_in_db() copies it into the
+# executor thread so that thread's stack is sampled for the request too
+_current_session = ContextVar("profile_session", default=None)
+
+_labels = {}
+
+
+def _label(frame):
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        module = frame.f_globals.get("__name__", "?")
+        label = _labels[code] = f"{module}.{code.co_qualname}"
+    return label
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        stack.append(_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return ";".join(stack)
+
+
+class ProfileSession:
+    """Stack samples taken for one request: the event loop thread while the
+    request's task is running on it, plus any DB executor thread working for it."""
+
+    def __init__(self, loop, task, name):
+        self.loop = loop
+        self.task = task
+        self.loop_thread = threading.get_ident()
+        self.name = name
+        self.threads = set()
+        self.samples = Counter()
+
+    def sample(self, frames):
+        if asyncio.current_task(self.loop) is self.task:
+            frame = frames.get(self.loop_thread)
+            if frame is not None:
+                self.samples[_collapse(frame)] += 1
+        for ident in tuple(self.threads):
+            frame = frames.get(ident)
+            if frame is not None:
+                self.samples[_collapse(frame)] += 1
+
+    def top_frames(self, count=PROFILE_TOP_FRAMES):
+        """Leaf frames with the most samples, as (label, share of samples)."""
+        leaves = Counter()
+        for stack, hits in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += hits
+        total = sum(leaves.values())
+        return [(label, hits / total) for label, hits in leaves.most_common(count)]
+
+
+class Sampler:
+    """One background thread sampling every active session at a fixed
+    interval; it only runs while at least one request is being profiled."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._sessions = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, session):
+        with self._lock:
+            self._sessions.add(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, session):
+        with self._lock:
+            self._sessions.discard(session)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                sessions = tuple(self._sessions)
+                if not sessions:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            frames.pop(me, None)
+            for session in sessions:
+                session.sample(frames)
+            time.sleep(self.interval)
+
+
+_sampler = Sampler(PROFILE_INTERVAL_MS / 1000)
+
+
+def should_profile(headers):
+    if PROFILE_SLOW_REQUESTS:
+        return True
+    if not PROFILE_ADMIN_TOKEN:
+        return False
+    for name, value in headers:
+        if name == b"x-profile":
+            return value.decode("latin-1") == PROFILE_ADMIN_TOKEN
+    return False
+
+
+def start_session(name):
+    session = ProfileSession(asyncio.get_running_loop(), asyncio.current_task(), name)
+    token = _current_session.set(session)
+    _sampler.add(session)
+    return session, token
+
+
+def stop_session(session, token):
+    _sampler.remove(session)
+    _current_session.reset(token)
+
+
+def run_tracked(func, *args, **kwargs):
+    """Run a DB executor call, sampling this thread for the profiled request
+    (if any) that submitted it."""
+    session = _current_session.get()
+    if session is None:
+        return func(*args, **kwargs)
+    ident = threading.get_ident()
+    session.threads.add(ident)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        session.threads.discard(ident)
+
+
+def write_profile(session, elapsed_ms, directory=PROFILE_DIR, keep=PROFILE_KEEP):
+    """Write the session's samples in collapsed-stack format (one
+    `frame;frame;frame count` line per stack, as read by flamegraph.pl and
+    speedscope), drop the oldest profiles beyond `keep` and print a summary."""
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", session.name).strip("_")
+    path = os.path.join(directory, f"{datetime.now():%Y%m%d-%H%M%S-%f}-{slug}-{elapsed_ms:.0f}ms.collapsed")
+    with open(path, "w") as file:
+        for stack, hits in session.samples.most_common():
+            file.write(f"{stack} {hits}\n")
+
+    profiles = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".collapsed")),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in profiles[:max(len(profiles) - keep, 0)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+    top = ", ".join(f"{label} {share:.0%}" for label, share in session.top_frames())
+    print(f"Slow request {session.name} took {elapsed_ms:.0f}ms "
+          f"({sum(session.samples.values())} samples) -> {path}; top frames: {top}")
+    return path
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import os
+
+from fastapi.responses import Response
+
+from app.utils.cache import create_cache_backend
+from app.utils.responses import dumps
+
+# "memory" keeps reports in this process; "redis" shares them between workers
+REPORT_CACHE_BACKEND = os.getenv("REPORT_CACHE_BACKEND", "memory")
+REPORT_CACHE_URL = os.getenv("REPORT_CACHE_URL", "redis://localhost:6379/0")
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "5000"))
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "300"))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ReportCache:
+    """Rendered report bodies keyed by (user, period, report type).
+
+    Writers call invalidate() after committing, with every (year, month) they
+    touched; that drops the month's report and its year's report and bumps a
+    per-user generation. A report computed concurrently with the write read
+    the generation before it started, so _store() sees the bump and discards it
+    rather than caching stale data until the TTL runs out.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._remote = backend.name != "memory"
+
+    @staticmethod
+    def monthly_key(user_id, month, year):
+        return f"report:{user_id}:{year:04d}-{month:02d}:monthly"
+
+    @staticmethod
+    def yearly_key(user_id, year):
+        return f"report:{user_id}:{year:04d}:yearly"
+
+    @staticmethod
+    def period(date):
+        """(year, month) of a "YYYY-MM-DD" date, for invalidate()."""
+        return int(date[0:4]), int(date[5:7])
+
+    @staticmethod
+    def _generation_key(user_id):
+        return f"report:{user_id}:generation"
+
+    def invalidate(self, user_id, periods):
+        keys = set()
+        for year, month in periods:
+            keys.add(self.monthly_key(user_id, month, year))
+            keys.add(self.yearly_key(user_id, year))
+        if keys:
+            self.backend.incr(self._generation_key(user_id))
+            self.backend.delete(*keys)
+
+    def _lookup(self, key, user_id):
+        entry = self.backend.get(key)
+        generation = self.backend.get(self._generation_key(user_id))
+        if entry is None:
+            return None, generation
+        etag, body = entry.split(b"\n", 1)
+        return (etag.decode(), body), generation
+
+    def _store(self, key, user_id, generation, etag, body):
+        if self.backend.get(self._generation_key(user_id)) == generation:
+            self.backend.set(key, etag.encode() + b"\n" + body)
+
+    async def _call(self, func, *args):
+        # Memory lookups are cheap enough to run inline; remote ones block
+        if self._remote:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def respond(self, request, key, user_id, build):
+        """Serve the report at `key` from cache, or build() and cache it.
+
+        The ETag covers everything but generatedAt, so a rebuild that finds
+        the same data still satisfies the client's If-None-Match.
+        """
+        if_none_match = request.headers.get("if-none-match")
+        cached, generation = await self._call(self._lookup, key, user_id)
+        if cached:
+            etag, body = cached
+        else:
+            payload = await build()
+            data = payload["data"]
+            unstamped = {**payload, "data": {k: v for k, v in data.items() if k != "generatedAt"}}
+            etag = '"' + hashlib.blake2b(dumps(unstamped), digest_size=16).hexdigest() + '"'
+            body = dumps(payload)
+            await self._call(self._store, key, user_id, generation, etag, body)
+
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self):
+        return self.backend.stats()
+
+
+report_cache = ReportCache(create_cache_backend(
+    REPORT_CACHE_BACKEND,
+    REPORT_CACHE_URL,
+    maxsize=REPORT_CACHE_SIZE,
+    ttl=REPORT_CACHE_TTL,
+    max_bytes=REPORT_CACHE_MAX_BYTES
+))
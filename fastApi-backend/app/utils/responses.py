@@ -0,0 +1,45 @@
+import json
+import os
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# "orjson" renders responses with orjson when it is installed; "json" keeps
+# Starlette's stdlib encoder
+JSON_RESPONSE = os.getenv("JSON_RESPONSE", "orjson")
+
+USE_ORJSON = JSON_RESPONSE == "orjson" and orjson is not None
+
+
+def dumps(content):
+    """Encode to the same compact UTF-8 bytes JSONResponse produces.
+
+    Report payloads key their monthly breakdown by int, hence OPT_NON_STR_KEYS;
+    anything neither encoder knows (Decimal, say) goes through jsonable_encoder.
+    """
+    if USE_ORJSON:
+        return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=jsonable_encoder, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson.
+
+    Routes with a response_model hand this class plain data already
+    serialized by pydantic, so together they skip both jsonable_encoder and
+    the stdlib encoder.
+    """
+
+    def render(self, content):
+        return dumps(content)
+
+
+def default_response_class():
+    return FastJSONResponse if USE_ORJSON else JSONResponse
@@ -0,0 +1,226 @@
+import math
+from calendar import monthrange
+
+import numpy as np
+
+from app.utils.analytics import INCOME, EXPENSE, OTHER, KINDS, MONTH_NAMES
+
+# Longest range /api/report/trends accepts, in months
+MAX_TREND_MONTHS = 1200
+
+# A category whose fitted line changes by less than this share of its
+# monthly average over the whole range is reported as flat
+FLAT_CHANGE = 0.05
+
+
+def month_ordinal(year, month):
+    """Months since year 0, so month ranges are integer ranges."""
+    return year * 12 + month - 1
+
+
+def ordinal_month(ordinal):
+    return ordinal // 12, ordinal % 12 + 1
+
+
+def parse_month(text):
+    """Ordinal of a "YYYY-MM" query parameter; ValueError if malformed."""
+    year, _, month = text.partition("-")
+    if len(year) != 4 or not year.isdigit() or not month.isdigit() or not 1 <= int(month) <= 12:
+        raise ValueError(f"Expected a month as YYYY-MM, got {text!r}")
+    return month_ordinal(int(year), int(month))
+
+
+class MonthlySeries:
+    """Rollup rows pivoted into dense arrays with one column per month from
+    `first` to `last` (ordinals), empty months included.
+
+    amounts[s, m] is the total of series s = (type, category_id) in month m;
+    income, expenses and counts are the per-month sums over all series.
+    """
+
+    def __init__(self, rows, first, last):
+        self.first = first
+        self.size = last - first + 1
+        self.keys = []
+        index = {}
+        series_ids = np.empty(len(rows), dtype=np.intp)
+        month_ids = np.empty(len(rows), dtype=np.intp)
+        totals = np.empty(len(rows))
+        counts = np.empty(len(rows))
+
+        for i, (year, month, category_id, type_, total, count) in enumerate(rows):
+            key = (type_, category_id)
+            series = index.get(key)
+            if series is None:
+                series = index[key] = len(self.keys)
+                self.keys.append(key)
+            series_ids[i] = series
+            month_ids[i] = month_ordinal(int(year), int(month)) - first
+            totals[i] = total
+            counts[i] = count
+
+        # (user, year, month, category_id, type) is the rollup key, so every
+        # cell is set at most once
+        self.amounts = np.zeros((len(self.keys), self.size))
+        self.amounts[series_ids, month_ids] = totals
+        self.kinds = np.array([KINDS.get(type_, OTHER) for type_, _ in self.keys], dtype=np.int8)
+        self.income = self.amounts[self.kinds == INCOME].sum(axis=0)
+        self.expenses = self.amounts[self.kinds == EXPENSE].sum(axis=0)
+        self.counts = np.bincount(month_ids, weights=counts, minlength=self.size)
+
+
+def rolling_mean(values, window):
+    """Trailing mean over `window` months along the last axis; the first
+    months average over what is available."""
+    sums = np.cumsum(values, axis=-1)
+    earlier = np.zeros_like(sums)
+    earlier[..., window:] = sums[..., :-window]
+    return (sums - earlier) / np.minimum(np.arange(1, values.shape[-1] + 1), window)
+
+
+def month_deltas(values):
+    """Change from the previous month, and that change as a percentage of
+    the previous month (NaN where it was zero). The first month has none."""
+    previous = np.concatenate(([np.nan], values[:-1]))
+    change = values - previous
+    percent = np.full_like(values, np.nan)
+    np.divide(change * 100, np.abs(previous), out=percent, where=np.abs(previous) > 0)
+    return change, percent
+
+
+def slopes(amounts):
+    """Least-squares slope of every row of `amounts` against month number,
+    in amount per month, as one matrix-vector product."""
+    months = amounts.shape[-1]
+    if months < 2:
+        return np.zeros(amounts.shape[0])
+    x = np.arange(months) - (months - 1) / 2
+    return amounts @ x / (x @ x)
+
+
+def _values(array):
+    return [None if math.isnan(value) else value for value in array.tolist()]
+
+
+def trends_payload(rows, names, opening_balance, first, last, lookback, window, today):
+    """Trend report for months `first`..`last` from rollup rows that start
+    `lookback` months earlier, so the first months' rolling averages and
+    deltas see real history. `names` are the user's category names by id,
+    and `opening_balance` is the net of everything before those rows.
+
+    The projection covers today's month when it is in the range: income and
+    expenses booked so far, plus the trailing `window`-month average's share
+    of the days left, on top of the balance at the start of the month.
+    """
+    series = MonthlySeries(rows, first - lookback, last)
+    net = series.income - series.expenses
+    balance = opening_balance + np.cumsum(net)
+    rolling_income = rolling_mean(series.income, window)
+    rolling_expenses = rolling_mean(series.expenses, window)
+    income_change, income_percent = month_deltas(series.income)
+    expense_change, expense_percent = month_deltas(series.expenses)
+    net_change, net_percent = month_deltas(net)
+
+    shown = slice(lookback, None)
+    months = []
+    for offset, values in enumerate(zip(
+        series.income[shown].tolist(), series.expenses[shown].tolist(), net[shown].tolist(),
+        balance[shown].tolist(), series.counts[shown].tolist(),
+        rolling_income[shown].tolist(), rolling_expenses[shown].tolist(),
+        _values(income_change[shown]), _values(expense_change[shown]), _values(net_change[shown]),
+        _values(income_percent[shown]), _values(expense_percent[shown]), _values(net_percent[shown])
+    )):
+        (income, expenses, month_net, month_balance, count, avg_income, avg_expenses,
+         d_income, d_expenses, d_net, p_income, p_expenses, p_net) = values
+        year, month = ordinal_month(first + offset)
+        months.append({
+            "year": year,
+            "month": month,
+            "monthName": MONTH_NAMES[month],
+            "income": income,
+            "expenses": expenses,
+            "net": month_net,
+            "balance": month_balance,
+            "transactionCount": int(count),
+            "rolling": {"income": avg_income, "expenses": avg_expenses, "net": avg_income - avg_expenses},
+            "change": {
+                "income": d_income,
+                "expenses": d_expenses,
+                "net": d_net,
+                "incomePercent": p_income,
+                "expensesPercent": p_expenses,
+                "netPercent": p_net
+            }
+        })
+
+    in_range = series.amounts[:, shown]
+    totals = in_range.sum(axis=1)
+    averages = totals / in_range.shape[1]
+    category_slopes = slopes(in_range)
+    span = in_range.shape[1] - 1
+    categories = []
+    for (type_, category_id), total, average, slope in zip(
+        series.keys, totals.tolist(), averages.tolist(), category_slopes.tolist()
+    ):
+        if total == 0:
+            continue
+        trend = "flat"
+        if abs(slope) * span > FLAT_CHANGE * abs(average):
+            trend = "rising" if slope > 0 else "falling"
+        categories.append({
+            "category": names[category_id],
+            "type": type_,
+            "total": total,
+            "monthlyAverage": average,
+            "slope": slope,
+            "trend": trend
+        })
+    categories.sort(key=lambda c: c["total"], reverse=True)
+
+    income, expenses = float(series.income[shown].sum()), float(series.expenses[shown].sum())
+    count = last - first + 1
+    return {
+        "period": {
+            "start": "%04d-%02d" % ordinal_month(first),
+            "end": "%04d-%02d" % ordinal_month(last),
+            "months": count,
+            "window": window
+        },
+        "summary": {
+            "income": income,
+            "expenses": expenses,
+            "net": income - expenses,
+            "averageMonthlyNet": (income - expenses) / count,
+            "openingBalance": float(balance[lookback] - net[lookback]),
+            "closingBalance": float(balance[-1]),
+            "transactionCount": int(series.counts[shown].sum())
+        },
+        "months": months,
+        "categories": categories,
+        "projection": _projection(series, balance - net, first - lookback, first, last, window, today)
+    }
+
+
+def _projection(series, opening, start, first, last, window, today):
+    current = month_ordinal(today.year, today.month)
+    if not first <= current <= last:
+        return None
+    index = current - start
+    days = monthrange(today.year, today.month)[1]
+    remaining = (days - today.day) / days
+    # The lookback guarantees at least one complete month before it
+    history = slice(max(index - window, 0), index)
+    average_income = float(series.income[history].mean())
+    average_expenses = float(series.expenses[history].mean())
+    income = float(series.income[index]) + average_income * remaining
+    expenses = float(series.expenses[index]) + average_expenses * remaining
+    return {
+        "year": today.year,
+        "month": today.month,
+        "daysElapsed": today.day,
+        "daysInMonth": days,
+        "income": income,
+        "expenses": expenses,
+        "net": income - expenses,
+        "balance": float(opening[index]) + income - expenses
+    }
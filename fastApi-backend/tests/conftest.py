@@ -0,0 +1,69 @@
+"""Fixtures shared by the tests: the app on a throwaway SQLite database.
+
+Settings are read when app modules are imported, so they are set here first.
+Everything runs on the embedded engine unless DB_BACKEND says otherwise;
+tests that depend on SQLite internals are marked sqlite_only.
+"""
+import os
+import shutil
+import tempfile
+import uuid
+
+DB_DIR = tempfile.mkdtemp(prefix="monevo-tests-")
+os.environ.setdefault("DB_BACKEND", "sqlite")
+os.environ["SQLITE_PATH"] = os.path.join(DB_DIR, "monevo.db")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("JWT_SECRET", "monevo-tests-" + "0" * 32)
+os.environ["AUTH_CACHE_BACKEND"] = "memory"
+os.environ["REPORT_CACHE_BACKEND"] = "memory"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config.storage import storage
+from app.main import app
+
+sqlite_only = pytest.mark.skipif(storage.name != "sqlite", reason="needs DB_BACKEND=sqlite")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """One app for the whole run; tests keep apart by using their own user."""
+    with TestClient(app) as client:
+        yield client
+
+
+def register(client):
+    """Sign up a new user and return (user id, auth headers)."""
+    email = f"{uuid.uuid4().hex}@example.com"
+    response = client.post("/api/auth/register", json={
+        "name": "Test User", "email": email, "password": "secret1", "date_of_birth": "1990-01-01"
+    })
+    assert response.status_code == 200, response.text
+    user_id = response.json()[0]["data"]["id"]
+    response = client.post("/api/auth/login", json={"email": email, "password": "secret1"})
+    assert response.status_code == 200, response.text
+    return user_id, {"Authorization": f"Bearer {response.json()['data']['token']}"}
+
+
+@pytest.fixture
+def user(client):
+    return register(client)
+
+
+@pytest.fixture
+def headers(user):
+    return user[1]
+
+
+def add_transactions(client, headers, rows):
+    """Create rows through the batch endpoint and return their ids in order."""
+    response = client.post("/api/transactions/batch", json={"transactions": rows}, headers=headers)
+    assert response.status_code == 200, response.text
+    results = response.json()["data"]
+    assert all(result["success"] for result in results), results
+    return [result["id"] for result in results]
@@ -0,0 +1,208 @@
+"""The report engine (build_monthly_report / build_yearly_report) against the
+per-bucket helpers it replaced, kept below as they were.
+
+The equivalence tests run with the suite. The benchmarks time both at 10k,
+100k and 1M rows and are skipped unless asked for:
+
+    pytest tests/test_analytics_benchmark.py --benchmark-only
+
+The old helpers rescan and re-parse every row per day, week, month and goal,
+so they are only timed up to 100k rows (a single round each).
+"""
+import json
+import random
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.models.rows import TransactionRow
+from app.utils.helpers import build_monthly_report, build_yearly_report
+
+CATEGORIES = ["Food", "Rent", "Salary", "Transport", "Utilities", "Entertainment", "Health", "Gifts"]
+MONTH, YEAR = 3, 2024
+GOAL = {"target_amount": 5000.0, "target_month": MONTH, "target_year": YEAR}
+GOALS = [{**GOAL, "target_month": month} for month in (1, 3, 6, 9, 12)]
+
+
+# The helpers as they were before app/utils/analytics.py
+
+def old_transaction_analytics(transactions):
+    income_transactions = [t for t in transactions if t["type"] == "income"]
+    expense_transactions = [t for t in transactions if t["type"] == "expense"]
+    total_income = sum(t["amount"] for t in income_transactions)
+    total_expenses = sum(t["amount"] for t in expense_transactions)
+    income_by_category = old_group_by_category(income_transactions)
+    expenses_by_category = old_group_by_category(expense_transactions)
+    return {
+        "totals": {"income": total_income, "expenses": total_expenses, "net": total_income - total_expenses},
+        "counts": {"income": len(income_transactions), "expenses": len(expense_transactions), "total": len(transactions)},
+        "averages": {
+            "income": total_income / len(income_transactions) if income_transactions else 0,
+            "expenses": total_expenses / len(expense_transactions) if expense_transactions else 0
+        },
+        "topCategories": {
+            "income": sorted(income_by_category.items(), key=lambda x: x[1], reverse=True)[:5],
+            "expenses": sorted(expenses_by_category.items(), key=lambda x: x[1], reverse=True)[:5]
+        },
+        "categoryBreakdown": {"income": income_by_category, "expenses": expenses_by_category}
+    }
+
+
+def old_monthly_summary(transactions, goal):
+    analytics = old_transaction_analytics(transactions)
+    goal_status = None
+    if goal:
+        goal_status = {
+            "target": goal["target_amount"],
+            "progress": (analytics["totals"]["net"] / goal["target_amount"]) * 100 if goal["target_amount"] else 0,
+            "achieved": analytics["totals"]["net"] >= goal["target_amount"],
+            "remaining": max(goal["target_amount"] - analytics["totals"]["net"], 0)
+        }
+    return {**analytics["totals"], "goalStatus": goal_status, "transactionCount": analytics["counts"]["total"]}
+
+
+def old_yearly_analytics(transactions, goals):
+    analytics = old_transaction_analytics(transactions)
+    totals = analytics["totals"]
+    achieved_goals = 0
+    for g in goals:
+        month_transactions = [t for t in transactions if datetime.strptime(t["date"], "%Y-%m-%d").month == g["target_month"]]
+        if old_transaction_analytics(month_transactions)["totals"]["net"] >= g["target_amount"]:
+            achieved_goals += 1
+    return {
+        **totals,
+        "savingsRate": (totals["net"] / totals["income"]) * 100 if totals["income"] > 0 else 0,
+        "goalsAchievementRate": (achieved_goals / len(goals)) * 100 if goals else 0,
+        "totalGoals": len(goals),
+        "achievedGoals": achieved_goals,
+        "transactionCount": analytics["counts"]["total"]
+    }
+
+
+def old_monthly_breakdown(transactions):
+    monthly_data = {}
+    for month in range(1, 13):
+        month_transactions = [t for t in transactions if datetime.strptime(t["date"], "%Y-%m-%d").month == month]
+        analytics = old_transaction_analytics(month_transactions)
+        monthly_data[month] = {
+            "month": month,
+            "monthName": datetime(2000, month, 1).strftime("%B"),
+            **analytics["totals"],
+            "transactionCount": analytics["counts"]["total"]
+        }
+    return monthly_data
+
+
+def old_group_by_category(transactions):
+    acc = defaultdict(float)
+    for t in transactions:
+        acc[t["category"]] += t["amount"]
+    return dict(acc)
+
+
+def old_chart_data(transactions, month, year):
+    days_in_month = monthrange(year, month)[1]
+    daily_data = []
+    for day in range(1, days_in_month + 1):
+        day_transactions = [t for t in transactions if datetime.strptime(t["date"], "%Y-%m-%d").day == day]
+        day_income = sum(t["amount"] for t in day_transactions if t["type"] == "income")
+        day_expenses = sum(t["amount"] for t in day_transactions if t["type"] == "expense")
+        daily_data.append({"day": day, "income": day_income, "expenses": day_expenses, "net": day_income - day_expenses})
+    weekly_data = []
+    for week in range(5):
+        week_start = week * 7 + 1
+        week_end = min(week_start + 6, days_in_month)
+        week_transactions = [t for t in transactions if week_start <= datetime.strptime(t["date"], "%Y-%m-%d").day <= week_end]
+        week_income = sum(t["amount"] for t in week_transactions if t["type"] == "income")
+        week_expenses = sum(t["amount"] for t in week_transactions if t["type"] == "expense")
+        weekly_data.append({"week": week + 1, "income": week_income, "expenses": week_expenses, "net": week_income - week_expenses})
+    return {"daily": daily_data, "weekly": weekly_data}
+
+
+def old_monthly_report(transactions, goal, month, year):
+    # The monthly route called all three, each scanning the rows itself
+    return (
+        old_transaction_analytics(transactions),
+        old_monthly_summary(transactions, goal),
+        old_chart_data(transactions, month, year)
+    )
+
+
+def old_yearly_report(transactions, goals, year):
+    return old_yearly_analytics(transactions, goals), old_monthly_breakdown(transactions)
+
+
+def sample_rows(count, first_day, days):
+    """TransactionRows as Transaction.get_by_month returns them, newest first."""
+    rng = random.Random(count)
+    rows = []
+    for i in range(count):
+        day = (first_day + timedelta(days=rng.randrange(days))).isoformat()
+        rows.append(TransactionRow(
+            i + 1, round(rng.uniform(1, 2000), 2), f"Transaction {i}",
+            "income" if rng.random() < 0.2 else "expense", rng.choice(CATEGORIES), day, f"{day}T12:00:00.000"
+        ))
+    rows.sort(key=lambda row: row.date, reverse=True)
+    return rows
+
+
+@pytest.fixture(scope="module")
+def rows():
+    """sample_rows() memoized, since building a million rows takes a while."""
+    built = {}
+
+    def rows(count, period):
+        if (count, period) not in built:
+            if period == "month":
+                built[count, period] = sample_rows(count, date(YEAR, MONTH, 1), monthrange(YEAR, MONTH)[1])
+            else:
+                built[count, period] = sample_rows(count, date(YEAR, 1, 1), 366)
+        return built[count, period]
+    return rows
+
+
+@pytest.mark.parametrize("count", [0, 1, 250, 2000])
+@pytest.mark.parametrize("month, year", [(MONTH, YEAR), (2, 2024), (2, 2023), (4, 2024)])
+@pytest.mark.parametrize("goal", [GOAL, None], ids=["goal", "no-goal"])
+def test_monthly_report_matches_old_helpers(count, month, year, goal):
+    month_rows = sample_rows(count, date(year, month, 1), monthrange(year, month)[1])
+    new = build_monthly_report(month_rows, goal, month, year)
+    assert json.dumps(new) == json.dumps(old_monthly_report(month_rows, goal, month, year))
+
+
+@pytest.mark.parametrize("count", [0, 1, 250, 2000])
+@pytest.mark.parametrize("goals", [GOALS, []], ids=["goals", "no-goals"])
+def test_yearly_report_matches_old_helpers(rows, count, goals):
+    year_rows = rows(count, "year")
+    new = build_yearly_report(year_rows, goals, YEAR)
+    assert json.dumps(new) == json.dumps(old_yearly_report(year_rows, goals, YEAR))
+
+
+@pytest.mark.parametrize("count", [10_000, 100_000, 1_000_000])
+def test_benchmark_monthly_report(benchmark, rows, count):
+    benchmark.group = f"monthly {count} rows"
+    month_rows = rows(count, "month")
+    benchmark(build_monthly_report, month_rows, GOAL, MONTH, YEAR)
+
+
+@pytest.mark.parametrize("count", [10_000, 100_000, 1_000_000])
+def test_benchmark_yearly_report(benchmark, rows, count):
+    benchmark.group = f"yearly {count} rows"
+    year_rows = rows(count, "year")
+    benchmark(build_yearly_report, year_rows, GOALS, YEAR)
+
+
+@pytest.mark.parametrize("count", [10_000, 100_000])
+def test_benchmark_old_monthly_report(benchmark, rows, count):
+    benchmark.group = f"monthly {count} rows"
+    month_rows = rows(count, "month")
+    benchmark.pedantic(old_monthly_report, (month_rows, GOAL, MONTH, YEAR), rounds=1)
+
+
+@pytest.mark.parametrize("count", [10_000, 100_000])
+def test_benchmark_old_yearly_report(benchmark, rows, count):
+    benchmark.group = f"yearly {count} rows"
+    year_rows = rows(count, "year")
+    benchmark.pedantic(old_yearly_report, (year_rows, GOALS, YEAR), rounds=1)
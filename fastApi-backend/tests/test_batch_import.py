@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+import app.routers.transaction as transaction_router
+from app.config.storage import SQLiteStorage
+from tests.conftest import sqlite_only
+
+VALID = {"amount": 25, "desc": "Groceries", "type": "expense", "category": "Food", "date": "2024-03-05"}
+
+INVALID = [
+    {**VALID, "desc": "x" * 501},
+    {**VALID, "category": "c" * 101},
+    {**VALID, "date": ""},
+    {**VALID, "date": "2024-02-30"},
+    {**VALID, "type": "transfer"}
+]
+
+
+@pytest.mark.parametrize("row", INVALID)
+def test_batch_row_errors_match_single_create(client, headers, row):
+    single = client.post("/api/transactions", json=row, headers=headers)
+    assert single.status_code == 400
+
+    response = client.post("/api/transactions/batch", json={"transactions": [VALID, row, VALID]}, headers=headers)
+    results = response.json()["data"]
+    assert [r["success"] for r in results] == [True, False, True]
+    assert results[1]["message"] == single.json()["detail"]["message"]
+
+
+def test_batch_reports_missing_fields(client, headers):
+    row = {key: value for key, value in VALID.items() if key != "amount"}
+    results = client.post("/api/transactions/batch", json={"transactions": [row]}, headers=headers).json()["data"]
+    assert results == [{"index": 0, "success": False, "message": "Invalid or missing fields: amount"}]
+
+
+@sqlite_only
+def test_database_rejections_are_not_passed_through(client, headers, monkeypatch, capsys):
+    # Let an over-long description past validation so the CHECK rejects it
+    monkeypatch.setattr(transaction_router, "MAX_DESCRIPTION_LENGTH", 1000)
+    before = len(client.get("/api/transactions", headers=headers).json()["data"])
+
+    rows = [VALID, {**VALID, "desc": "x" * 600}, {**VALID, "amount": 30}]
+    response = client.post("/api/transactions/batch", json={"transactions": rows}, headers=headers).json()
+    assert response["message"] == "Imported 2 of 3 transactions"
+    assert response["data"][1] == {"index": 1, "success": False, "message": "Failed to create transaction"}
+    assert "CHECK constraint failed" in capsys.readouterr().out
+
+    listed = client.get("/api/transactions", headers=headers).json()["data"]
+    assert len(listed) == before + 2
+    assert sorted(t["amount"] for t in listed[:2]) == [25, 30]
+
+
+def test_sqlite_batch_errors_skip_only_the_failing_rows():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT NOT NULL CHECK (length(name) <= 3))")
+    cursor = conn.cursor()
+    rows = [{"id": 1, "name": "a"}, {"id": 2, "name": "long"}, {"id": 3, "name": None}, {"id": 4, "name": "b"}]
+
+    errors = SQLiteStorage().execute_many(cursor, "INSERT INTO t (id, name) VALUES (:id, :name)", rows, batch_errors=True)
+    assert sorted(errors) == [1, 2]
+    assert "CHECK constraint failed" in errors[1] and "NOT NULL constraint failed" in errors[2]
+    assert conn.execute("SELECT id FROM t ORDER BY id").fetchall() == [(1,), (4,)]
+
+    # A clean batch goes through in one executemany
+    assert SQLiteStorage().execute_many(cursor, "INSERT INTO t (id, name) VALUES (:id, :name)",
+                                        [{"id": 5, "name": "c"}], batch_errors=True) == {}
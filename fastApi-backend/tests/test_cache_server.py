@@ -0,0 +1,135 @@
+"""app.commands.cache_server driven by redis-py, as the app's caches use it."""
+import asyncio
+import threading
+import time
+
+import pytest
+import redis
+
+from app.commands.cache_server import CacheServer
+from app.utils.cache import RedisBackend, SharedObjectCache
+from app.utils.report_cache import ReportCache
+
+
+@pytest.fixture
+def server():
+    """A CacheServer on a free port, run on its own loop in a thread."""
+    cache = CacheServer(max_bytes=1024)
+    started = threading.Event()
+    running = {}
+
+    async def serve():
+        running["loop"], running["stop"] = asyncio.get_running_loop(), asyncio.Event()
+        server = await asyncio.start_server(cache.handle, "127.0.0.1", 0)
+        running["port"] = server.sockets[0].getsockname()[1]
+        started.set()
+        await running["stop"].wait()
+        server.close()
+        # Let the handlers see their clients disconnect
+        handlers = asyncio.all_tasks() - {asyncio.current_task()}
+        if handlers:
+            await asyncio.wait(handlers, timeout=5)
+
+    thread = threading.Thread(target=asyncio.run, args=(serve(),), daemon=True)
+    thread.start()
+    assert started.wait(5)
+    cache.url = f"redis://127.0.0.1:{running['port']}/0"
+    yield cache
+    running["loop"].call_soon_threadsafe(running["stop"].set)
+    thread.join(5)
+
+
+@pytest.fixture
+def redis_client(server):
+    client = redis.Redis.from_url(server.url)
+    yield client
+    client.close()
+
+
+def test_get_set_del(redis_client):
+    assert redis_client.ping()
+    assert redis_client.get("missing") is None
+    assert redis_client.set("a", b"1")
+    assert redis_client.get("a") == b"1"
+    assert redis_client.exists("a", "missing") == 1
+    assert redis_client.delete("a", "missing") == 1
+    assert redis_client.get("a") is None
+
+
+def test_set_options(redis_client):
+    assert redis_client.set("k", "v", nx=True)
+    assert redis_client.set("k", "other", nx=True) is None
+    assert redis_client.get("k") == b"v"
+    assert redis_client.set("k", "xx", xx=True) and redis_client.get("k") == b"xx"
+    assert redis_client.set("absent", "v", xx=True) is None
+
+    assert redis_client.set("short", "v", px=50)
+    assert 0 <= redis_client.ttl("short") <= 1
+    assert redis_client.set("long", "v", ex=100) and redis_client.ttl("long") == 100
+    assert redis_client.ttl("k") == -1 and redis_client.ttl("absent") == -2
+    time.sleep(0.1)
+    assert redis_client.get("short") is None
+
+    with pytest.raises(redis.ResponseError, match="invalid expire time"):
+        redis_client.set("k", "v", ex=0)
+
+
+def test_incr_keeps_the_ttl(redis_client):
+    assert redis_client.incr("n") == 1
+    assert redis_client.incrby("n", 5) == 6
+    assert redis_client.expire("n", 100)
+    assert redis_client.incr("n") == 7 and redis_client.ttl("n") == 100
+    redis_client.set("text", "abc")
+    with pytest.raises(redis.ResponseError, match="not an integer"):
+        redis_client.incr("text")
+
+
+def test_multi_exec(redis_client):
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.incr("generation")
+    pipe.expire("generation", 60)
+    pipe.get("generation")
+    assert pipe.execute() == [1, True, b"1"]
+
+    # DISCARD drops the queue
+    redis_client.execute_command("MULTI")
+    redis_client.execute_command("INCR", "generation")
+    assert redis_client.execute_command("DISCARD")
+    assert redis_client.get("generation") == b"1"
+
+    with pytest.raises(redis.ResponseError, match="EXEC without MULTI"):
+        redis_client.execute_command("EXEC")
+
+
+def test_least_recently_used_keys_are_evicted(redis_client):
+    # max_bytes is 1024, keys included: five of these fit, eight do not
+    for i in range(8):
+        redis_client.set(f"key{i}", b"x" * 200)
+        redis_client.get("key0")  # keep key0 recently used
+    assert redis_client.get("key0") is not None
+    assert redis_client.get("key1") is None
+    assert redis_client.dbsize() == 5
+    info = redis_client.info()
+    assert info["evicted_keys"] == 3 and info["used_memory"] == 5 * 204
+
+
+def test_unknown_commands_and_arity(redis_client):
+    with pytest.raises(redis.ResponseError, match="unknown command"):
+        redis_client.execute_command("HSET", "h", "f", "v")
+    with pytest.raises(redis.ResponseError, match="wrong number of arguments"):
+        redis_client.execute_command("GET")
+
+
+def test_app_caches_over_the_server(server):
+    backend = RedisBackend(server.url, ttl=60)
+    objects = SharedObjectCache(backend, "auth:")
+    objects.set(7, {"id": 7, "is_active": True})
+    assert objects.get(7) == {"id": 7, "is_active": True}
+    objects.invalidate(7)
+    assert objects.get(7) is None
+
+    reports = ReportCache(backend)
+    reports.invalidate(1, [(2024, 6)])
+    reports.invalidate(1, [(2024, 6)])
+    assert backend.get(reports._generation_key(1)) == b"2"
+    backend._client.close()
@@ -0,0 +1,71 @@
+"""Pool shutdown, on a pool of its own so the app's stays untouched."""
+import asyncio
+import os
+
+import pytest
+
+from app.config import database
+from app.config.pool import SQLitePool
+from tests.conftest import DB_DIR
+
+
+@pytest.fixture
+def own_pool(monkeypatch):
+    pool = SQLitePool(os.path.join(DB_DIR, "drain.db"), min_size=1, max_size=2, increment=1, timeout=1,
+                      ping_interval=60, stmt_cache_size=8)
+    monkeypatch.setattr(database, "pool", pool)
+    monkeypatch.setattr(database, "_checkout_slots", None)
+    return pool
+
+
+def test_close_waits_for_checkouts_then_refuses_new_ones(own_pool):
+    async def scenario():
+        database._checkout_slots = asyncio.Semaphore(own_pool.max_size)
+        events = []
+
+        async def request():
+            async with database.checkout():
+                events.append("checked out")
+                await asyncio.sleep(0.2)
+            events.append("returned")
+
+        running = asyncio.create_task(request())
+        await asyncio.sleep(0.05)
+        closing = asyncio.create_task(database.close_connection())
+        await asyncio.sleep(0.05)
+        # Queued behind drain(), which holds every free slot
+        late = asyncio.create_task(database.checkout().__aenter__())
+        await asyncio.wait_for(closing, 2)
+        assert events == ["checked out", "returned"]
+        assert database.pool is None
+
+        # Neither the queued checkout nor a new one waits on the closed pool
+        with pytest.raises(RuntimeError, match="closed"):
+            await asyncio.wait_for(late, 2)
+        with pytest.raises(RuntimeError, match="closed"):
+            async with database.checkout():
+                pass
+        await running
+
+    asyncio.run(scenario())
+    assert own_pool.opened == 0
+
+
+def test_drain_gives_its_slots_back(own_pool):
+    async def scenario():
+        slots = database._checkout_slots = asyncio.Semaphore(own_pool.max_size)
+        async with database.drain(timeout=1) as idle:
+            assert idle and slots.locked()
+        assert not slots.locked()
+        async with database.checkout() as conn:
+            assert conn.execute("SELECT 1").fetchone() == (1,)
+
+        # With a connection still out, drain() reports it and takes the rest
+        async with database.checkout():
+            async with database.drain(timeout=0.1) as idle:
+                assert not idle
+        async with database.checkout(), database.checkout():
+            pass
+
+    asyncio.run(scenario())
+    own_pool.close()
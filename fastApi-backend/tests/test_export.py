@@ -0,0 +1,33 @@
+import csv
+import io
+import json
+
+from tests.conftest import add_transactions
+
+ROWS = [
+    {"amount": 12.5, "desc": "Café ☕", "type": "expense", "category": "Food", "date": "2024-03-05"},
+    {"amount": 2500, "desc": "Salary", "type": "income", "category": "Salary", "date": "2024-03-01"},
+    {"amount": 40, "desc": 'Quote " and, comma', "type": "expense", "category": "Gifts", "date": "2024-02-14"}
+]
+
+
+def test_ndjson_export_matches_the_list(client, headers):
+    add_transactions(client, headers, ROWS)
+    listed = client.get("/api/transactions", headers=headers).json()["data"]
+
+    response = client.get("/api/transactions/export", headers=headers)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.content.endswith(b"\n")
+    assert [json.loads(line) for line in response.content.splitlines()] == listed
+
+
+def test_gzipped_csv_export(client, headers):
+    add_transactions(client, headers, ROWS)
+    listed = client.get("/api/transactions", headers=headers).json()["data"]
+
+    response = client.get("/api/transactions/export", params={"format": "csv", "gzip": True}, headers=headers)
+    assert response.headers["content-encoding"] == "gzip"
+    # httpx undoes the Content-Encoding itself
+    records = list(csv.DictReader(io.StringIO(response.content.decode())))
+    assert [r["desc"] for r in records] == [t["desc"] for t in listed]
+    assert [float(r["amount"]) for r in records] == [t["amount"] for t in listed]
@@ -0,0 +1,9 @@
+from app.config.migrations import LATEST_VERSION
+
+
+def test_health_reports_pool_and_schema(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["database"]["busy"] == 0
+    assert body["startup"]["migrations"]["version"] == LATEST_VERSION
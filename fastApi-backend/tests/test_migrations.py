@@ -0,0 +1,113 @@
+"""Migration 3 (category dictionary) on a copy of the schema at version 2."""
+import os
+import sqlite3
+
+import pytest
+
+from app.config import migrations
+from app.config.migrations import LATEST_VERSION, MIGRATIONS, _run, current_version, migrate
+from tests.conftest import sqlite_only
+
+pytestmark = sqlite_only
+
+TRANSACTIONS = [
+    # id, user, amount, type, category, date
+    (1, 1, 10.0, "expense", "Rent", "2024-01-03"),
+    (2, 1, 20.0, "expense", "Food", "2024-01-04"),
+    (3, 1, 5.0, "expense", "Food", "2024-01-20"),
+    (4, 1, 900.0, "income", "Salary", "2024-02-01"),
+    (5, 2, 7.5, "expense", "Travel", "2024-01-09"),
+    (6, 2, 2.5, "expense", "Food", "2024-03-15")
+]
+
+
+@pytest.fixture
+def conn(monkeypatch, tmp_path):
+    # Keep /health's migration stats about the app's own database
+    monkeypatch.setattr(migrations, "_stats", {**migrations._stats, "applied": []})
+    conn = sqlite3.connect(os.path.join(tmp_path, "v2.db"))
+    conn.execute("PRAGMA foreign_keys = ON")
+    assert migrate(conn, target=2) == 2
+    conn.executemany(
+        "INSERT INTO users (id, name, email, password, date_of_birth) VALUES (?, 'U', ?, 'x', '1990-01-01')",
+        [(1, "one@example.com"), (2, "two@example.com")]
+    )
+    conn.executemany(
+        "INSERT INTO transactions (id, user_id, amount, type, category, description, transaction_date) "
+        "VALUES (?, ?, ?, ?, ?, 'Paid ' || ?, ?)",
+        [(id_, user, amount, type_, category, category, day) for id_, user, amount, type_, category, day in TRANSACTIONS]
+    )
+    # Stale rollups: the migration rebuilds them from the transactions
+    conn.execute("INSERT INTO transaction_rollups VALUES (1, 2024, 1, 'Food', 'expense', 999, 9)")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_categories_become_a_per_user_dictionary(conn):
+    assert migrate(conn) == LATEST_VERSION
+
+    assert conn.execute("SELECT user_id, id, name FROM categories ORDER BY user_id, id").fetchall() == [
+        (1, 1, "Food"), (1, 2, "Rent"), (1, 3, "Salary"), (2, 1, "Food"), (2, 2, "Travel")
+    ]
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(transactions)")]
+    assert "category" not in columns
+    names = conn.execute("""
+        SELECT t.id, c.name FROM transactions t
+        JOIN categories c ON c.user_id = t.user_id AND c.id = t.category_id
+        ORDER BY t.id
+    """).fetchall()
+    assert names == [(id_, category) for id_, _, _, _, category, _ in TRANSACTIONS]
+
+
+def test_rollups_are_rebuilt_by_category_id(conn):
+    migrate(conn)
+    rollups = conn.execute("""
+        SELECT r.user_id, period_year, period_month, c.name, type, total_amount, txn_count
+        FROM transaction_rollups r JOIN categories c ON c.user_id = r.user_id AND c.id = r.category_id
+        ORDER BY 1, 2, 3, 4
+    """).fetchall()
+    assert rollups == [
+        (1, 2024, 1, "Food", "expense", 25.0, 2),
+        (1, 2024, 1, "Rent", "expense", 10.0, 1),
+        (1, 2024, 2, "Salary", "income", 900.0, 1),
+        (2, 2024, 1, "Travel", "expense", 7.5, 1),
+        (2, 2024, 3, "Food", "expense", 2.5, 1)
+    ]
+
+
+def test_search_still_matches_category_names(conn):
+    migrate(conn)
+    conn.execute("INSERT INTO categories (user_id, id, name) VALUES (2, 3, 'Groceries')")
+    conn.execute("""
+        INSERT INTO transactions (id, user_id, amount, type, category_id, description, transaction_date)
+        VALUES (7, 2, 3.0, 'expense', 3, 'Milk', '2024-03-16')
+    """)
+
+    def search(owner, query):
+        return [row[0] for row in conn.execute(
+            "SELECT rowid FROM transaction_search WHERE transaction_search MATCH ? ORDER BY rowid",
+            (f"owner:{owner} AND {query}",)
+        )]
+
+    assert search("u1", "category:food") == [2, 3]
+    assert search("u2", "category:groc*") == [7]
+    conn.execute("UPDATE transactions SET category_id = 1 WHERE id = 7")
+    assert search("u2", "category:groc*") == []
+    assert search("u2", "category:food") == [6, 7]
+
+
+def test_steps_are_idempotent(conn):
+    migrate(conn)
+    before = {table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+              for table in ("categories", "transactions", "transaction_rollups")}
+
+    # A migration interrupted after its steps but before it was recorded is
+    # simply run again on the next boot
+    cursor = conn.cursor()
+    for step in MIGRATIONS[2].steps:
+        _run(cursor, step)
+    conn.commit()
+    after = {table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall() for table in before}
+    assert after == before
+    assert migrate(conn) == current_version(conn) == LATEST_VERSION
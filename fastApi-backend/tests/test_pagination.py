@@ -0,0 +1,63 @@
+from tests.conftest import add_transactions
+
+
+def rows(count, dates):
+    return [
+        {"amount": 10 + i, "desc": f"Row {i}", "type": "income" if i % 4 == 0 else "expense",
+         "category": ["Food", "Rent", "Salary"][i % 3], "date": dates[i % len(dates)]}
+        for i in range(count)
+    ]
+
+
+def walk(client, headers, limit, **params):
+    ids, after = [], None
+    while True:
+        query = {"limit": limit, **params}
+        if after:
+            query["after"] = after
+        page = client.get("/api/transactions", params=query, headers=headers).json()
+        assert len(page["data"]) <= limit
+        ids.extend(t["id"] for t in page["data"])
+        after = page["pagination"]["nextCursor"]
+        assert page["pagination"]["hasMore"] == (after is not None)
+        if after is None:
+            return ids
+
+
+def test_pages_cover_the_full_list_in_order(client, headers):
+    # Several rows share each date, so the cursor has to break ties
+    add_transactions(client, headers, rows(25, ["2024-03-05", "2024-03-01", "2024-02-28"]))
+    everything = [t["id"] for t in client.get("/api/transactions", headers=headers).json()["data"]]
+    assert len(everything) == 25
+
+    for limit in (1, 7, 10, 25, 100):
+        assert walk(client, headers, limit) == everything
+
+
+def test_cursor_is_not_shifted_by_newer_rows(client, headers):
+    add_transactions(client, headers, rows(12, ["2024-03-10", "2024-03-09"]))
+    first = client.get("/api/transactions", params={"limit": 5}, headers=headers).json()
+    add_transactions(client, headers, rows(3, ["2024-04-01"]))
+    second = client.get("/api/transactions", params={"limit": 5, "after": first["pagination"]["nextCursor"]},
+                        headers=headers).json()
+
+    everything = [t["id"] for t in client.get("/api/transactions", headers=headers).json()["data"]]
+    old = everything[3:]  # the three new rows sort first
+    assert [t["id"] for t in first["data"]] == old[:5]
+    assert [t["id"] for t in second["data"]] == old[5:10]
+
+
+def test_filters_apply_to_every_page(client, headers):
+    add_transactions(client, headers, rows(30, ["2024-01-15", "2024-02-15", "2024-03-15"]))
+    february = walk(client, headers, 4, start_date="2024-02-01", end_date="2024-02-29", type="expense")
+    expected = [
+        t["id"] for t in client.get("/api/transactions/month/2/2024", headers=headers).json()["data"]
+        if t["type"] == "expense"
+    ]
+    assert february == expected and expected
+
+
+def test_invalid_cursor_is_rejected(client, headers):
+    response = client.get("/api/transactions", params={"limit": 5, "after": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"]["message"] == "Invalid pagination cursor"
@@ -0,0 +1,100 @@
+"""Hot queries must be answered from an index, not a scan of a per-user table.
+
+The SQLite plans are checked on every run. The Oracle EXPLAIN PLAN variant
+needs the suite pointed at a real instance (DB_BACKEND=oracle plus
+DB_HOST/DB_PORT/DB_SID) with realistic optimizer statistics; on a
+near-empty schema the optimizer may legitimately prefer a full scan.
+"""
+import os
+import re
+import uuid
+
+import pytest
+
+from app.config import database
+from app.config.storage import storage
+from app.models.goal import GET_USER_GOALS_SQL
+from app.models.rollup import GET_YEAR_SQL
+from app.models.transaction import (
+    AGGREGATE_SQL, GET_ALL_SQL, GET_BY_MONTH_SQL, TRANSACTION_FIELDS, build_page_query, encode_cursor
+)
+from tests.conftest import sqlite_only
+
+CHECKED_TABLES = {"transactions", "goals", "transaction_rollups"}
+
+MONTH_PARAMS = {"user_id": 1, "start_date": "2024-01-01", "end_date": "2024-02-01"}
+
+
+def hot_queries():
+    page_sql, page_params = build_page_query(
+        1, 50, encode_cursor("2024-01-31", "2024-01-31T12:00:00.000000", 1), list(TRANSACTION_FIELDS)
+    )
+    return [
+        ("transactions.get_all", GET_ALL_SQL, {"user_id": 1}),
+        ("transactions.get_by_month", GET_BY_MONTH_SQL, MONTH_PARAMS),
+        ("transactions.aggregate", AGGREGATE_SQL, MONTH_PARAMS),
+        ("transactions.get_page", page_sql, page_params),
+        ("goals.get_user_goals", GET_USER_GOALS_SQL, {"user_id": 1}),
+        ("rollups.get_year", GET_YEAR_SQL, {"user_id": 1, "period_year": 2024})
+    ]
+
+
+QUERIES = pytest.mark.parametrize("sql, params", [q[1:] for q in hot_queries()], ids=[q[0] for q in hot_queries()])
+
+
+@pytest.fixture
+def conn(client):
+    conn = database.pool.acquire()
+    try:
+        yield conn
+    finally:
+        database.pool.release(conn)
+
+
+def sqlite_table_scans(conn, sql, params):
+    """Tables the plan reads row by row: SCAN without an index to walk."""
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    scans = []
+    for _, _, _, detail in plan:
+        match = re.match(r"SCAN (\w+)", detail)
+        if match and match.group(1) in CHECKED_TABLES and "INDEX" not in detail:
+            scans.append(detail)
+    return scans
+
+
+@sqlite_only
+@QUERIES
+def test_sqlite_plan_uses_indexes(conn, sql, params):
+    assert sqlite_table_scans(conn, sql, params) == []
+
+
+@sqlite_only
+def test_sqlite_check_catches_a_scan(conn):
+    assert sqlite_table_scans(conn, "SELECT id FROM transactions WHERE description = :d", {"d": "x"})
+
+
+def oracle_full_scans(conn, sql, params):
+    statement_id = uuid.uuid4().hex[:30]
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {sql}", params)
+        cursor.execute("""
+            SELECT operation, options, object_name
+            FROM plan_table
+            WHERE statement_id = :statement_id
+            ORDER BY id
+        """, {"statement_id": statement_id})
+        plan = cursor.fetchall()
+        cursor.execute("DELETE FROM plan_table WHERE statement_id = :statement_id", {"statement_id": statement_id})
+        conn.commit()
+    finally:
+        cursor.close()
+    return [obj for op, options, obj in plan
+            if op == "TABLE ACCESS" and options == "FULL" and obj.lower() in CHECKED_TABLES]
+
+
+@pytest.mark.skipif(storage.name != "oracle" or "DB_HOST" not in os.environ,
+                    reason="needs DB_BACKEND=oracle and an Oracle DSN (DB_HOST/DB_PORT/DB_SID)")
+@QUERIES
+def test_oracle_plan_has_no_full_scans(conn, sql, params):
+    assert oracle_full_scans(conn, sql, params) == []
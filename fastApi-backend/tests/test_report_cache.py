@@ -0,0 +1,95 @@
+import asyncio
+
+from starlette.requests import Request
+
+from app.utils.cache import MemoryBackend
+from app.utils.report_cache import ReportCache, etag_matches
+from tests.conftest import add_transactions
+
+ROW = {"amount": 40, "desc": "Books", "type": "expense", "category": "Education", "date": "2024-06-10"}
+
+
+def get_report(client, headers, etag=None, **params):
+    extra = {"If-None-Match": etag} if etag else {}
+    return client.get("/api/report", params={"month": 6, "year": 2024, **params}, headers={**headers, **extra})
+
+
+def test_revalidation_and_invalidation(client, headers):
+    add_transactions(client, headers, [ROW])
+    first = get_report(client, headers)
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["cache-control"] == "private, no-cache"
+
+    cached = get_report(client, headers, etag)
+    assert cached.status_code == 304 and cached.headers["etag"] == etag and cached.content == b""
+
+    # A write to another month leaves this report's ETag alone
+    add_transactions(client, headers, [{**ROW, "date": "2024-07-01"}])
+    assert get_report(client, headers, etag).status_code == 304
+
+    add_transactions(client, headers, [{**ROW, "amount": 60}])
+    changed = get_report(client, headers, etag)
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()["data"]["summary"]["expenses"] == 100
+
+    # Deleting the new row restores the old data, and so the old ETag
+    new_id = changed.json()["data"]["transactions"][0]["id"]
+    client.delete(f"/api/transactions/{new_id}", headers=headers)
+    assert get_report(client, headers, etag).status_code == 304
+
+
+def test_yearly_report_is_invalidated_by_month_writes(client, headers):
+    add_transactions(client, headers, [ROW])
+    first = client.get("/api/report/yearly", params={"year": 2024}, headers=headers)
+    etag = first.headers["etag"]
+    add_transactions(client, headers, [{**ROW, "date": "2024-11-30"}])
+    second = client.get("/api/report/yearly", params={"year": 2024}, headers={**headers, "If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.json()["data"]["summary"]["transactionCount"] == 2
+
+
+def test_etag_matching():
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def request(headers=()):
+    return Request({"type": "http", "headers": [(k.encode(), v.encode()) for k, v in headers]})
+
+
+def test_report_built_across_a_write_is_not_stored():
+    cache = ReportCache(MemoryBackend(maxsize=100, ttl=60, max_bytes=1 << 20))
+    key = cache.monthly_key(1, 6, 2024)
+
+    async def build():
+        # A write commits while the report is being computed
+        cache.invalidate(1, [(2024, 6)])
+        return {"success": True, "data": {"generatedAt": "now", "total": 1}}
+
+    asyncio.run(cache.respond(request(), key, 1, build))
+    assert cache.backend.get(key) is None
+
+    async def build_quietly():
+        return {"success": True, "data": {"generatedAt": "now", "total": 2}}
+
+    asyncio.run(cache.respond(request(), key, 1, build_quietly))
+    assert cache.backend.get(key) is not None
+
+
+def test_generation_survives_eviction():
+    backend = MemoryBackend(maxsize=2, ttl=60, max_bytes=1 << 20)
+    cache = ReportCache(backend)
+    cache.invalidate(1, [(2024, 6)])
+    generation = backend.get(cache._generation_key(1))
+    assert generation == b"1"
+
+    # Fill the LRU well past its size; the counter must not be evicted
+    for month in range(1, 13):
+        backend.set(cache.monthly_key(2, month, 2024), b'"etag"\n{}')
+    assert backend.get(cache._generation_key(1)) == generation
+    assert backend.stats()["evictions"] == 10
+
+    cache.invalidate(1, [(2024, 6)])
+    assert backend.get(cache._generation_key(1)) == b"2"
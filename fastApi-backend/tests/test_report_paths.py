@@ -0,0 +1,89 @@
+"""Both REPORT_AGGREGATION paths must serve the same reports."""
+import pytest
+
+import app.routers.report as report_router
+from app.commands.check_report_paths import differences
+from app.utils.report_cache import report_cache
+from tests.conftest import add_transactions
+
+YEAR = 2024
+
+
+def row(day, amount, type_, category):
+    return {"amount": amount, "desc": f"{category} {day}", "type": type_, "category": category, "date": day}
+
+
+ROWS = [
+    # Rows either side of every week boundary (7/8, 14/15, 21/22, 28/29) and
+    # on the 31st, the end of the short fifth week
+    *[row(f"{YEAR}-01-{day:02d}", 10 * day, "expense", "Food") for day in (1, 7, 8, 14, 15, 21, 22, 28, 29, 31)],
+    # Equal totals, so these rank in the order the newest-first listing
+    # meets them: Gifts, Health, Rent
+    row(f"{YEAR}-01-03", 100, "expense", "Rent"),
+    row(f"{YEAR}-01-05", 100, "expense", "Gifts"),
+    row(f"{YEAR}-01-04", 100, "expense", "Health"),
+    row(f"{YEAR}-01-05", 2500, "income", "Salary"),
+    row(f"{YEAR}-01-05", 2500, "income", "Bonus"),
+    row(f"{YEAR}-01-20", 0.1, "income", "Gifts"),
+    row(f"{YEAR}-01-20", 0.2, "income", "Gifts"),
+    row(f"{YEAR}-02-28", 45.5, "expense", "Transport"),
+    row(f"{YEAR}-02-29", 45.5, "expense", "Utilities"),
+    row(f"{YEAR}-04-30", 1200, "income", "Salary"),
+    row(f"{YEAR}-12-31", 99.99, "expense", "Gifts"),
+    # Neighbouring years stay out of this one's reports
+    row(f"{YEAR - 1}-12-31", 500, "expense", "Rent"),
+    row(f"{YEAR + 1}-01-01", 500, "income", "Salary")
+]
+
+
+@pytest.fixture
+def seeded(client, user):
+    user_id, headers = user
+    add_transactions(client, headers, ROWS)
+    for month, target in ((1, 1000), (2, 50), (5, 10)):
+        response = client.post("/api/goals", json={"target_amount": target, "target_month": month, "target_year": YEAR},
+                               headers=headers)
+        assert response.status_code == 200, response.text
+    return user_id, headers
+
+
+def fetch(client, monkeypatch, user_id, headers, aggregation, path, params, month):
+    monkeypatch.setattr(report_router, "REPORT_AGGREGATION", aggregation)
+    # Drop the other path's cached copy
+    report_cache.invalidate(user_id, [(YEAR, month)])
+    response = client.get(path, params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    data = response.json()["data"]
+    del data["generatedAt"]
+    return data
+
+
+@pytest.mark.parametrize("month", range(1, 13))
+def test_monthly_report_paths_agree(client, monkeypatch, seeded, month):
+    user_id, headers = seeded
+    params = {"month": month, "year": YEAR}
+    sql = fetch(client, monkeypatch, user_id, headers, "sql", "/api/report", params, month)
+    python = fetch(client, monkeypatch, user_id, headers, "python", "/api/report", params, month)
+    assert differences(sql, python) == []
+    if month in (3, 5):
+        assert sql["summary"]["transactionCount"] == 0
+
+
+def test_first_seen_order_of_tied_categories(client, monkeypatch, seeded):
+    user_id, headers = seeded
+    params = {"month": 1, "year": YEAR}
+    for aggregation in ("sql", "python"):
+        data = fetch(client, monkeypatch, user_id, headers, aggregation, "/api/report", params, 1)
+        top = [name for name, _ in data["analytics"]["topCategories"]["expenses"]]
+        assert top[:4] == ["Food", "Gifts", "Health", "Rent"], aggregation
+        weeks = [week["expenses"] for week in data["chartData"]["weekly"]]
+        assert weeks == [10 + 70 + 300, 80 + 140, 150 + 210, 220 + 280, 290 + 310], aggregation
+
+
+def test_yearly_report_paths_agree(client, monkeypatch, seeded):
+    user_id, headers = seeded
+    params = {"year": YEAR}
+    sql = fetch(client, monkeypatch, user_id, headers, "sql", "/api/report/yearly", params, 1)
+    python = fetch(client, monkeypatch, user_id, headers, "python", "/api/report/yearly", params, 1)
+    assert differences(sql, python) == []
+    assert sql["summary"]["transactionCount"] == len(ROWS) - 2
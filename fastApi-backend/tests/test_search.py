@@ -0,0 +1,40 @@
+import app.models.transaction as transaction_model
+from tests.conftest import add_transactions
+
+
+def row(desc, category="Food", date="2024-03-05"):
+    return {"amount": 10, "desc": desc, "type": "expense", "category": category, "date": date}
+
+
+def search(client, headers, q, **params):
+    response = client.get("/api/transactions/search", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_search_matches_every_word_as_a_prefix(client, headers):
+    coffee, beans, _ = add_transactions(client, headers, [
+        row("Morning coffee"), row("Coffee beans", category="Groceries"), row("Bus ticket", category="Transport")
+    ])
+    assert sorted(t["id"] for t in search(client, headers, "coff")["data"]) == sorted([coffee, beans])
+    assert [t["id"] for t in search(client, headers, "coffee groc")["data"]] == [beans]
+    assert search(client, headers, "tea")["data"] == []
+
+
+def test_search_ranks_only_the_newest_candidates(client, headers, monkeypatch):
+    ids = add_transactions(client, headers, [row(f"Rent payment {i}") for i in range(6)])
+    monkeypatch.setattr(transaction_model, "SEARCH_CANDIDATES", 4)
+
+    first = search(client, headers, "rent", limit=3)
+    assert first["pagination"]["hasMore"] is True
+    second = search(client, headers, "rent", limit=3, after=first["pagination"]["nextCursor"])
+    assert second["pagination"] == {"limit": 3, "nextCursor": None, "hasMore": False}
+
+    found = [t["id"] for t in first["data"] + second["data"]]
+    assert sorted(found) == sorted(ids[-4:])
+
+
+def test_search_needs_a_word(client, headers):
+    response = client.get("/api/transactions/search", params={"q": "!!"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"]["message"] == "Search text must contain a letter or digit"
@@ -0,0 +1,63 @@
+from tests.conftest import add_transactions, register
+
+ROW = {"amount": 15, "desc": "Lunch", "type": "expense", "category": "Food", "date": "2024-05-02"}
+GOAL = {"target_amount": 300, "target_month": 5, "target_year": 2024}
+
+
+def sync(client, headers, since=None):
+    response = client.get("/api/sync", params={"since": since} if since else {}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def test_full_sync_then_deltas_with_tombstones(client, headers):
+    kept, deleted, updated = add_transactions(client, headers, [ROW, {**ROW, "amount": 16}, {**ROW, "amount": 17}])
+    client.post("/api/goals", json=GOAL, headers=headers)
+    goal_id = client.get("/api/goals", headers=headers).json()["data"][0]["id"]
+
+    full = sync(client, headers)
+    assert full["fullSync"] is True
+    assert sorted(t["id"] for t in full["transactions"]) == sorted([kept, deleted, updated])
+    assert [g["id"] for g in full["goals"]] == [goal_id]
+    assert full["deleted"] == {"transactions": [], "goals": []}
+
+    # Nothing has changed since
+    assert sync(client, headers, full["cursor"]) == {
+        "transactions": [], "goals": [], "deleted": {"transactions": [], "goals": []},
+        "fullSync": False, "cursor": full["cursor"]
+    }
+
+    assert client.delete(f"/api/transactions/{deleted}", headers=headers).status_code == 200
+    assert client.put(f"/api/transactions/{updated}", json={**ROW, "amount": 99}, headers=headers).status_code == 200
+    assert client.delete(f"/api/goals/{goal_id}", headers=headers).status_code == 200
+    (added,) = add_transactions(client, headers, [{**ROW, "desc": "Dinner"}])
+
+    delta = sync(client, headers, full["cursor"])
+    assert delta["fullSync"] is False
+    assert {t["id"]: t["amount"] for t in delta["transactions"]} == {updated: 99, added: 15}
+    assert delta["goals"] == []
+    assert delta["deleted"] == {"transactions": [deleted], "goals": [goal_id]}
+
+    # A later cursor sees only what happened after it
+    assert client.delete(f"/api/transactions/{added}", headers=headers).status_code == 200
+    latest = sync(client, headers, delta["cursor"])
+    assert latest["transactions"] == []
+    assert latest["deleted"] == {"transactions": [added], "goals": []}
+
+    # A full sync leaves deleted rows out instead of listing tombstones
+    again = sync(client, headers)
+    assert sorted(t["id"] for t in again["transactions"]) == sorted([kept, updated])
+    assert again["deleted"] == {"transactions": [], "goals": []}
+
+
+def test_users_do_not_see_each_others_changes(client, headers):
+    cursor = sync(client, headers)["cursor"]
+    _, other = register(client)
+    add_transactions(client, other, [ROW])
+    assert sync(client, headers, cursor)["transactions"] == []
+
+
+def test_invalid_sync_cursor_is_rejected(client, headers):
+    response = client.get("/api/sync", params={"since": "garbage"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"]["message"] == "Invalid sync cursor"
@@ -0,0 +1,59 @@
+import pytest
+
+from tests.conftest import register
+
+BODY = {"amount": 12.5, "desc": "Coffee", "type": "expense", "category": "Food", "date": "2024-03-05"}
+
+
+def create(client, headers, **changes):
+    return client.post("/api/transactions", json={**BODY, **changes}, headers=headers)
+
+
+def test_create_normalizes_the_date(client, headers):
+    response = create(client, headers, date="2024-3-5")
+    assert response.status_code == 200, response.text
+    transaction_id = response.json()[0]["data"]["id"]
+    stored = client.get(f"/api/transactions/{transaction_id}", headers=headers).json()["data"]
+    assert stored["date"] == "2024-03-05"
+
+
+@pytest.mark.parametrize("changes", [{"date": ""}, {"desc": ""}, {"amount": 0}, {"category": ""}])
+def test_missing_fields_are_reported_before_the_date(client, headers, changes):
+    response = create(client, headers, **changes)
+    assert response.status_code == 400
+    assert response.json()["detail"]["message"] == "All fields are required"
+
+
+@pytest.mark.parametrize("date", ["2024-02-30", "05/03/2024", "2024-03"])
+def test_invalid_dates_are_rejected(client, headers, date):
+    response = create(client, headers, date=date)
+    assert response.status_code == 400
+    assert response.json()["detail"]["message"] == "Date must be in YYYY-MM-DD format"
+
+
+def test_invalid_type_is_rejected(client, headers):
+    response = create(client, headers, type="transfer", date="not a date")
+    assert response.status_code == 400
+    assert response.json()["detail"]["message"] == 'Type must be either "income" or "expense"'
+
+
+def test_update_validates_like_create(client, headers):
+    transaction_id = create(client, headers).json()[0]["data"]["id"]
+    url = f"/api/transactions/{transaction_id}"
+
+    response = client.put(url, json={**BODY, "date": ""}, headers=headers)
+    assert (response.status_code, response.json()["detail"]["message"]) == (400, "All fields are required")
+    response = client.put(url, json={**BODY, "date": "2024-13-01"}, headers=headers)
+    assert (response.status_code, response.json()["detail"]["message"]) == (400, "Date must be in YYYY-MM-DD format")
+
+    response = client.put(url, json={**BODY, "amount": 20, "date": "2024-4-1"}, headers=headers)
+    assert response.status_code == 200, response.text
+    stored = client.get(url, headers=headers).json()["data"]
+    assert (stored["amount"], stored["date"]) == (20, "2024-04-01")
+
+
+def test_update_of_another_users_transaction_is_not_found(client, headers):
+    transaction_id = create(client, headers).json()[0]["data"]["id"]
+    _, other = register(client)
+    response = client.put(f"/api/transactions/{transaction_id}", json=BODY, headers=other)
+    assert response.status_code == 404